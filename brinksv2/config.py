@@ -52,6 +52,9 @@ GLOBAL_TRACKER_CLEANUP_INTERVAL = int(
 # ==================== RTSP Configuration ====================
 RTSP_TIMEOUT = int(os.getenv("RTSP_TIMEOUT", "10"))
 RTSP_RECONNECT_DELAY = int(os.getenv("RTSP_RECONNECT_DELAY", "5"))
+# Detect on rtsp_sub and open rtsp_main only while visualization clients are watching
+DUAL_STREAM_DETECTION = os.getenv("DUAL_STREAM_DETECTION", "True").lower() == "true"
+MAIN_STREAM_IDLE_TIMEOUT = float(os.getenv("MAIN_STREAM_IDLE_TIMEOUT", "10"))  # seconds
 
 # ==================== WebRTC Configuration ====================
 WEBRTC_SERVER_URL = os.getenv("WEBRTC_SERVER_URL", "http://127.0.0.1:8083")
@@ -110,6 +113,8 @@ class Config:
     # RTSP
     RTSP_TIMEOUT = RTSP_TIMEOUT
     RTSP_RECONNECT_DELAY = RTSP_RECONNECT_DELAY
+    DUAL_STREAM_DETECTION = DUAL_STREAM_DETECTION
+    MAIN_STREAM_IDLE_TIMEOUT = MAIN_STREAM_IDLE_TIMEOUT
     
     # WebRTC
     WEBRTC_SERVER_URL = WEBRTC_SERVER_URL
@@ -15,6 +15,7 @@ from routes import visualization
 from database import engine, Base, SessionLocal
 from services.people_detection import PeopleDetector, RTSPPeopleCounter
 from services.cross_camera_tracking import GlobalPersonTracker
+from config import config
 
 # Import ALL models before creating tables (order matters for foreign keys)
 from models.room import Room
@@ -47,7 +48,11 @@ def start_detection_service():
     )
     
     # Initialize counter with 30 FPS processing (ByteTrack requirement)
-    people_counter = RTSPPeopleCounter(people_detector, process_fps=30)
+    people_counter = RTSPPeopleCounter(
+        people_detector,
+        process_fps=30,
+        view_idle_timeout=config.MAIN_STREAM_IDLE_TIMEOUT
+    )
     
     # Load cameras and rooms from database
     db = SessionLocal()
@@ -74,7 +79,11 @@ def start_detection_service():
     
     print(f"📹 Starting detection on {len(cameras_list)} cameras in {len(rooms_list)} rooms...")
     for camera in cameras_list:
-        people_counter.start_stream(camera.id, camera.rtsp_main)
+        if config.DUAL_STREAM_DETECTION and camera.rtsp_sub:
+            # Detect on the low-resolution sub-stream; main stream only for viewers
+            people_counter.start_stream(camera.id, camera.rtsp_sub, view_url=camera.rtsp_main)
+        else:
+            people_counter.start_stream(camera.id, camera.rtsp_main)
         time.sleep(1)  # Stagger stream starts
     
     print("✅ People detection service running")
@@ -24,6 +24,13 @@ def set_detection_service(detector, counter):
     people_counter = counter
 
 
+def get_view_frame(camera_id: int):
+    """Frame to annotate: boxes are rescaled by draw_tracks if it differs from the detection frame"""
+    if people_counter is not None:
+        return people_counter.get_view_frame(camera_id)
+    return people_detector.camera_tracks[camera_id].get('last_frame', None)
+
+
 def generate_frame_stream(camera_id: int, fps: int = 10):
     """
     Generate MJPEG stream with annotated frames
@@ -44,8 +51,8 @@ def generate_frame_stream(camera_id: int, fps: int = 10):
                 cv2.putText(frame, "Detection service not ready", (50, 240),
                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
             else:
-                # Get the last processed frame
-                frame = people_detector.camera_tracks[camera_id].get('last_frame', None)
+                # Main-stream frame in dual-stream mode, otherwise the last processed frame
+                frame = get_view_frame(camera_id)
                 
                 if frame is None:
                     # Send waiting frame
@@ -116,8 +123,8 @@ async def get_camera_snapshot(camera_id: int):
     if people_detector is None:
         raise HTTPException(status_code=503, detail="Detection service not initialized")
     
-    # Get the last processed frame
-    frame = people_detector.camera_tracks[camera_id].get('last_frame', None)
+    # Main-stream frame in dual-stream mode, otherwise the last processed frame
+    frame = get_view_frame(camera_id)
     
     if frame is None:
         raise HTTPException(status_code=404, detail=f"No frame available for camera {camera_id}")
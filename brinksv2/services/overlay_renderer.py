@@ -0,0 +1,153 @@
+"""
+Overlay Renderer for tracking visualization
+Draws boxes and labels from an already-computed track snapshot, on demand only
+(visualization stream/snapshot requests), with label sprites cached per text + color
+Same renderer as the RAZZv4 backend (services/overlay_renderer.py)
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Mapping, Optional, Tuple
+import cv2
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+Color = Tuple[int, int, int]
+LabelFn = Callable[[object, Mapping], Optional[str]]
+
+
+class OverlayRenderer:
+    """
+    Stateless-per-frame renderer with a bounded label sprite cache
+    - One frame.copy() per render, then rectangles + pre-rendered label blits
+    - cv2.getTextSize/putText run once per distinct label, not once per track per frame
+    - Never touches the model: input is the frame plus the track snapshot
+    """
+
+    FONT = cv2.FONT_HERSHEY_SIMPLEX
+    FONT_SCALE = 0.6
+    THICKNESS = 2
+
+    SOURCE_COLORS: Dict[str, Color] = {'bytetrack': (0, 255, 0)}
+    DEFAULT_COLOR: Color = (255, 165, 0)
+
+    def __init__(self, max_sprites: int = 1024, source_colors: Optional[Dict[str, Color]] = None,
+                 default_color: Optional[Color] = None):
+        """
+        Initialize overlay renderer
+
+        Args:
+            max_sprites: Label sprites kept in the LRU cache
+            source_colors: Box color per track source. If None, uses SOURCE_COLORS
+            default_color: Color for sources not in source_colors. If None, uses DEFAULT_COLOR
+        """
+        self.max_sprites = max_sprites
+        self.source_colors = source_colors if source_colors is not None else dict(self.SOURCE_COLORS)
+        self.default_color = default_color if default_color is not None else self.DEFAULT_COLOR
+        self.sprites: "OrderedDict[Tuple[str, Color, Color, int], np.ndarray]" = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.frames_rendered = 0
+        self.sprite_hits = 0
+        self.sprite_misses = 0
+
+    def color_for(self, track_data: Mapping) -> Color:
+        """Box/label color for a track (by tracker source)"""
+        return self.source_colors.get(track_data.get('source', 'unknown'), self.default_color)
+
+    def render(self, frame: np.ndarray, tracks: Mapping, label_fn: LabelFn,
+               count_text: Optional[str] = None) -> np.ndarray:
+        """
+        Draw a track snapshot onto a copy of the frame
+
+        Args:
+            frame: Raw BGR frame the tracks belong to
+            tracks: {track_id: track_data} with at least 'bbox' (x1, y1, x2, y2)
+            label_fn: Returns the label text for (track_id, track_data), or None for no label
+            count_text: Optional text for the top-left counter box
+
+        Returns:
+            Annotated copy of the frame
+        """
+        annotated = frame.copy()
+
+        for track_id, track_data in tracks.items():
+            x1, y1, x2, y2 = (int(v) for v in track_data['bbox'])
+            color = self.color_for(track_data)
+
+            # Draw bounding box
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), color, self.THICKNESS)
+
+            label = label_fn(track_id, track_data)
+            if label:
+                sprite = self._get_sprite(label, color, (0, 0, 0))
+                sprite_h = sprite.shape[0]
+                # Above the box if it fits, otherwise just inside the top edge
+                top = y1 - sprite_h - 5 if y1 - sprite_h - 5 >= 0 else y1 + 5
+                self._blit(annotated, sprite, x1, top)
+
+        if count_text is not None:
+            counter = self._get_sprite(count_text, (0, 0, 0), (0, 255, 0), min_width=195)
+            self._blit(annotated, counter, 5, 5)
+
+        self.frames_rendered += 1
+        return annotated
+
+    def _get_sprite(self, text: str, background: Color, foreground: Color, min_width: int = 0) -> np.ndarray:
+        """Pre-rendered label patch (background box + text), cached LRU"""
+        key = (text, background, foreground, min_width)
+        with self.lock:
+            sprite = self.sprites.get(key)
+            if sprite is not None:
+                self.sprites.move_to_end(key)
+                self.sprite_hits += 1
+                return sprite
+
+        (text_w, text_h), _ = cv2.getTextSize(text, self.FONT, self.FONT_SCALE, self.THICKNESS)
+        sprite = np.empty((text_h + 8, max(text_w + 10, min_width), 3), dtype=np.uint8)
+        sprite[:] = background
+        cv2.putText(sprite, text, (5, text_h + 2), self.FONT, self.FONT_SCALE, foreground, self.THICKNESS)
+
+        with self.lock:
+            self.sprite_misses += 1
+            self.sprites[key] = sprite
+            if len(self.sprites) > self.max_sprites:
+                self.sprites.popitem(last=False)
+        return sprite
+
+    @staticmethod
+    def _blit(image: np.ndarray, sprite: np.ndarray, x: int, y: int):
+        """Copy sprite into image at (x, y), clipped to the image bounds"""
+        h, w = image.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sprite.shape[1], w), min(y + sprite.shape[0], h)
+        if x1 <= x0 or y1 <= y0:
+            return
+        image[y0:y1, x0:x1] = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+
+    def get_stats(self) -> Dict:
+        """Get renderer statistics"""
+        return {
+            'frames_rendered': self.frames_rendered,
+            'cached_sprites': len(self.sprites),
+            'sprite_hits': self.sprite_hits,
+            'sprite_misses': self.sprite_misses
+        }
+
+
+# Global singleton instance
+_overlay_renderer_instance = None
+
+
+def get_overlay_renderer() -> OverlayRenderer:
+    """Get singleton overlay renderer"""
+    global _overlay_renderer_instance
+    if _overlay_renderer_instance is None:
+        _overlay_renderer_instance = OverlayRenderer(
+            source_colors={'bytetrack': (0, 255, 0), 'deepsort': (255, 165, 0)},
+            default_color=(255, 255, 255)
+        )
+    return _overlay_renderer_instance
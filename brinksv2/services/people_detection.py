@@ -14,6 +14,7 @@ import time
 from typing import Dict, List, Tuple
 import supervision as sv
 from deep_sort_realtime.deepsort_tracker import DeepSort
+from services.overlay_renderer import get_overlay_renderer
 
 
 class PeopleDetector:
@@ -49,6 +50,7 @@ class PeopleDetector:
         self.conf_threshold = conf_threshold
         self.bytetrack_threshold = bytetrack_threshold
         self.global_tracker = global_tracker  # Store global tracker
+        self.renderer = get_overlay_renderer()  # Overlay drawing with cached label sprites
         
         # Initialize ByteTrack tracker per camera
         self.byte_trackers = {}
@@ -246,6 +248,7 @@ class PeopleDetector:
         self.camera_tracks[camera_id]['global_mapping'] = global_mapping
         self.camera_tracks[camera_id]['last_update'] = datetime.now()
         self.camera_tracks[camera_id]['last_frame'] = frame  # Store frame for visualization
+        self.camera_tracks[camera_id]['frame_size'] = (frame.shape[1], frame.shape[0])  # Track coordinate space
         self.camera_tracks[camera_id]['history'].append({
             'timestamp': datetime.now().isoformat(),
             'count': people_count
@@ -312,87 +315,60 @@ class PeopleDetector:
         Draw bounding boxes and names/IDs on frame - minimal clean overlay
         
         Args:
-            frame: Input frame
+            frame: Input frame (the detection frame, or a main-stream frame of another resolution)
             camera_id: Camera identifier
             
         Returns:
             Annotated frame with tracking visualization
         """
-        annotated = frame.copy()
-        
         # Get tracks for this camera
         tracks = self.camera_tracks[camera_id].get('tracks', {})
-        people_count = self.camera_tracks[camera_id].get('count', 0)
         global_mapping = self.camera_tracks[camera_id].get('global_mapping', {})
         room_id = self.camera_tracks[camera_id].get('room_id')
         
-        # Draw each track with minimal design
-        for track_id, track_data in tracks.items():
-            bbox = track_data['bbox']
-            confidence = track_data.get('confidence', 0.0)
-            source = track_data.get('source', 'unknown')
-            
-            # Color coding: Green for ByteTrack, Blue for DeepSORT
-            if source == 'bytetrack':
-                color = (0, 255, 0)  # Green for ByteTrack
-            elif source == 'deepsort':
-                color = (255, 165, 0)  # Orange for DeepSORT
-            else:
-                color = (255, 255, 255)  # White for unknown
-            
-            # Draw bounding box with clean line
-            cv2.rectangle(annotated, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 2)
-            
-            # Get global ID and name if available
-            global_id = global_mapping.get(track_id)
-            label = None
-            
-            if global_id and room_id and self.global_tracker:
-                # Try to get person info from global tracker
-                person_info = self.global_tracker.get_person_info(room_id, global_id)
-                if person_info and person_info.get('name'):
-                    label = person_info['name']
-            
-            # Fallback to track ID if no name
-            if not label:
-                try:
-                    if isinstance(track_id, str):
-                        if track_id.startswith("ds_"):
-                            abs_track_id = track_id[3:]
-                        else:
-                            abs_track_id = track_id
-                    else:
-                        abs_track_id = abs(int(track_id))
-                except (ValueError, TypeError):
-                    abs_track_id = "?"
-                
-                if global_id:
-                    label = f"Person {global_id}"
-                else:
-                    label = f"#{abs_track_id}"
-            
-            # Draw label above bounding box
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.6
-            thickness = 2
-            (label_width, label_height), baseline = cv2.getTextSize(label, font, font_scale, thickness)
-            
-            # Position label above box
-            label_y = bbox[1] - 8
-            if label_y < label_height + 5:
-                label_y = bbox[1] + label_height + 8
-            
-            # Draw label background (semi-transparent)
-            cv2.rectangle(annotated, 
-                         (bbox[0], label_y - label_height - 5),
-                         (bbox[0] + label_width + 10, label_y + 3),
-                         color, -1)
-            
-            # Draw label text in black for contrast
-            cv2.putText(annotated, label, (bbox[0] + 5, label_y - 1),
-                       font, font_scale, (0, 0, 0), thickness)
+        # Tracks are in detection-frame pixels - rescale when drawing on a different stream
+        frame_size = self.camera_tracks[camera_id].get('frame_size')
+        if frame_size and frame_size != (frame.shape[1], frame.shape[0]):
+            tracks = self._scale_tracks(tracks, frame.shape[1] / frame_size[0], frame.shape[0] / frame_size[1])
         
-        return annotated
+        # Color coding (green ByteTrack / orange DeepSORT) and label sprites live in the renderer
+        return self.renderer.render(
+            frame, tracks,
+            lambda track_id, track_data: self._track_label(track_id, global_mapping.get(track_id), room_id)
+        )
+    
+    @staticmethod
+    def _scale_tracks(tracks: Dict, scale_x: float, scale_y: float) -> Dict:
+        """Copy of tracks with boxes mapped into another frame size"""
+        return {
+            track_id: {
+                **track_data,
+                'bbox': [int(track_data['bbox'][0] * scale_x), int(track_data['bbox'][1] * scale_y),
+                         int(track_data['bbox'][2] * scale_x), int(track_data['bbox'][3] * scale_y)]
+            }
+            for track_id, track_data in tracks.items()
+        }
+    
+    def _track_label(self, track_id, global_id, room_id) -> str:
+        """Overlay label for a track: person name, global ID, or local ID"""
+        if global_id and room_id and self.global_tracker:
+            # Try to get person info from global tracker
+            person_info = self.global_tracker.get_person_info(room_id, global_id)
+            if person_info and person_info.get('name'):
+                return person_info['name']
+        
+        # Fallback to track ID if no name
+        if global_id:
+            return f"Person {global_id}"
+        
+        try:
+            if isinstance(track_id, str):
+                abs_track_id = track_id[3:] if track_id.startswith("ds_") else track_id
+            else:
+                abs_track_id = abs(int(track_id))
+        except (ValueError, TypeError):
+            abs_track_id = "?"
+        return f"#{abs_track_id}"
     
     def get_annotated_frame(self, camera_id: int) -> Tuple[bool, np.ndarray]:
         """
@@ -415,40 +391,123 @@ class PeopleDetector:
         return True, last_frame
 
 
+class MainStreamViewer:
+    """
+    On-demand reader for a camera's main (high-resolution) stream
+    - Opened only when a visualization client asks for a frame, closed after idle_timeout
+    - Detection never touches it: boxes come from the sub-stream and are rescaled at draw time
+    """
+    
+    def __init__(self, camera_id: int, rtsp_url: str, idle_timeout: float = 10.0, retry_delay: float = 5.0):
+        """
+        Initialize main-stream viewer
+        
+        Args:
+            camera_id: Camera identifier
+            rtsp_url: Main stream RTSP URL
+            idle_timeout: Seconds without requests before the stream is closed
+            retry_delay: Seconds to wait before reopening a stream that failed
+        """
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.idle_timeout = idle_timeout
+        self.retry_delay = retry_delay
+        
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.frame = None
+        self.last_request = 0.0
+        self.retry_after = 0.0
+    
+    def get_frame(self):
+        """
+        Latest main-stream frame, opening the stream if nobody was watching
+        
+        Returns:
+            Frame, or None until the first main-stream frame has been decoded
+        """
+        now = time.time()
+        self.last_request = now
+        with self.lock:
+            if (self.thread is None or not self.thread.is_alive()) and now >= self.retry_after:
+                self.running = True
+                self.thread = threading.Thread(target=self._read_stream, daemon=True)
+                self.thread.start()
+            return self.frame
+    
+    def stop(self):
+        """Close the stream (if open)"""
+        self.running = False
+    
+    def _read_stream(self):
+        """Decode the main stream while viewers keep asking for frames"""
+        cap = cv2.VideoCapture(self.rtsp_url)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
+        if not cap.isOpened():
+            print(f"❌ Failed to open main stream for camera {self.camera_id}")
+            self.retry_after = time.time() + self.retry_delay
+            return
+        
+        print(f"🖥️ Main stream opened for viewers on camera {self.camera_id}")
+        
+        while self.running and time.time() - self.last_request < self.idle_timeout:
+            ret, frame = cap.read()
+            if not ret:
+                print(f"⚠️ Failed to read main stream from camera {self.camera_id}")
+                self.retry_after = time.time() + self.retry_delay
+                break
+            with self.lock:
+                self.frame = frame
+        
+        cap.release()
+        with self.lock:
+            self.frame = None  # Never show a stale main frame when the stream reopens
+        print(f"🖥️ Main stream closed on camera {self.camera_id} (no viewers)")
+
+
 class RTSPPeopleCounter:
     """
     Real-time people counter for RTSP streams at 30 FPS
     """
     
-    def __init__(self, detector: PeopleDetector, process_fps: int = 30):
+    def __init__(self, detector: PeopleDetector, process_fps: int = 30, view_idle_timeout: float = 10.0):
         """
         Initialize RTSP people counter with 30 FPS processing
         
         Args:
             detector: PeopleDetector instance
             process_fps: Frames per second to process (30 FPS for ByteTrack)
+            view_idle_timeout: Seconds a main stream stays open after the last visualization request
         """
         self.detector = detector
         self.process_fps = process_fps
         self.frame_interval = 1.0 / process_fps
+        self.view_idle_timeout = view_idle_timeout
         
         self.streams = {}
         self.running = {}
+        self.viewers = {}  # camera_id -> MainStreamViewer (dual-stream cameras only)
         
         print(f"📹 RTSPPeopleCounter initialized at {process_fps} FPS")
     
-    def start_stream(self, camera_id: int, rtsp_url: str):
+    def start_stream(self, camera_id: int, rtsp_url: str, view_url: str = None):
         """
         Start processing an RTSP stream
         
         Args:
             camera_id: Camera identifier
-            rtsp_url: RTSP stream URL
+            rtsp_url: RTSP stream URL used for detection (the sub-stream in dual-stream mode)
+            view_url: Optional higher-resolution stream for visualization, opened only on demand
         """
         if camera_id in self.running and self.running[camera_id]:
             print(f"Camera {camera_id} already running")
             return
         
+        if view_url and view_url != rtsp_url:
+            self.viewers[camera_id] = MainStreamViewer(camera_id, view_url, idle_timeout=self.view_idle_timeout)
+        
         self.running[camera_id] = True
         thread = threading.Thread(
             target=self._process_stream,
@@ -457,7 +516,8 @@ class RTSPPeopleCounter:
         )
         thread.start()
         self.streams[camera_id] = thread
-        print(f"✅ Started people detection on camera {camera_id}")
+        print(f"✅ Started people detection on camera {camera_id}"
+              f"{' (sub-stream, main stream on demand)' if camera_id in self.viewers else ''}")
     
     def stop_stream(self, camera_id: int):
         """
@@ -466,10 +526,30 @@ class RTSPPeopleCounter:
         Args:
             camera_id: Camera identifier
         """
+        viewer = self.viewers.pop(camera_id, None)
+        if viewer:
+            viewer.stop()
         if camera_id in self.running:
             self.running[camera_id] = False
             print(f"⏹️ Stopped people detection on camera {camera_id}")
     
+    def get_view_frame(self, camera_id: int):
+        """
+        Frame to draw tracks on for visualization
+        
+        Args:
+            camera_id: Camera identifier
+            
+        Returns:
+            Main-stream frame when available (dual-stream), otherwise the last detection frame
+        """
+        viewer = self.viewers.get(camera_id)
+        if viewer:
+            frame = viewer.get_frame()
+            if frame is not None:
+                return frame
+        return self.detector.camera_tracks[camera_id].get('last_frame', None)
+    
     def _process_stream(self, camera_id: int, rtsp_url: str):
         """
         Process RTSP stream at 30 FPS with ByteTrack + DeepSORT
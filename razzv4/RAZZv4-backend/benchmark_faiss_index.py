@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark: FAISS index types for the person Re-ID gallery
+Compares recall@k against the exact flat index and p50/p99 single-query latency of
+flat / ivf / ivfpq / hnsw so each deployment can pick FAISS_INDEX_TYPE for its gallery size.
+
+Galleries are either synthetic (clustered unit vectors: several sightings per person) or the
+real embeddings stored in detected_persons. Queries are gallery vectors with added noise,
+like a new crop of a known person.
+
+Usage:
+    python benchmark_faiss_index.py --synthetic 100000
+    python benchmark_faiss_index.py --from-db --types flat hnsw --ef-search 32 64 128
+    python benchmark_faiss_index.py --synthetic 200000 --types ivf ivfpq --nprobe 8 16 32
+"""
+
+import argparse
+import statistics
+import time
+from typing import Dict, List, Optional
+import numpy as np
+
+from config import get_settings
+from services.faiss_index_service import FAISSIndexService
+
+settings = get_settings()
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype('float32')
+
+
+def synthetic_gallery(size: int, dim: int, sightings: int, spread: float, seed: int) -> np.ndarray:
+    """Unit vectors clustered around one center per person (sightings per person)"""
+    rng = np.random.default_rng(seed)
+    persons = max(1, size // sightings)
+    centers = normalize(rng.standard_normal((persons, dim)))
+    owners = rng.integers(0, persons, size)
+    return normalize(centers[owners] + spread * rng.standard_normal((size, dim)) / np.sqrt(dim))
+
+
+def database_gallery() -> np.ndarray:
+    """Embeddings stored in detected_persons"""
+    from database import SessionLocal
+    from models import DetectedPerson
+
+    db = SessionLocal()
+    try:
+        rows = db.query(DetectedPerson.face_embedding).filter(DetectedPerson.face_embedding.isnot(None)).all()
+    finally:
+        db.close()
+    if not rows:
+        raise SystemExit("No embeddings in detected_persons - use --synthetic instead")
+    return normalize(np.stack([np.asarray(embedding, dtype='float32') for (embedding,) in rows]))
+
+
+def build(index_type: str, gallery: np.ndarray, options: Dict) -> (FAISSIndexService, float):
+    """Build a service of this type over the gallery (IDs = row numbers)"""
+    start = time.perf_counter()
+    service = FAISSIndexService(embedding_dim=gallery.shape[1], index_type=index_type,
+                                train_min_size=min(settings.FAISS_TRAIN_MIN_SIZE, len(gallery)), **options)
+    service.rebuild_index(dict(enumerate(gallery)))
+    return service, time.perf_counter() - start
+
+
+def run_queries(service: FAISSIndexService, queries: np.ndarray, k: int) -> (List[List[int]], List[float]):
+    """Single-query searches through the service (what the tracker does per embedding)"""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        matches = service.search(query, k=k, threshold=-1.0)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([global_id for global_id, _ in matches])
+    return results, latencies
+
+
+def recall_at_k(results: List[List[int]], truth: List[List[int]], k: int) -> float:
+    """Fraction of the exact top-k found by the approximate top-k"""
+    found = sum(len(set(r[:k]) & set(t[:k])) for r, t in zip(results, truth))
+    return found / max(1, sum(len(t[:k]) for t in truth))
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def report(label: str, service: FAISSIndexService, build_seconds: float, results, latencies,
+           truth: Optional[List[List[int]]], k: int):
+    recall = recall_at_k(results, truth, k) if truth is not None else 1.0
+    stats = service.get_stats()
+    print(f"{label:<28}{stats['active_type']:>8}{build_seconds:>9.1f}{recall:>10.3f}"
+          f"{statistics.median(latencies):>9.3f}{percentile(latencies, 0.99):>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types for the Re-ID gallery")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--synthetic', type=int, help="Synthetic gallery size")
+    source.add_argument('--from-db', action='store_true', help="Use embeddings stored in detected_persons")
+    parser.add_argument('--types', nargs='+', default=['flat', 'ivf', 'ivfpq', 'hnsw'], help="Index types to compare")
+    parser.add_argument('--queries', type=int, default=1000, help="Queries to run")
+    parser.add_argument('--k', type=int, default=5, help="Neighbors per query (the tracker uses 5)")
+    parser.add_argument('--noise', type=float, default=0.3, help="Query noise relative to a gallery vector")
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[settings.FAISS_IVF_NPROBE], help="IVF nprobe values")
+    parser.add_argument('--nlist', type=int, default=settings.FAISS_IVF_NLIST, help="IVF cells (0 = 4*sqrt(N))")
+    parser.add_argument('--pq-m', type=int, default=settings.FAISS_PQ_M, help="IVF-PQ sub-quantizers")
+    parser.add_argument('--hnsw-m', type=int, default=settings.FAISS_HNSW_M, help="HNSW neighbors per node")
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[settings.FAISS_HNSW_EF_SEARCH], help="HNSW efSearch values")
+    parser.add_argument('--sightings', type=int, default=10, help="Synthetic sightings per person")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    gallery = synthetic_gallery(args.synthetic, 512, args.sightings, 0.5, args.seed) if args.synthetic else database_gallery()
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, len(gallery), args.queries)
+    queries = normalize(gallery[picks] + args.noise * rng.standard_normal((args.queries, gallery.shape[1])) / np.sqrt(gallery.shape[1]))
+    print(f"Gallery: {len(gallery)} embeddings ({'synthetic' if args.synthetic else 'detected_persons'}), "
+          f"{args.queries} queries, k={args.k}\n")
+
+    # Exact results are the recall reference
+    flat, flat_build = build('flat', gallery, {})
+    truth, flat_latencies = run_queries(flat, queries, args.k)
+
+    print(f"{'index':<28}{'active':>8}{'build s':>9}{'recall@k':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for index_type in args.types:
+        if index_type == 'flat':
+            report('flat', flat, flat_build, truth, flat_latencies, None, args.k)
+        elif index_type in ('ivf', 'ivfpq'):
+            service, seconds = build(index_type, gallery, {'nlist': args.nlist, 'pq_m': args.pq_m})
+            for nprobe in args.nprobe:
+                service.faiss.extract_index_ivf(service.index).nprobe = nprobe
+                results, latencies = run_queries(service, queries, args.k)
+                report(f"{index_type} nprobe={nprobe}", service, seconds, results, latencies, truth, args.k)
+        elif index_type == 'hnsw':
+            service, seconds = build(index_type, gallery, {'hnsw_m': args.hnsw_m})
+            for ef_search in args.ef_search:
+                service.index.hnsw.efSearch = ef_search
+                results, latencies = run_queries(service, queries, args.k)
+                report(f"hnsw M={args.hnsw_m} ef={ef_search}", service, seconds, results, latencies, truth, args.k)
+        else:
+            print(f"⚠️  Unknown index type {index_type}")
+
+
+if __name__ == "__main__":
+    main()
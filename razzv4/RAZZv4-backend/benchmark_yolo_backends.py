@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark: YOLO inference backends on a replayed clip
+Compares latency and person mAP of PyTorch / ONNX Runtime / OpenVINO (fp32 + int8)
+so each site can pick YOLO_DEVICE for its hardware.
+
+Ground truth is either YOLO-format label files (--labels) or pseudo-labels from a
+reference backend/model (default: PyTorch fp32 of the same weights).
+
+Usage:
+    python benchmark_yolo_backends.py --clip recordings/vault1.mp4
+    python benchmark_yolo_backends.py --clip frames/ --backends cpu onnx openvino-int8 --reference-model yolo11x.pt
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+from config import get_settings
+from services.model_export import iter_source_frames
+from services.yolo_service import YOLOService
+
+settings = get_settings()
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def average_precision(predictions: List[np.ndarray], ground_truth: List[np.ndarray], iou_threshold: float) -> float:
+    """
+    Single-class COCO-style AP (101-point interpolation)
+
+    Args:
+        predictions: Per frame (N, 5) arrays of [x1, y1, x2, y2, confidence]
+        ground_truth: Per frame (M, 4) arrays of xyxy boxes
+        iou_threshold: IoU needed for a true positive
+    """
+    total_gt = sum(len(gt) for gt in ground_truth)
+    if total_gt == 0:
+        return float('nan')
+
+    scores, hits = [], []
+    for preds, gt in zip(predictions, ground_truth):
+        if len(preds) == 0:
+            continue
+        preds = preds[np.argsort(-preds[:, 4])]
+        ious = box_iou(preds[:, :4], gt)
+        matched = np.zeros(len(gt), dtype=bool)
+        for i in range(len(preds)):
+            scores.append(preds[i, 4])
+            if len(gt) == 0:
+                hits.append(False)
+                continue
+            candidates = np.where((ious[i] >= iou_threshold) & ~matched)[0]
+            if len(candidates):
+                matched[candidates[np.argmax(ious[i, candidates])]] = True
+                hits.append(True)
+            else:
+                hits.append(False)
+
+    if not scores:
+        return 0.0
+    order = np.argsort(-np.asarray(scores))
+    tp = np.cumsum(np.asarray(hits)[order])
+    fp = np.cumsum(~np.asarray(hits)[order])
+    recall = tp / total_gt
+    precision = tp / np.maximum(tp + fp, 1e-9)
+
+    # Precision envelope, sampled at 101 recall points
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    recall_points = np.linspace(0, 1, 101)
+    indices = np.searchsorted(recall, recall_points, side='left')
+    return float(np.mean([precision[i] if i < len(precision) else 0.0 for i in indices]))
+
+
+def to_array(detections_sv) -> np.ndarray:
+    """supervision Detections -> (N, 5) [x1, y1, x2, y2, confidence]"""
+    if len(detections_sv) == 0:
+        return np.zeros((0, 5))
+    return np.hstack([detections_sv.xyxy, detections_sv.confidence[:, None]])
+
+
+def load_yolo_labels(labels_dir: str, frames: List[np.ndarray]) -> List[np.ndarray]:
+    """Read <index:06d>.txt YOLO labels (class cx cy w h, normalized) for each sampled frame"""
+    ground_truth = []
+    for index, frame in enumerate(frames):
+        path = Path(labels_dir) / f"{index:06d}.txt"
+        h, w = frame.shape[:2]
+        boxes = []
+        if path.exists():
+            for line in path.read_text().splitlines():
+                parts = line.split()
+                if len(parts) >= 5 and int(parts[0]) == 0:
+                    cx, cy, bw, bh = (float(v) for v in parts[1:5])
+                    boxes.append([(cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h])
+        ground_truth.append(np.asarray(boxes).reshape(-1, 4))
+    return ground_truth
+
+
+def run_backend(model: str, device: str, frames: List[np.ndarray], batch: int, warmup: int,
+                eval_conf: float) -> Optional[Dict]:
+    """Time production-confidence inference, then collect low-confidence predictions for mAP"""
+    try:
+        service = YOLOService(model, device=device)
+    except Exception as e:
+        print(f"  ⚠️  {device}: could not load ({e})")
+        return None
+
+    batches = [frames[i:i + batch] for i in range(0, len(frames), batch)]
+    for chunk in batches[:warmup]:
+        service.detect_people_batch(chunk)
+
+    latencies = []
+    for chunk in batches:
+        start = time.perf_counter()
+        service.detect_people_batch(chunk)
+        latencies.append((time.perf_counter() - start) * 1000 / len(chunk))
+
+    service.confidence_threshold = eval_conf
+    predictions = []
+    for chunk in batches:
+        predictions.extend(to_array(result[2]) for result in service.detect_people_batch(chunk))
+
+    latencies.sort()
+    return {
+        'device': device,
+        'model': service.model_path,
+        'mean_ms': statistics.mean(latencies),
+        'p50_ms': latencies[len(latencies) // 2],
+        'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        'predictions': predictions
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO inference backends on a replayed clip")
+    parser.add_argument('--clip', required=True, help="Video file, RTSP URL or directory of frames")
+    parser.add_argument('--model', default=settings.YOLO_MODEL, help="Source .pt weights")
+    parser.add_argument('--backends', nargs='+', default=['cpu', 'onnx', 'onnx-int8', 'openvino', 'openvino-int8'],
+                        help="YOLO_DEVICE values to compare")
+    parser.add_argument('--frames', type=int, default=300, help="Frames to replay")
+    parser.add_argument('--stride', type=int, default=1, help="Keep every Nth frame of the clip")
+    parser.add_argument('--batch', type=int, default=1, help="Frames per predict call (cameras per batch)")
+    parser.add_argument('--warmup', type=int, default=5, help="Untimed warmup batches")
+    parser.add_argument('--labels', help="Directory of YOLO-format labels (<index:06d>.txt) - real ground truth")
+    parser.add_argument('--reference', default='cpu', help="Backend producing pseudo ground truth when --labels is absent")
+    parser.add_argument('--reference-model', help="Stronger weights for pseudo ground truth (e.g. yolo11x.pt)")
+    parser.add_argument('--gt-conf', type=float, default=0.25, help="Confidence cut for pseudo ground truth")
+    parser.add_argument('--eval-conf', type=float, default=0.001, help="Confidence threshold for mAP predictions")
+    args = parser.parse_args()
+
+    frames = list(iter_source_frames(args.clip, args.frames, stride=args.stride))
+    if not frames:
+        raise SystemExit(f"No frames could be read from {args.clip}")
+    print(f"Replaying {len(frames)} frames from {args.clip} (batch={args.batch})")
+
+    results = []
+    for device in args.backends:
+        print(f"▶ {device}")
+        result = run_backend(args.model, device, frames, args.batch, args.warmup, args.eval_conf)
+        if result:
+            results.append(result)
+
+    if args.labels:
+        ground_truth = load_yolo_labels(args.labels, frames)
+        gt_source = f"labels in {args.labels}"
+    else:
+        reference = next((r for r in results if r['device'] == args.reference and not args.reference_model), None)
+        if reference is None:
+            reference = run_backend(args.reference_model or args.model, args.reference, frames, args.batch, 0, args.eval_conf)
+        if reference is None:
+            raise SystemExit("Reference backend failed to load - pass --labels instead")
+        ground_truth = [p[p[:, 4] >= args.gt_conf, :4] for p in reference['predictions']]
+        gt_source = f"pseudo-labels from {reference['model']} ({args.reference}, conf>={args.gt_conf})"
+
+    print(f"\nGround truth: {gt_source}, {sum(len(g) for g in ground_truth)} person boxes\n")
+    print(f"{'backend':<16}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'FPS':>8}{'mAP50':>9}{'mAP50-95':>10}  model")
+    for result in results:
+        aps = [average_precision(result['predictions'], ground_truth, t) for t in IOU_THRESHOLDS]
+        print(f"{result['device']:<16}{result['mean_ms']:>10.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{1000 / result['mean_ms']:>8.1f}{aps[0]:>9.3f}{np.mean(aps):>10.3f}  {result['model']}")
+
+
+if __name__ == "__main__":
+    main()
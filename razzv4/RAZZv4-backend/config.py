@@ -33,18 +33,87 @@ class Settings(BaseSettings):
     # YOLO Detection
     YOLO_MODEL: str = "yolo11m.pt"
     YOLO_CONFIDENCE: float = 0.5
-    YOLO_DEVICE: str = "auto"  # auto, cuda, cpu
+    YOLO_DEVICE: str = "auto"  # auto, cuda, cpu, onnx, onnx-int8, openvino, openvino-int8
+    YOLO_IMGSZ: int = 640  # Inference (and export) input size
+    YOLO_EXPORT_DIR: str = "models/exported"  # Cache for exported ONNX/OpenVINO models
+    YOLO_INT8_CALIBRATION_SOURCE: Optional[str] = None  # Video, RTSP URL or image dir from our cameras
+    YOLO_INT8_CALIBRATION_FRAMES: int = 300
+    
+    # Batched Inference (cross-camera scheduler)
+    INFERENCE_BATCHING_ENABLED: bool = True
+    INFERENCE_MAX_BATCH_SIZE: int = 16  # Max frames per predict call
+    INFERENCE_MAX_WAIT_MS: float = 15.0  # Max time the oldest frame waits for a batch to fill
+    
+    # Region of Interest (crops before detection)
+    ROI_ENABLED: bool = True  # Crops to Camera.detection_roi / zone imagePoints; cameras without either use the full frame
+    ROI_MARGIN: float = 0.05  # Padding around each zone region (fraction of frame size)
+    ROI_MIN_SAVING: float = 0.15  # Only crop when it removes at least this fraction of pixels
+    ROI_REFRESH_INTERVAL: float = 30.0  # Seconds between reloads of a camera's detection regions
     
     # Tracking
     BYTETRACK_THRESHOLD: float = 0.6
     DEEPSORT_MAX_AGE: int = 30
     DEEPSORT_APPEARANCE_THRESHOLD: float = 0.3
+    TRACKING_PREDICT_MODE: str = "motion"  # motion, optical_flow (used between YOLO detections)
+    TRACKING_MAX_PREDICT_SECONDS: float = 0.5  # Max extrapolation from the last detection
     
     # Global ID System
     GLOBAL_ID_TIMEOUT: float = 30.0  # seconds
     GLOBAL_ID_SIMILARITY_THRESHOLD: float = 0.5
     GLOBAL_ID_FEATURE_SMOOTHING: float = 0.7  # Running average: 70% old, 30% new
     
+    # Re-ID Worker (batched OSNet embeddings off the tracking loop)
+    REID_WORKER_ENABLED: bool = True
+    REID_MAX_BATCH_SIZE: int = 32  # Max crops per OSNet forward pass
+    REID_MAX_WAIT_MS: float = 10.0  # Max time the oldest crop waits for a batch to fill
+    REID_QUEUE_SIZE: int = 256  # Crops waiting before new ones are dropped (retried on later ticks)
+    REID_MAX_CROPS_PER_TICK: int = 4  # New crops a camera may queue per tracking tick
+    REID_REFRESH_SECONDS: float = 2.0  # Re-embed a live track this often (multi-shot gallery)
+    REID_GALLERY_SIZE: int = 8  # Appearance shots kept per person
+    REID_GALLERY_MAX_SIMILARITY: float = 0.9  # Shots at least this similar count as the same view
+    REID_COLD_TIER_SIZE: int = 10000  # Demoted persons kept for FAISS matching (older ones go to the database lookup)
+    
+    # Cold Gallery (pgvector lookup of persons no longer in memory, off the frame path)
+    COLD_GALLERY_ENABLED: bool = True
+    COLD_GALLERY_MAX_BATCH_SIZE: int = 32  # Max embeddings per SQL round trip
+    COLD_GALLERY_MAX_WAIT_MS: float = 50.0  # Max time the oldest embedding waits for a batch to fill
+    COLD_GALLERY_NEGATIVE_TTL: float = 30.0  # Seconds a track with no database match is not re-queried
+    
+    # FAISS Index
+    FAISS_INDEX_TYPE: str = "flat"  # flat (exact), ivf, ivfpq or hnsw - see benchmark_faiss_index.py
+    FAISS_IVF_NLIST: int = 0  # IVF cells (0 = 4 * sqrt(N) at training time)
+    FAISS_IVF_NPROBE: int = 16  # IVF cells visited per search (recall vs latency)
+    FAISS_PQ_M: int = 64  # IVF-PQ sub-quantizers (must divide 512)
+    FAISS_HNSW_M: int = 32  # HNSW neighbors per node
+    FAISS_HNSW_EF_SEARCH: int = 64  # HNSW search breadth (recall vs latency)
+    FAISS_HNSW_EF_CONSTRUCTION: int = 80  # HNSW build breadth
+    FAISS_TRAIN_MIN_SIZE: int = 5000  # IVF types use the exact flat index until this many embeddings exist
+    FAISS_COMPACT_TOMBSTONE_RATIO: float = 0.25  # Compact append-only (GPU) indexes past this tombstone fraction
+    FAISS_SNAPSHOT_PATH: str = "data/faiss/persons.index"  # Index snapshot (+ .json sidecar); empty disables
+    FAISS_SNAPSHOT_INTERVAL: float = 300.0  # Seconds between snapshots (also written at shutdown)
+    
+    # Re-ID Partitions (per-room galleries searched before the global index)
+    REID_PARTITIONS_ENABLED: bool = True
+    REID_PARTITION_WINDOW: float = 300.0  # Seconds a person stays a candidate in a room after leaving it
+    REID_CAMERA_ADJACENCY: str = ""  # JSON {"camera_id": [adjacent camera ids]}; their rooms are searched too
+    
+    # Event Logging (write-behind tracking_events writer)
+    EVENTS_ENABLED: bool = True  # Global tracker emits entry / motion / exit events per vault room
+    EVENT_MOTION_INTERVAL: float = 10.0  # Seconds between motion (dwell) events of one person in one room
+    EVENT_EXIT_TIMEOUT: float = 10.0  # Seconds unseen in a room before an exit event
+    EVENT_BATCH_SIZE: int = 500  # Max events per database round trip
+    EVENT_FLUSH_INTERVAL: float = 1.0  # Seconds a queued event waits at most before being written
+    EVENT_QUEUE_SIZE: int = 10000  # Events held in memory before new ones spill to disk
+    EVENT_SPILL_DIR: str = "data/events"  # Append-only segment files used while the database is unreachable
+    EVENT_RETRY_INTERVAL: float = 5.0  # Seconds between database retries after a failed write
+    EVENT_SPILL_SEGMENT_EVENTS: int = 10000  # Events per spill segment (replayed in one round trip)
+    
+    # Occupancy Counts (coalesced camera / room people counts)
+    OCCUPANCY_FLUSH_INTERVAL_MS: float = 500.0  # Changed counts are written at most this often (one UPDATE per table)
+    OCCUPANCY_READ_MODEL_INTERVAL_MS: float = 500.0  # Live room views served to dashboards are rebuilt this often
+    OCCUPANCY_METADATA_REFRESH: float = 30.0  # Seconds between room / camera reloads (aggregator mapping and views)
+    OCCUPANCY_VOLATILE_REFRESH: float = 5.0  # Seconds between view versions that only move boxes / last-seen times
+    
     # Deduplication
     DEDUP_SIMILARITY_THRESHOLD: float = 0.5
     DEDUP_DISTANCE_THRESHOLD: int = 300  # pixels
@@ -53,6 +122,26 @@ class Settings(BaseSettings):
     CAMERA_RECONNECT_DELAY: int = 5  # seconds
     CAMERA_FPS: int = 15
     
+    # Camera Worker Processes (0 = all cameras run as threads in the API process)
+    CAMERA_WORKER_PROCESSES: int = 0
+    CAMERA_WORKER_MAX_FRAME_WIDTH: int = 1920  # Shared-memory frame slot size
+    CAMERA_WORKER_MAX_FRAME_HEIGHT: int = 1080
+    CAMERA_WORKER_RING_SLOTS: int = 3  # Frame slots per camera ring buffer
+    
+    # Streaming (encode-once JPEG cache)
+    STREAM_JPEG_QUALITY: int = 70  # MJPEG stream default
+    SNAPSHOT_JPEG_QUALITY: int = 85  # tracking-frame snapshot
+    STREAM_IDLE_TIMEOUT: float = 1.0  # Seconds a viewer waits for a new frame before re-checking
+    
+    # Adaptive Detection Rate (per-camera motion gate)
+    ADAPTIVE_DETECTION_ENABLED: bool = True
+    DETECTION_ACTIVE_FPS: float = 15.0  # YOLO rate while something moves or is tracked
+    DETECTION_IDLE_FPS: float = 1.0  # YOLO rate for empty, static scenes
+    MOTION_GATE_FPS: float = 10.0  # Frame polling rate for the motion gate while idle
+    MOTION_GATE_THRESHOLD: float = 0.005  # Fraction of thumbnail pixels that must change
+    MOTION_GATE_FLAT_STD: float = 0.1  # Thumbnail std below which a frame is a blank decoder frame (0 = off)
+    MOTION_HOLD_SECONDS: float = 2.0  # Keep full rate this long after the last motion
+    
     # Face Recognition
     FACE_RECOGNITION_ENABLED: bool = True
     FACE_RECOGNITION_TOLERANCE: float = 0.6
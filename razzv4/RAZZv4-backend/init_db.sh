@@ -5,3 +5,6 @@ source .venv/bin/activate
 
 # Initialize database
 python init_db.py
+
+# Columns added after the first release (idempotent)
+python migrate_add_camera_detection_roi.py
@@ -19,6 +19,8 @@ from routes.vault_rooms import router as vault_rooms_router
 from services.yolo_service import YOLOService
 from services.tracking_service import TrackingService
 from services.camera_service import CameraService
+from services.event_logger import get_event_logger, shutdown_event_logger
+from services.occupancy_read_model import OccupancyReadModel
 from database import SessionLocal
 
 # Configure centralized logging and settings
@@ -34,6 +36,7 @@ settings = get_settings()
 yolo_service = None
 tracking_service = None
 camera_service = None
+occupancy_read_model = None
 
 
 @asynccontextmanager
@@ -42,14 +45,18 @@ async def lifespan(app: FastAPI):
     Lifespan context manager for startup and shutdown events
     """
     # Startup
-    global yolo_service, tracking_service, camera_service
+    global yolo_service, tracking_service, camera_service, occupancy_read_model
     
     logger.info("Starting RAZZv4 Backend...")
     
     try:
         # Initialize YOLO service from config (uses .env settings)
-        logger.info(f"Initializing YOLO11 service with {settings.YOLO_MODEL}...")
-        yolo_service = YOLOService()  # Uses config defaults
+        # Camera worker processes load their own model, so the API process skips it
+        if settings.CAMERA_WORKER_PROCESSES > 0:
+            logger.info(f"Using {settings.CAMERA_WORKER_PROCESSES} camera worker processes (YOLO loads in workers)")
+        else:
+            logger.info(f"Initializing YOLO11 service with {settings.YOLO_MODEL}...")
+            yolo_service = YOLOService()  # Uses config defaults
         
         # Initialize tracking service (BRINKSv2 style: ByteTrack + DeepSORT)
         # No args needed - it creates trackers per camera automatically
@@ -64,6 +71,10 @@ async def lifespan(app: FastAPI):
         logger.info("Starting camera monitoring...")
         camera_service.start_all_cameras()
         
+        # Live occupancy views for the vault_rooms polling routes
+        occupancy_read_model = OccupancyReadModel(camera_service, tracking_service, SessionLocal)
+        occupancy_read_model.start()
+        
         logger.info("RAZZv4 Backend started successfully!")
         
     except Exception as e:
@@ -74,8 +85,13 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down RAZZv4 Backend...")
+    if occupancy_read_model:
+        occupancy_read_model.stop()
     if camera_service:
         camera_service.stop_all_cameras()
+    if tracking_service:
+        tracking_service.global_tracker.shutdown()  # Final database sync + FAISS snapshot
+    shutdown_event_logger()  # Queued tracking events are written (or spilled) before exit
     logger.info("RAZZv4 Backend stopped successfully!")
 
 
@@ -99,11 +115,14 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # MJPEG Streaming Endpoint - Real-time with tracking visualization!
 @app.get("/camera/{camera_id}/stream")
-async def camera_mjpeg_stream(camera_id: int, fps: int = 30):
+async def camera_mjpeg_stream(camera_id: int, fps: int = 30, quality: int = None, scale: float = 1.0):
     """
     MJPEG stream endpoint for real-time camera streaming with tracking visualization
     Streams annotated frames with tracking boxes, IDs, and trails
     Much lower latency than WebSocket!
+    
+    Each frame is JPEG-encoded once per (quality, scale) and shared by all viewers;
+    clients block until a new frame exists instead of re-sending duplicates
     """
     if not camera_service or camera_id not in camera_service.processors:
         raise HTTPException(status_code=404, detail=f"Camera {camera_id} not found")
@@ -112,27 +131,32 @@ async def camera_mjpeg_stream(camera_id: int, fps: int = 30):
     
     def generate_mjpeg():
         """Generate MJPEG stream"""
-        frame_interval = 1.0 / min(fps, 30)  # Limit to 30 FPS max
+        frame_interval = 1.0 / min(max(fps, 1), 30)  # Limit to 30 FPS max
+        last_seq = -1
+        waiting_frame = None
         
-        while True:
+        while processor.is_running:
             start_time = time.time()
             
             try:
-                if processor.last_annotated_frame is not None:
-                    frame = processor.last_annotated_frame.copy()
+                encoded = processor.jpeg_cache.get(quality=quality, scale=scale, after_seq=last_seq,
+                                                   timeout=settings.STREAM_IDLE_TIMEOUT)
+                if encoded is not None:
+                    last_seq = encoded.seq
+                    frame_bytes = encoded.jpeg
+                elif last_seq < 0:
+                    # Waiting frame (encoded once per client)
+                    if waiting_frame is None:
+                        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+                        cv2.putText(frame, f"Waiting for camera {camera_id}...", (50, 240),
+                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+                        waiting_frame = cv2.imencode('.jpg', frame)[1].tobytes()
+                    frame_bytes = waiting_frame
                 else:
-                    # Waiting frame
-                    frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                    cv2.putText(frame, f"Waiting for camera {camera_id}...", (50, 240),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                
-                # Encode as JPEG (quality 70 for balance)
-                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                if not ret:
+                    # No new frame yet (or it could not be rendered) - pace the retry instead of spinning
+                    time.sleep(max(0, frame_interval - (time.time() - start_time)))
                     continue
                 
-                frame_bytes = buffer.tobytes()
-                
                 # Yield frame in MJPEG format
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
@@ -192,17 +216,8 @@ async def websocket_tracking_endpoint(websocket: WebSocket, camera_id: int):
     try:
         while True:
             # Send tracking data at YOLO detection rate (4-6 FPS)
-            tracks_list = []
-            
-            if processor.last_tracks:
-                for track_id, track_data in processor.last_tracks.items():
-                    tracks_list.append({
-                        "track_id": int(track_id) if isinstance(track_id, int) else str(track_id),
-                        "bbox": track_data.get("bbox", [0, 0, 0, 0]),
-                        "confidence": float(track_data.get("confidence", 0.0)),
-                        "center": track_data.get("center", [0, 0]),
-                        "source": track_data.get("source", "unknown")
-                    })
+            # (serialized once per track snapshot, shared by every client of this camera)
+            tracks_list = processor.last_tracks.to_list()
             
             tracking_data = {
                 "camera_id": camera_id,
@@ -231,6 +246,53 @@ async def websocket_tracking_endpoint(websocket: WebSocket, camera_id: int):
             pass
 
 
+# WebSocket push stream of room events (entry / motion / exit / unauthorized)
+@app.websocket("/ws/events")
+async def websocket_events_endpoint(websocket: WebSocket, room_id: int = None):
+    """
+    WebSocket endpoint that pushes tracking events as the global tracker logs them
+    (instead of polling people counts)
+    
+    Query params:
+        room_id: Only events of this vault room (all rooms if omitted)
+    
+    Data format (one message per event, same shape as the recent events API):
+    {
+        "room_id": int,
+        "camera_id": int,
+        "person_id": int | null,
+        "event_type": str,  // "entry", "exit", "motion", "unauthorized"
+        "track_id": int,
+        "confidence": float | null,
+        "bbox": {"x": int, "y": int, "w": int, "h": int} | null,
+        "metadata": {"global_id": int, "person_name": str, "dwell_seconds": float},
+        "timestamp": str
+    }
+    """
+    await websocket.accept()
+    logger.info(f"WebSocket events connection opened (room {room_id or 'all'})")
+    
+    event_logger = get_event_logger(SessionLocal)
+    queue = event_logger.subscribe(asyncio.get_running_loop())
+    
+    try:
+        while True:
+            event = await queue.get()
+            if room_id is None or event['room_id'] == room_id:
+                await websocket.send_json(event)
+    
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket events connection closed (room {room_id or 'all'})")
+    except Exception as e:
+        logger.error(f"Error in events WebSocket: {e}")
+    finally:
+        event_logger.unsubscribe(queue)
+        try:
+            await websocket.close()
+        except:
+            pass
+
+
 # Add endpoint to get service status
 @app.get("/api/services/status")
 async def get_services_status():
@@ -241,15 +303,20 @@ async def get_services_status():
         "yolo_service": {
             "initialized": yolo_service is not None,
             "model": yolo_service.model_name if yolo_service else None,
-            "device": yolo_service.device if yolo_service else None
+            "device": yolo_service.device if yolo_service else None,
+            "backend": yolo_service.backend if yolo_service else None,
+            "int8": yolo_service.int8 if yolo_service else None
         },
         "tracking_service": {
             "initialized": tracking_service is not None,
-            "statistics": tracking_service.get_statistics() if tracking_service else {}
+            "statistics": tracking_service.get_statistics() if tracking_service else {},
+            "reid_worker": tracking_service.reid_worker.get_stats() if tracking_service and tracking_service.reid_worker else None
         },
         "camera_service": {
             "initialized": camera_service is not None,
-            "active_cameras": len(camera_service.processors) if camera_service else 0
+            "active_cameras": len(camera_service.processors) if camera_service else 0,
+            "inference_scheduler": camera_service.inference_scheduler.get_stats() if camera_service and camera_service.inference_scheduler else None,
+            "workers": camera_service.worker_pool.get_stats() if camera_service and camera_service.worker_pool else None
         }
     }
 
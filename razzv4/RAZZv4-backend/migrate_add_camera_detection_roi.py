@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Migration: Add cameras.detection_roi (per-camera detection regions for ROI inference)
+"""
+
+from sqlalchemy import create_engine, text
+from config import get_settings
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+def run_migration():
+    """Add detection_roi column to cameras"""
+
+    engine = create_engine(settings.DATABASE_URL)
+
+    with engine.connect() as conn:
+        # Check if column already exists
+        result = conn.execute(text("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.columns
+                WHERE table_name = 'cameras' AND column_name = 'detection_roi'
+            );
+        """))
+
+        if result.scalar():
+            logger.info("✅ Column 'cameras.detection_roi' already exists")
+            return
+
+        logger.info("Adding 'cameras.detection_roi' column...")
+
+        # Polygons [[{x, y}, ...], ...] in normalized image coordinates; NULL = full frame
+        conn.execute(text("ALTER TABLE cameras ADD COLUMN detection_roi JSON;"))
+        conn.commit()
+
+        logger.info("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    try:
+        run_migration()
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}")
+        raise
@@ -71,6 +71,7 @@ class Camera(Base):
     position_y = Column(Integer, nullable=True)
     field_of_view = Column(Integer, default=90)  # Field of view in degrees
     direction = Column(Integer, default=0)  # Camera direction in degrees
+    detection_roi = Column(JSON, nullable=True)  # Detection regions: [[{x, y}, ...], ...] in normalized image coordinates
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
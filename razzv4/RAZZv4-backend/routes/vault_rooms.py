@@ -1,18 +1,42 @@
 from fastapi import APIRouter, HTTPException, Form, Depends, Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from sqlalchemy.orm import Session
 from database import get_db
 from models import VaultRoom, Camera
 from typing import List
 import logging
 import httpx
+from config import get_settings
+from services.occupancy_read_model import PEOPLE, PEOPLE_COUNT, TRACKING_STATS, ALL_COUNTS, invalidate_occupancy
+from services.region_of_interest import CameraROI, validate_regions
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 WEBRTC_SERVER = "http://localhost:8083"
 
 router = APIRouter(prefix="/vault-rooms", tags=["vault_rooms"])
 
+
+def _occupancy_response(request: Request, view: str, room_id: int = None) -> Response:
+    """
+    Serve a live occupancy view (no database or tracker access)
+    Answers 304 when If-None-Match carries the current ETag; the body includes "version"
+    """
+    from main import occupancy_read_model
+    if occupancy_read_model is None:
+        raise HTTPException(status_code=503, detail="Live occupancy is not available yet")
+    
+    current = occupancy_read_model.get(view, room_id)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Vault room not found")
+    
+    headers = {"ETag": current.etag, "Cache-Control": "no-cache"}
+    if current.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=current.body, media_type="application/json", headers=headers)
+
+
 @router.post("/create")
 async def create_vault_room(
     request: Request,
@@ -82,6 +106,7 @@ async def create_vault_room(
                 camera_count += 1
         
         db.commit()
+        invalidate_occupancy()
         
         print(f"DEBUG: Created {camera_count} cameras for vault room {vault_room.id}")
         print(f"DEBUG: Redirecting to /vault-room")
@@ -192,6 +217,7 @@ async def save_room_layout(
         
         db.commit()
         db.refresh(vault_room)
+        invalidate_occupancy()
         
         return {"message": "Room layout saved successfully", "room_id": vault_room.id}
         
@@ -213,6 +239,7 @@ async def delete_vault_room(room_id: int, db: Session = Depends(get_db)):
         
         db.delete(vault_room)
         db.commit()
+        invalidate_occupancy()
         
         return {"message": "Vault room deleted successfully"}
         
@@ -246,45 +273,13 @@ async def get_camera_info(camera_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{room_id}/people")
-async def get_room_people_data(room_id: int, db: Session = Depends(get_db)):
-    """Get detailed people tracking data for a vault room"""
-    try:
-        vault_room = db.query(VaultRoom).filter(VaultRoom.id == room_id).first()
-        if not vault_room:
-            raise HTTPException(status_code=404, detail="Vault room not found")
-        
-        # Import tracking service
-        from main import tracking_service
-        
-        # Get camera IDs for this room
-        camera_ids = [cam.id for cam in vault_room.cameras if cam.is_active]
-        
-        # Get people list from tracking service
-        people_list = []
-        if tracking_service:
-            raw_people = tracking_service.get_people_in_room(camera_ids)
-            # Remove numpy features for JSON serialization
-            for person in raw_people:
-                person_data = {k: v for k, v in person.items() if k != 'feature'}
-                people_list.append(person_data)
-        
-        # Count unique people based on global IDs (same person in multiple cameras = 1 person)
-        unique_global_ids = set(person['track_id'] for person in people_list)
-        
-        return {
-            "room_id": room_id,
-            "room_name": vault_room.name,
-            "current_people_count": len(unique_global_ids),  # Count unique people by global ID
-            "total_detections": len(people_list),  # Total detections across all cameras
-            "people": people_list,
-            "timestamp": __import__('time').time()
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"ERROR: Failed to get people data: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting people data: {str(e)}")
+async def get_room_people_data(room_id: int, request: Request):
+    """
+    Get detailed people tracking data for a vault room
+    Served from the live occupancy read model (ETag / If-None-Match supported)
+    """
+    return _occupancy_response(request, PEOPLE, room_id)
+
 
 @router.get("/{room_id}/cameras/webrtc")
 async def get_camera_webrtc_streams(room_id: int, db: Session = Depends(get_db)):
@@ -392,146 +387,31 @@ async def accept_webrtc_answer(
 
 
 @router.get("/{room_id}/people-count")
-async def get_room_people_count(room_id: int, db: Session = Depends(get_db)):
+async def get_room_people_count(room_id: int, request: Request):
     """
     Get current people count for a vault room
     Returns deduplicated count across all cameras from live tracking
+    Served from the live occupancy read model (ETag / If-None-Match supported)
     """
-    try:
-        vault_room = db.query(VaultRoom).filter(VaultRoom.id == room_id).first()
-        if not vault_room:
-            raise HTTPException(status_code=404, detail="Vault room not found")
-        
-        # Import camera service to get real-time counts
-        from main import camera_service, tracking_service
-        
-        # Get individual camera counts from live tracking
-        camera_counts = []
-        camera_ids = []
-        
-        for camera in vault_room.cameras:
-            if camera.is_active:
-                people_count = 0
-                
-                # Get live count from camera processor
-                if camera_service:
-                    processor = camera_service.processors.get(camera.id)
-                    if processor and processor.is_running:
-                        camera_ids.append(camera.id)
-                        # Get count from tracking service
-                        if tracking_service:
-                            cam_tracks = tracking_service.camera_tracks.get(camera.id, {})
-                            people_count = cam_tracks.get('count', 0)
-                
-                camera_counts.append({
-                    "camera_id": camera.id,
-                    "camera_name": camera.name,
-                    "people_count": people_count
-                })
-        
-        # Use deduplicated count across all cameras in the room
-        total_count = 0
-        if tracking_service and len(camera_ids) > 0:
-            people_list = tracking_service.get_people_in_room(camera_ids)
-            # Count unique people by global ID (same person in multiple cameras = 1 person)
-            unique_global_ids = set(person['track_id'] for person in people_list)
-            total_count = len(unique_global_ids)
-        
-        return {
-            "room_id": room_id,
-            "room_name": vault_room.name,
-            "total_people_count": total_count,
-            "cameras": camera_counts
-        }
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"ERROR: Failed to get people count: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting people count: {str(e)}")
+    return _occupancy_response(request, PEOPLE_COUNT, room_id)
 
 
 @router.get("/all/people-counts")
-async def get_all_rooms_people_counts(db: Session = Depends(get_db)):
+async def get_all_rooms_people_counts(request: Request):
     """
     Get people counts for all vault rooms
+    Served from the live occupancy read model (ETag / If-None-Match supported)
     """
-    try:
-        vault_rooms = db.query(VaultRoom).all()
-        
-        results = []
-        for room in vault_rooms:
-            camera_counts = []
-            for camera in room.cameras:
-                if camera.is_active:
-                    camera_counts.append({
-                        "camera_id": camera.id,
-                        "camera_name": camera.name,
-                        "people_count": camera.current_people_count or 0
-                    })
-            
-            results.append({
-                "room_id": room.id,
-                "room_name": room.name,
-                "total_people_count": room.current_people_count or 0,
-                "cameras": camera_counts
-            })
-        
-        return {"rooms": results}
-    
-    except Exception as e:
-        print(f"ERROR: Failed to get people counts: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error getting people counts: {str(e)}")
+    return _occupancy_response(request, ALL_COUNTS)
 
 
 @router.get("/{room_id}/tracking-stats")
-async def get_room_tracking_stats(room_id: int, db: Session = Depends(get_db)):
+async def get_room_tracking_stats(room_id: int, request: Request):
     """
     Get tracking statistics for cameras in a vault room
+    Served from the live occupancy read model (ETag / If-None-Match supported)
     """
-    try:
-        vault_room = db.query(VaultRoom).filter(VaultRoom.id == room_id).first()
-        if not vault_room:
-            raise HTTPException(status_code=404, detail="Vault room not found")
-        
-        # Import here to avoid circular dependency
-        from main import camera_service, tracking_service
-        
-        camera_stats = []
-        for camera in vault_room.cameras:
-            if camera.is_active and camera_service and tracking_service:
-                processor = camera_service.processors.get(camera.id)
-                if processor and processor.is_running:
-                    # Get stats from tracking service
-                    cam_tracks = tracking_service.camera_tracks.get(camera.id, {})
-                    stats = {
-                        "active_tracks": cam_tracks.get('count', 0),
-                        "bytetrack_confident": cam_tracks.get('bytetrack_confident', 0),
-                        "deepsort_assisted": cam_tracks.get('deepsort_assisted', 0),
-                        "last_update": cam_tracks.get('last_update').isoformat() if cam_tracks.get('last_update') else None
-                    }
-                    camera_stats.append({
-                        "camera_id": camera.id,
-                        "camera_name": camera.name,
-                        "tracking_enabled": True,
-                        "statistics": stats
-                    })
-                else:
-                    camera_stats.append({
-                        "camera_id": camera.id,
-                        "camera_name": camera.name,
-                        "tracking_enabled": False
-                    })
-        
-        return {
-            "room_id": room_id,
-            "room_name": vault_room.name,
-            "cameras": camera_stats
-        }
-    
-    except Exception as e:
-        logger.error(f"Error getting tracking stats: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return _occupancy_response(request, TRACKING_STATS, room_id)
 
 
 @router.get("/{room_id}/zone-statistics")
@@ -619,7 +499,6 @@ async def get_camera_tracking_frame(room_id: int, camera_id: int, db: Session =
     Returns base64-encoded JPEG image
     """
     try:
-        import cv2
         import base64
         
         vault_room = db.query(VaultRoom).filter(VaultRoom.id == room_id).first()
@@ -649,21 +528,12 @@ async def get_camera_tracking_frame(room_id: int, camera_id: int, db: Session =
             logger.warning(f"Camera {camera_id} processor exists but is not running")
             raise HTTPException(status_code=503, detail="Camera processor not running")
         
-        # Get the latest annotated frame
-        if hasattr(processor, 'last_annotated_frame') and processor.last_annotated_frame is not None:
-            frame = processor.last_annotated_frame
-            
-            logger.debug(f"Encoding tracking frame for camera {camera_id}, shape: {frame.shape}, dtype: {frame.dtype}")
-            
-            # Encode frame as JPEG
-            success, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not success:
-                logger.error(f"Failed to encode frame for camera {camera_id}")
-                raise HTTPException(status_code=500, detail="Failed to encode tracking frame")
-            
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
+        # Get the latest annotated frame (JPEG shared with the MJPEG viewers of this camera)
+        encoded = processor.jpeg_cache.get(quality=settings.SNAPSHOT_JPEG_QUALITY)
+        if encoded is not None:
+            frame_base64 = base64.b64encode(encoded.jpeg).decode('utf-8')
             
-            logger.debug(f"Successfully encoded frame for camera {camera_id}, size: {len(frame_base64)} bytes")
+            logger.debug(f"Serving tracking frame {encoded.seq} for camera {camera_id}, size: {len(frame_base64)} bytes")
             
             return {
                 "camera_id": camera_id,
@@ -752,6 +622,7 @@ async def get_room_cameras(room_id: int, db: Session = Depends(get_db)):
                 "position_y": camera.position_y,
                 "field_of_view": camera.field_of_view,
                 "direction": camera.direction,
+                "detection_roi": camera.detection_roi,
                 "is_active": camera.is_active
             } for camera in cameras
         ]
@@ -817,6 +688,80 @@ async def update_camera_position(
         raise HTTPException(status_code=500, detail=f"Error updating camera position: {str(e)}")
 
 
+def _roi_check(camera_id: int, regions: list) -> dict:
+    """
+    Crop plan the regions give on a 1920x1080 frame (margin and saving are fractions of the
+    frame, so other resolutions crop the same); 'crops' is False when the camera would
+    still run on the full frame
+    """
+    roi = CameraROI(camera_id)
+    roi.configure(None, regions)
+    pixel_ratio = roi.crop_fraction((1080, 1920))
+    return {
+        "crops": pixel_ratio < 1.0,
+        "pixel_ratio": round(pixel_ratio, 3),
+        "roi_enabled": settings.ROI_ENABLED
+    }
+
+
+@router.get("/{room_id}/cameras/{camera_id}/detection-roi")
+async def get_camera_detection_roi(room_id: int, camera_id: int, db: Session = Depends(get_db)):
+    """Get a camera's detection regions (normalized image coordinates) and the crop they give"""
+    camera = db.query(Camera).filter(Camera.id == camera_id, Camera.vault_room_id == room_id).first()
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found in this room")
+    
+    regions = camera.detection_roi or []
+    return {"camera_id": camera_id, "detection_roi": regions, **_roi_check(camera_id, regions)}
+
+
+@router.post("/{room_id}/cameras/{camera_id}/detection-roi")
+async def update_camera_detection_roi(
+    room_id: int,
+    camera_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Set the regions of a camera's image that are sent to the detector
+    Body: {"detection_roi": [[{"x": 0.1, "y": 0.2}, ...], ...]} (0-1 image coordinates, empty = full frame)
+    """
+    try:
+        data = await request.json()
+        try:
+            regions = validate_regions(data.get('detection_roi', []))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        camera = db.query(Camera).filter(
+            Camera.id == camera_id,
+            Camera.vault_room_id == room_id
+        ).first()
+        
+        if not camera:
+            raise HTTPException(status_code=404, detail="Camera not found in this room")
+        
+        camera.detection_roi = regions or None
+        db.commit()
+        
+        # Same process: apply now (worker processes pick it up within ROI_REFRESH_INTERVAL)
+        from main import camera_service
+        processor = camera_service.processors.get(camera_id) if camera_service else None
+        if processor is not None and hasattr(processor, 'reload_roi'):
+            processor.reload_roi()
+        
+        check = _roi_check(camera_id, regions)  # Logs a warning if the regions would not crop
+        logger.info(f"Updated camera {camera_id} detection regions ({len(regions)} regions)")
+        
+        return {"success": True, "camera_id": camera_id, "detection_roi": regions, **check}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating camera detection regions: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error updating camera detection regions: {str(e)}")
+
+
 @router.post("/{room_id}/cameras/{camera_id}/register-webrtc")
 async def register_camera_webrtc(
     room_id: int,
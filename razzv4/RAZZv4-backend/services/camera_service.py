@@ -6,17 +6,38 @@ Handles camera connections, frame capture, people counting with tracking
 import logging
 import threading
 import time
-from typing import Optional, Dict
-import cv2
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Optional, Dict
 import numpy as np
 from datetime import datetime
 from sqlalchemy.orm import Session
 
 from services.yolo_service import YOLOService
 from services.tracking_service import TrackingService
+from services.inference_scheduler import InferenceScheduler
+from services.frame_grabber import FrameGrabber
+from services.activity_gate import ActivityGate
+from services.frame_cache import JpegFrameCache
+from services.overlay_renderer import get_overlay_renderer
+from services.region_of_interest import CameraROI
+from services.track_state import TrackSnapshot
+from services.occupancy_aggregator import get_occupancy_aggregator
+from config import get_settings
 from models import Camera, VaultRoom
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class FrameSnapshot:
+    """Raw frame plus the tracks computed for it (rendered only when someone looks)"""
+    seq: int
+    timestamp: float
+    frame: np.ndarray
+    tracks: TrackSnapshot
+    yolo_only: bool = False
 
 
 class CameraProcessor:
@@ -25,38 +46,68 @@ class CameraProcessor:
     Captures frames, runs YOLO detection with ByteTrack tracking, updates database
     """
     
-    def __init__(self, camera_id: int, rtsp_url: str, yolo_service: YOLOService, tracking_service: 'TrackingService', db_session_factory, use_tracking: bool = True):
+    def __init__(self, camera_id: int, rtsp_url: str, yolo_service: YOLOService, tracking_service: 'TrackingService', db_session_factory, use_tracking: bool = True,
+                 inference_scheduler: Optional[InferenceScheduler] = None,
+                 count_sink: Optional[Callable[[int, int], None]] = None):
         self.camera_id = camera_id
         self.rtsp_url = rtsp_url
         self.yolo_service = yolo_service
+        self.inference_scheduler = inference_scheduler  # Shared cross-camera batcher (None = call YOLO directly)
         self.tracking_service = tracking_service
         self.db_session_factory = db_session_factory
         self.use_tracking = use_tracking
+        # Receives (camera_id, count): the shared occupancy aggregator, or the pipe to the API process (worker processes)
+        self.count_sink = count_sink or get_occupancy_aggregator(db_session_factory).report
         
         self.is_running = False
         self.thread: Optional[threading.Thread] = None
-        self.capture: Optional[cv2.VideoCapture] = None
+        self.grabber = FrameGrabber(camera_id, rtsp_url)  # Dedicated RTSP reader with latest-frame slot
+        self.last_frame_seq = -1  # Sequence number of the last frame taken from the grabber
+        self.last_frame_timestamp = 0.0  # Capture time of that frame
         self.last_person_count = 0
         self.last_update_time = datetime.now()
-        self.last_annotated_frame = None  # Store latest annotated frame
-        self.last_tracks = {}  # Store tracking data for WebSocket (bbox, id, confidence)
+        self.snapshot: Optional[FrameSnapshot] = None  # Latest frame + tracks (overlay drawn on demand)
+        self._render_lock = threading.Lock()
+        self._rendered: Optional[tuple] = None  # (seq, annotated frame) of the last render
+        self.jpeg_cache = JpegFrameCache(camera_id)  # Encode-once JPEGs shared by all viewers
+        self.last_tracks = TrackSnapshot.empty()  # Immutable track snapshot for WebSocket/overlay readers
         self.fps = 0  # Current FPS
         self.frame_count = 0  # Total frames processed
+        self.fps_window_start = 0.0  # Start of the current 30-frame FPS window
         self.frame_skip = 1  # Process frames at reduced rate
         self.frame_counter = 0
         self.last_process_time = 0
         self.last_yolo_time = 0  # Last YOLO detection time
         self.last_deepsort_time = 0  # Last DeepSORT time
-        self.yolo_interval = 1.0 / 15  # 15 FPS for YOLO detection
+        self.yolo_interval = 1.0 / settings.DETECTION_ACTIVE_FPS  # Current detection interval (adapted per tick)
         self.bytetrack_interval = 1.0 / 30  # 30 FPS for ByteTrack updates
         self.deepsort_interval = 1.0 / 2  # 2 FPS for DeepSORT ReID
-        self.last_detections = None  # Cache last YOLO detections for ByteTrack interpolation
+        self.last_detections = None  # Last YOLO detections (prediction-only ticks don't reuse them)
+        
+        # Activity-adaptive detection rate: full rate while something moves or is tracked, ~1 FPS otherwise
+        self.activity_gate = ActivityGate() if settings.ADAPTIVE_DETECTION_ENABLED else None
+        self.active_interval = 1.0 / settings.DETECTION_ACTIVE_FPS
+        self.idle_interval = 1.0 / settings.DETECTION_IDLE_FPS
+        self.gate_interval = 1.0 / settings.MOTION_GATE_FPS  # Frame polling rate while idle
+        self.motion_hold = settings.MOTION_HOLD_SECONDS
+        self.last_motion_time = 0.0
+        self.skipped_frames = 0  # Duplicate/corrupt frames never sent to YOLO
         
         # Camera position in room (world coordinates) - loaded from database
         self.camera_position = None  # (x, y) in meters
         self.room_id = None
+        self.camera_name = None
+        self.detection_roi = None  # Camera.detection_roi (normalized polygons)
         self._load_camera_position()
         
+        # Region of interest: only the camera's detection regions / calibrated zones go to YOLO
+        # (reloaded every ROI_REFRESH_INTERVAL: worker processes never see API edits directly)
+        self.roi: Optional[CameraROI] = None
+        self.roi_loaded_at = time.time()
+        if settings.ROI_ENABLED:
+            self.roi = CameraROI(camera_id, camera_keys=(self.camera_name,))
+            self.roi.configure(self.room_id, self.detection_roi)
+        
         logger.info(f"CameraProcessor initialized for camera {camera_id} with tracking={'enabled' if use_tracking else 'disabled'}")
     
     def _load_camera_position(self):
@@ -66,6 +117,14 @@ class CameraProcessor:
             camera = db.query(Camera).filter(Camera.id == self.camera_id).first()
             if camera:
                 self.room_id = camera.vault_room_id
+                self.camera_name = camera.name
+                self.detection_roi = camera.detection_roi
+                
+                # Zones drive the ROI; worker processes don't share the API process's zone cache
+                if self.room_id and self.tracking_service:
+                    room = db.query(VaultRoom).filter(VaultRoom.id == self.room_id).first()
+                    if room and room.room_layout:
+                        self.tracking_service.load_room_zones(room.id, room.room_layout)
                 if camera.position_x is not None and camera.position_y is not None:
                     self.camera_position = (camera.position_x, camera.position_y)
                     logger.info(f"Camera {self.camera_id} position: {self.camera_position} in room {self.room_id}")
@@ -75,6 +134,76 @@ class CameraProcessor:
             logger.error(f"Failed to load camera position: {e}")
         finally:
             db.close()
+    
+    def reload_roi(self):
+        """Re-read the camera's room and detection regions (after an edit, or on the refresh timer)"""
+        self.roi_loaded_at = time.time()
+        if self.roi is None:
+            return
+        db = self.db_session_factory()
+        try:
+            row = db.query(Camera.vault_room_id, Camera.detection_roi).filter(Camera.id == self.camera_id).first()
+            if row is not None:
+                self.roi.configure(row.vault_room_id, row.detection_roi)
+        except Exception as e:
+            logger.error(f"Failed to reload detection regions for camera {self.camera_id}: {e}")
+        finally:
+            db.close()
+    
+    @property
+    def last_annotated_frame(self) -> Optional[np.ndarray]:
+        """Annotated latest frame, rendered on first access and reused until the next frame"""
+        snapshot = self.snapshot
+        return self._render_snapshot(snapshot) if snapshot is not None else None
+    
+    def _render_snapshot(self, snapshot: FrameSnapshot) -> np.ndarray:
+        """Draw the overlay for a snapshot (cached by frame seq)"""
+        with self._render_lock:
+            if self._rendered is not None and self._rendered[0] == snapshot.seq:
+                return self._rendered[1]
+            if snapshot.yolo_only:
+                annotated = get_overlay_renderer().render(
+                    snapshot.frame, snapshot.tracks,
+                    lambda track_id, track_data: f"Person {track_data['confidence']:.2f}"
+                )
+            else:
+                annotated = self.tracking_service.draw_tracks(snapshot.frame, self.camera_id, tracks=snapshot.tracks)
+            self._rendered = (snapshot.seq, annotated)
+            return annotated
+    
+    def _publish_snapshot(self, frame: np.ndarray, tracks: TrackSnapshot, yolo_only: bool = False):
+        """Expose the frame + tracks to viewers without drawing anything yet"""
+        snapshot = FrameSnapshot(seq=self.last_frame_seq, timestamp=self.last_frame_timestamp,
+                                 frame=frame, tracks=tracks, yolo_only=yolo_only)
+        self.snapshot = snapshot
+        self.jpeg_cache.publish(snapshot.seq, partial(self._render_snapshot, snapshot), snapshot.timestamp)
+    
+    def _detect_people(self, frame: np.ndarray):
+        """Run detection on the zone ROI (or full frame) through the shared batch scheduler when available"""
+        if self.roi is not None:
+            return self.roi.detect(frame, self._detect_batch)
+        return self._detect_batch([frame])[0]
+    
+    def _detect_batch(self, frames: list) -> list:
+        """Detect on one or more images (full frame or ROI crops)"""
+        if self.inference_scheduler is not None:
+            futures = [self.inference_scheduler.submit(self.camera_id, image) for image in frames]
+            return [future.result(timeout=5.0) for future in futures]
+        return self.yolo_service.detect_people_batch(frames)
+    
+    def _is_active(self, current_time: float) -> bool:
+        """Camera is active while it has tracks or saw motion within the hold period"""
+        if self.activity_gate is None:
+            return True
+        return bool(self.last_tracks) or (current_time - self.last_motion_time) < self.motion_hold
+    
+    def _tick_interval(self, current_time: float) -> float:
+        """How often to pull a frame from the grabber"""
+        return self.bytetrack_interval if self._is_active(current_time) else self.gate_interval
+    
+    def _detection_interval(self, current_time: float) -> float:
+        """How often to run YOLO given current activity"""
+        return self.active_interval if self._is_active(current_time) else self.idle_interval
         
     def start(self):
         """Start processing this camera in a background thread"""
@@ -83,6 +212,7 @@ class CameraProcessor:
             return
         
         self.is_running = True
+        self.grabber.start()
         self.thread = threading.Thread(target=self._process_stream, daemon=True)
         self.thread.start()
         logger.info(f"Started processing camera {self.camera_id}")
@@ -92,164 +222,111 @@ class CameraProcessor:
         self.is_running = False
         if self.thread:
             self.thread.join(timeout=5)
-        if self.capture:
-            self.capture.release()
+        self.grabber.stop()
         logger.info(f"Stopped processing camera {self.camera_id}")
     
-    def _connect_to_stream(self) -> bool:
-        """Attempt to connect to RTSP stream"""
-        try:
-            # Release existing capture if any
-            if self.capture:
-                self.capture.release()
-            
-            # Suppress FFmpeg warnings (harmless H.264 decoding messages from network packet loss)
-            import os
-            os.environ['OPENCV_FFMPEG_LOGLEVEL'] = '-8'  # Quiet mode
-            
-            # Open RTSP stream
-            self.capture = cv2.VideoCapture(self.rtsp_url)
-            
-            # Set buffer size to 1 to get most recent frame
-            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            
-            if not self.capture.isOpened():
-                logger.error(f"Failed to open RTSP stream for camera {self.camera_id}")
-                return False
-            
-            logger.info(f"Successfully connected to camera {self.camera_id}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error connecting to camera {self.camera_id}: {e}")
-            return False
-    
     def _process_stream(self):
-        """Main processing loop for the camera stream"""
-        reconnect_delay = 5  # seconds
-        max_consecutive_failures = 10
-        consecutive_failures = 0
-        
+        """
+        Main processing loop for the camera stream
+        Pulls the newest frame from the grabber at the ByteTrack rate; frames in
+        between are grabbed but never decoded
+        """
         while self.is_running:
             try:
-                # Connect to stream
-                if not self._connect_to_stream():
-                    time.sleep(reconnect_delay)
-                    continue
+                # Pace the consumer - the grabber keeps draining the RTSP buffer meanwhile
+                now = time.time()
+                wait = self._tick_interval(now) - (now - self.last_process_time)
+                if wait > 0:
+                    time.sleep(wait)
                 
-                # Process frames
-                while self.is_running:
-                    ret, frame = self.capture.read()
-                    
-                    if not ret:
-                        logger.warning(f"Failed to read frame from camera {self.camera_id}")
-                        consecutive_failures += 1
-                        
-                        if consecutive_failures >= max_consecutive_failures:
-                            logger.error(f"Too many consecutive failures for camera {self.camera_id}, reconnecting...")
-                            break
-                        
-                        time.sleep(1)
+                grabbed = self.grabber.read(after_seq=self.last_frame_seq, timeout=1.0)
+                if grabbed is None:
+                    continue  # No new frame (stream stalled or reconnecting)
+                
+                frame = grabbed.frame
+                self.last_frame_seq = grabbed.seq
+                self.last_frame_timestamp = grabbed.timestamp
+                
+                current_time = time.time()
+                self.last_process_time = current_time
+                
+                if self.roi is not None and current_time - self.roi_loaded_at >= settings.ROI_REFRESH_INTERVAL:
+                    self.reload_roi()
+                
+                # Cheap activity gate: never spend inference on re-delivered or corrupted frames
+                if self.activity_gate is not None:
+                    activity = self.activity_gate.check(frame)
+                    if activity in (ActivityGate.DUPLICATE, ActivityGate.CORRUPT):
+                        self.skipped_frames += 1
                         continue
+                    if activity == ActivityGate.MOTION:
+                        self.last_motion_time = current_time
+                self.yolo_interval = self._detection_interval(current_time)
+                
+                # Process frame with YOLO + Tracking
+                if self.use_tracking and self.tracking_service:
+                    # Determine if we should run YOLO (adaptive 1-15 FPS) or only predict boxes (30 FPS)
+                    run_yolo = (current_time - self.last_yolo_time >= self.yolo_interval)
+                    
+                    if run_yolo:
+                        # Run YOLO detection and associate with ByteTrack
+                        person_count, detections_list, detections_sv = self._detect_people(frame)
+                        self.last_detections = detections_sv
+                        self.last_yolo_time = current_time
+                        tracking_result = self.tracking_service.track_people(
+                            self.camera_id, frame, detections_sv
+                        )
+                    else:
+                        # Prediction-only tick: advance existing tracks, no association or global-ID work
+                        tracking_result = self.tracking_service.predict_tracks(self.camera_id, frame)
                     
-                    # Reset failure counter on successful frame
-                    consecutive_failures = 0
+                    # Store tracking data for WebSocket
+                    self.last_tracks = tracking_result['tracks']
                     
-                    current_time = time.time()
+                    # Publish frame + tracks; the overlay is drawn only if a viewer asks for it
+                    self._publish_snapshot(frame, self.last_tracks)
+                    person_count = tracking_result['people_count']
                     
-                    # ByteTrack runs at 30 FPS (every frame)
-                    if current_time - self.last_process_time < self.bytetrack_interval:
-                        continue  # Skip if not enough time has passed
+                    # Update FPS counter
+                    self.frame_count += 1
+                    if self.frame_count % 30 == 0:  # Update FPS every 30 frames
+                        elapsed = current_time - self.fps_window_start if self.fps_window_start > 0 else 0
+                        self.fps = 30 / elapsed if elapsed > 0 else 0
+                        self.fps_window_start = current_time
                     
-                    # Process frame with YOLO + Tracking
-                    if self.use_tracking and self.tracking_service:
-                        # Determine if we should run YOLO (15 FPS) or just ByteTrack (30 FPS)
-                        run_yolo = (current_time - self.last_yolo_time >= self.yolo_interval)
-                        
-                        if run_yolo:
-                            # Run YOLO detection at 15 FPS
-                            person_count, detections_list, detections_sv = self.yolo_service.detect_people(frame)
-                            self.last_detections = detections_sv
-                            self.last_yolo_time = current_time
-                        else:
-                            # Use cached detections for ByteTrack interpolation at 30 FPS
-                            detections_sv = self.last_detections
-                        
-                        # Track people (ByteTrack runs at 30 FPS)
-                        if detections_sv is not None and len(detections_sv) > 0:
-                            tracking_result = self.tracking_service.track_people(
-                                self.camera_id, frame, detections_sv
-                            )
-                            
-                            # Store tracking data for WebSocket
-                            camera_state = self.tracking_service.camera_tracks.get(self.camera_id, {})
-                            self.last_tracks = camera_state.get('tracks', {})
-                            
-                            # Draw tracking boxes on frame
-                            annotated_frame = self.tracking_service.draw_tracks(frame, self.camera_id)
-                            
-                            # Store the annotated frame for streaming
-                            self.last_annotated_frame = annotated_frame
-                            person_count = tracking_result['people_count']
-                            
-                            # Update FPS counter
-                            self.frame_count += 1
-                            if self.frame_count % 30 == 0:  # Update FPS every 30 frames
-                                elapsed = current_time - self.last_process_time if self.last_process_time > 0 else 1
-                                self.fps = 30 / elapsed if elapsed > 0 else 0
-                            
-                            # Update last process time
-                            self.last_process_time = current_time
-                            
-                            logger.debug(f"Camera {self.camera_id}: {person_count} people tracked (YOLO: {run_yolo})")
-                        else:
-                            # No detections yet, continue to next frame
-                            continue
-                    else:
-                        # Fallback to simple counting (with annotation for visualization)
-                        person_count, detections_list, detections_sv = self.yolo_service.detect_people(frame)
-                        annotated = self.yolo_service.model(frame, verbose=False)[0].plot()
-                        self.last_annotated_frame = annotated
-                        logger.debug(f"Camera {self.camera_id}: YOLO-only mode, {person_count} people")
+                    logger.debug(f"Camera {self.camera_id}: {person_count} people tracked (YOLO: {run_yolo})")
                     
-                    # Update database if count changed
-                    if person_count != self.last_person_count:
-                        self._update_database(person_count)
-                        self.last_person_count = person_count
+                    if not run_yolo:
+                        continue  # Count cannot change without new detections
+                else:
+                    # Fallback to simple counting (detections drawn on demand, no second inference)
+                    person_count, detections_list, detections_sv = self._detect_people(frame)
+                    self.last_tracks = TrackSnapshot.from_detections(detections_sv, current_time, source='yolo')
+                    self._publish_snapshot(frame, self.last_tracks, yolo_only=True)
+                    logger.debug(f"Camera {self.camera_id}: YOLO-only mode, {person_count} people")
                 
+                # Report count changes (written to the database by the occupancy aggregator)
+                if person_count != self.last_person_count:
+                    self.count_sink(self.camera_id, person_count)
+                    self.last_update_time = datetime.now()
+                    self.last_person_count = person_count
+            
             except Exception as e:
                 logger.error(f"Error in camera {self.camera_id} processing loop: {e}")
-                time.sleep(reconnect_delay)
-        
-        # Cleanup
-        if self.capture:
-            self.capture.release()
+                time.sleep(1)
     
-    def _update_database(self, person_count: int):
-        """Update the database with new person count"""
-        try:
-            db = self.db_session_factory()
-            try:
-                # Update camera
-                camera = db.query(Camera).filter(Camera.id == self.camera_id).first()
-                if camera:
-                    camera.current_people_count = person_count
-                    
-                    # Update vault room total
-                    if camera.vault_room_id:
-                        vault_room = db.query(VaultRoom).filter(VaultRoom.id == camera.vault_room_id).first()
-                        if vault_room:
-                            # Sum all cameras in this vault room
-                            total_count = sum(cam.current_people_count or 0 for cam in vault_room.cameras)
-                            vault_room.current_people_count = total_count
-                    
-                    db.commit()
-                    logger.info(f"Updated camera {self.camera_id} people count: {person_count}")
-                    self.last_update_time = datetime.now()
-            finally:
-                db.close()
-        except Exception as e:
-            logger.error(f"Error updating database for camera {self.camera_id}: {e}")
+    def get_stats(self) -> dict:
+        """Runtime statistics for camera status"""
+        return {
+            "frame_seq": self.last_frame_seq,
+            "frame_age_ms": round((time.time() - self.last_frame_timestamp) * 1000, 1) if self.last_frame_timestamp else None,
+            "grabber": self.grabber.get_stats(),
+            "detection_fps": round(1.0 / self.yolo_interval, 2),
+            "skipped_frames": self.skipped_frames,
+            "activity_gate": self.activity_gate.get_stats() if self.activity_gate else None,
+            "roi": self.roi.get_stats() if self.roi else None,
+            "jpeg_cache": self.jpeg_cache.get_stats()
+        }
 
 
 class CameraService:
@@ -263,6 +340,21 @@ class CameraService:
         self.tracking_service = tracking_service
         self.db_session_factory = db_session_factory
         self.processors: Dict[int, CameraProcessor] = {}
+        
+        # Multi-process mode: cameras run in worker processes with their own models
+        self.worker_pool = None
+        if settings.CAMERA_WORKER_PROCESSES > 0:
+            from services.camera_workers import CameraWorkerPool
+            self.worker_pool = CameraWorkerPool(tracking_service, db_session_factory)
+        
+        # Cross-camera batched inference (one predict call for all pending frames)
+        self.inference_scheduler: Optional[InferenceScheduler] = None
+        if settings.INFERENCE_BATCHING_ENABLED and not self.worker_pool:
+            self.inference_scheduler = InferenceScheduler(yolo_service)
+        
+        # Coalesced people-count writes for all cameras
+        self.occupancy = get_occupancy_aggregator(db_session_factory)
+        
         logger.info("Camera service initialized")
     
     def start_camera(self, camera_id: int, rtsp_url: str):
@@ -271,7 +363,18 @@ class CameraService:
             logger.warning(f"Camera {camera_id} is already being processed")
             return
         
-        processor = CameraProcessor(camera_id, rtsp_url, self.yolo_service, self.tracking_service, self.db_session_factory)
+        self.occupancy.start()
+        
+        if self.worker_pool:
+            self.worker_pool.start()
+            self.processors[camera_id] = self.worker_pool.start_camera(camera_id, rtsp_url)
+            return
+        
+        if self.inference_scheduler:
+            self.inference_scheduler.start()
+        
+        processor = CameraProcessor(camera_id, rtsp_url, self.yolo_service, self.tracking_service, self.db_session_factory,
+                                    inference_scheduler=self.inference_scheduler)
         self.processors[camera_id] = processor
         processor.start()
     
@@ -314,6 +417,11 @@ class CameraService:
         logger.info("Stopping all cameras")
         for camera_id in list(self.processors.keys()):
             self.stop_camera(camera_id)
+        if self.inference_scheduler:
+            self.inference_scheduler.stop()
+        if self.worker_pool:
+            self.worker_pool.stop()
+        self.occupancy.stop()  # Final flush of the counts
     
     def get_camera_status(self, camera_id: int) -> dict:
         """Get status of a specific camera"""
@@ -323,7 +431,8 @@ class CameraService:
                 "camera_id": camera_id,
                 "is_running": processor.is_running,
                 "last_person_count": processor.last_person_count,
-                "last_update": processor.last_update_time.isoformat()
+                "last_update": processor.last_update_time.isoformat(),
+                **processor.get_stats()
             }
         return {
             "camera_id": camera_id,
@@ -0,0 +1,752 @@
+"""
+Multi-process camera workers
+Each worker process owns a set of cameras together with its own YOLO/OSNet models, so
+grabbing, inference, tracking and drawing scale across cores instead of sharing one GIL.
+
+- Frames: raw frames travel through a shared-memory ring buffer per camera; the API process
+  draws the overlay from the mirrored tracks only when a viewer asks for it
+- Control/data: tracks, counts and global-ID requests travel over one duplex pipe per worker
+- The API process keeps the cross-camera GlobalPersonTracker, the zone data and the DB writes,
+  and mirrors each camera's state so the existing routes keep working unchanged
+"""
+
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from functools import partial
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from services.frame_cache import JpegFrameCache
+from services.track_state import TrackSnapshot
+from logging_config import get_logger
+from config import get_settings
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class SharedFrameRing:
+    """
+    Fixed-size ring of BGR frames in shared memory (single writer, many readers)
+
+    Layout: int64 header (slots x [seq, height, width, timestamp_us]) followed by
+    uint8 frame slots (slots x max_height x max_width x 3). Each slot is written seqlock
+    style (seq=-1 while writing), so a reader that raced the writer simply retries.
+    """
+
+    HEADER_FIELDS = 4
+
+    def __init__(self, name: Optional[str], slots: int, max_height: int, max_width: int, create: bool = False):
+        """
+        Create or attach a frame ring
+
+        Args:
+            name: Shared memory block name (None to let the OS pick one when creating)
+            slots: Number of frame slots
+            max_height: Largest frame height the ring can hold
+            max_width: Largest frame width the ring can hold
+            create: True in the owning (API) process, False in the worker
+        """
+        self.slots = slots
+        self.max_height = max_height
+        self.max_width = max_width
+        self.owner = create
+
+        header_bytes = slots * self.HEADER_FIELDS * 8
+        frame_bytes = max_height * max_width * 3
+        size = header_bytes + slots * frame_bytes
+
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            # Spawned workers share the parent's resource tracker, so attaching does not
+            # register a second owner - the API process alone unlinks the block
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray((slots, self.HEADER_FIELDS), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray((slots, max_height, max_width, 3), dtype=np.uint8,
+                               buffer=self.shm.buf, offset=header_bytes)
+        if create:
+            self.header[:] = 0
+            self.header[:, 0] = -1
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def spec(self) -> Tuple[str, int, int, int]:
+        """Arguments a worker needs to attach to this ring"""
+        return self.shm.name, self.slots, self.max_height, self.max_width
+
+    @classmethod
+    def attach(cls, spec: Tuple[str, int, int, int]) -> 'SharedFrameRing':
+        """Attach to an existing ring from its spec()"""
+        name, slots, max_height, max_width = spec
+        return cls(name, slots, max_height, max_width, create=False)
+
+    def write(self, frame: np.ndarray, seq: int, timestamp: float):
+        """
+        Publish a frame (worker side)
+
+        Args:
+            frame: BGR frame; downscaled if larger than the ring slots
+            seq: Monotonic sequence number (> 0)
+            timestamp: Capture time (time.time())
+        """
+        h, w = frame.shape[:2]
+        if h > self.max_height or w > self.max_width:
+            scale = min(self.max_height / h, self.max_width / w)
+            frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+            h, w = frame.shape[:2]
+
+        slot = seq % self.slots
+        header = self.header[slot]
+        header[0] = -1  # Mark slot as being written
+        self.data[slot, :h, :w] = frame
+        header[1] = h
+        header[2] = w
+        header[3] = int(timestamp * 1_000_000)
+        header[0] = seq
+
+    def read_latest(self, after_seq: int = -1) -> Optional[Tuple[np.ndarray, int, float]]:
+        """
+        Copy the newest complete frame (API side)
+
+        Args:
+            after_seq: Only return frames newer than this sequence number
+
+        Returns:
+            Tuple of (frame copy, seq, timestamp), or None if nothing newer is available
+        """
+        for _ in range(3):
+            seqs = self.header[:, 0]
+            slot = int(np.argmax(seqs))
+            seq = int(seqs[slot])
+            if seq <= after_seq:
+                return None
+
+            h, w, ts = (int(v) for v in self.header[slot, 1:])
+            frame = self.data[slot, :h, :w].copy()
+            if int(self.header[slot, 0]) == seq:
+                return frame, seq, ts / 1_000_000
+        return None  # Writer kept lapping us - try again next call
+
+    def read(self, seq: int) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Copy one specific frame (API side)
+
+        Args:
+            seq: Sequence number to read
+
+        Returns:
+            Tuple of (frame copy, timestamp), or None if its slot was already overwritten
+        """
+        slot = seq % self.slots
+        if int(self.header[slot, 0]) != seq:
+            return None
+        h, w, ts = (int(v) for v in self.header[slot, 1:])
+        frame = self.data[slot, :h, :w].copy()
+        if int(self.header[slot, 0]) != seq:
+            return None  # Overwritten while copying
+        return frame, ts / 1_000_000
+
+    @property
+    def closed(self) -> bool:
+        return self.header is None
+
+    def close(self):
+        """Detach from the shared memory block"""
+        self.header = None
+        self.data = None
+        self.shm.close()
+
+    def unlink(self):
+        """Destroy the shared memory block (owner only)"""
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class WorkerChannel:
+    """
+    One end of a worker's duplex pipe
+    - send() is thread-safe (camera threads, publisher and listener share the pipe)
+    - request() sends a message and blocks until the matching reply arrives
+    - A reader thread resolves replies and forwards everything else to a handler
+    """
+
+    def __init__(self, connection, handler):
+        """
+        Args:
+            connection: multiprocessing Connection
+            handler: Callable(message) for non-reply messages (called on the reader thread)
+        """
+        self.connection = connection
+        self.handler = handler
+        self.send_lock = threading.Lock()
+        self.pending: Dict[int, Future] = {}
+        self.pending_lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        self.closed = False
+        self.thread = threading.Thread(target=self._read_loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def send(self, *message) -> bool:
+        """Send a message tuple; returns False if the other side is gone"""
+        if self.closed:
+            return False
+        try:
+            with self.send_lock:
+                self.connection.send(message)
+            return True
+        except (OSError, EOFError, BrokenPipeError):
+            self.closed = True
+            return False
+
+    def request(self, kind: str, *payload, timeout: float = 5.0):
+        """
+        Send ('request', id, kind, *payload) and wait for ('reply', id, result)
+
+        Raises:
+            RuntimeError if the channel closed, TimeoutError if no reply arrived in time
+        """
+        request_id = next(self.request_ids)
+        future = Future()
+        with self.pending_lock:
+            self.pending[request_id] = future
+        if not self.send('request', request_id, kind, *payload):
+            with self.pending_lock:
+                self.pending.pop(request_id, None)
+            raise RuntimeError("Worker channel closed")
+        try:
+            return future.result(timeout=timeout)
+        finally:
+            with self.pending_lock:
+                self.pending.pop(request_id, None)
+
+    def reply(self, request_id: int, result=None, error: Optional[str] = None):
+        self.send('reply', request_id, result, error)
+
+    def _read_loop(self):
+        while not self.closed:
+            try:
+                message = self.connection.recv()
+            except (OSError, EOFError):
+                break
+
+            if message[0] == 'reply':
+                _, request_id, result, error = message
+                with self.pending_lock:
+                    future = self.pending.get(request_id)
+                if future and not future.done():
+                    if error:
+                        future.set_exception(RuntimeError(error))
+                    else:
+                        future.set_result(result)
+                continue
+
+            try:
+                self.handler(message)
+            except Exception as e:
+                logger.error(f"Error handling worker message {message[0]!r}: {e}")
+
+        self.closed = True
+        with self.pending_lock:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(RuntimeError("Worker channel closed"))
+        self.handler(('closed',))
+
+
+class RemoteGlobalTracker:
+    """
+    Worker-side stand-in for GlobalPersonTracker
+    Forwards global-ID matching to the API process, which owns the single cross-camera tracker
+    """
+
+    def __init__(self, channel: WorkerChannel):
+        self.channel = channel
+        self.names: Dict[int, Optional[str]] = {}
+        self.track_globals: Dict[int, Dict[int, int]] = {}  # {camera_id: {local_track_id: global_id}} of the last match
+
+    def match_or_create_person(self, camera_id: int, local_track_id: int,
+                               face_embedding: Optional[np.ndarray] = None,
+                               face_quality: float = 0.0,
+                               bbox: Optional[Tuple[int, int, int, int]] = None) -> int:
+        """Same contract as GlobalPersonTracker.match_or_create_person"""
+        global_id, name = self.channel.request('match', camera_id, local_track_id, face_embedding, face_quality,
+                                               tuple(int(v) for v in bbox) if bbox is not None else None)
+        self.names[global_id] = name
+        self.track_globals.setdefault(camera_id, {})[local_track_id] = global_id
+        return global_id
+
+    def match_frame(self, camera_id: int, tracks: List[tuple]) -> List[int]:
+        """Same contract as GlobalPersonTracker.match_frame (one round trip per frame)"""
+        tracks = [(local_track_id, tuple(int(v) for v in bbox) if bbox is not None else None, embedding, quality)
+                  for local_track_id, bbox, embedding, quality in tracks]
+        matches = self.channel.request('match_frame', camera_id, tracks)
+        for global_id, name in matches:
+            self.names[global_id] = name
+        self.track_globals[camera_id] = {track[0]: global_id for track, (global_id, _) in zip(tracks, matches)}
+        return [global_id for global_id, _ in matches]
+
+    def get_person(self, global_id: int):
+        """Cached name lookup (only .name is used by the tracking service)"""
+        if global_id not in self.names:
+            return None
+        return SimpleNamespace(global_id=global_id, name=self.names[global_id])
+
+    def update_person_name(self, global_id: int, name: str):
+        self.names[global_id] = name
+        self.channel.send('name', global_id, name)
+
+    def on_embedding(self, camera_id: int, local_track_id: int, embedding: np.ndarray,
+                     quality: float = 0.0) -> Optional[int]:
+        """
+        Fire-and-forget: the worker's Re-ID thread never waits on the API process
+        The pipe is ordered, so a track matched here is already mapped when the embedding arrives
+
+        Returns:
+            Last global ID of the track, or None if it was never matched (or the channel is gone)
+        """
+        global_id = self.track_globals.get(camera_id, {}).get(local_track_id)
+        if global_id is None or not self.channel.send('embedding', camera_id, local_track_id, embedding, quality):
+            return None
+        return global_id
+
+    def get_statistics(self) -> Dict:
+        return self.channel.request('stats')
+
+    def remove_camera_track(self, camera_id: int, local_track_id: int):
+        self.track_globals.get(camera_id, {}).pop(local_track_id, None)
+        self.channel.send('remove_track', camera_id, local_track_id)
+
+
+class RemoteCameraProcessor:
+    """
+    API-side mirror of a CameraProcessor running in a worker process
+    Exposes the attributes the stream/WebSocket/status endpoints read
+    """
+
+    def __init__(self, camera_id: int, rtsp_url: str, ring: SharedFrameRing, pool: 'CameraWorkerPool', worker_index: int):
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.ring = ring
+        self.pool = pool
+        self.worker_index = worker_index
+
+        self.is_running = True
+        self.room_id = None
+        self.last_person_count = 0
+        self.last_update_time = datetime.now()
+        self.last_tracks = TrackSnapshot.empty()
+        self.fps = 0
+        self.frame_count = 0
+        self.last_frame_seq = -1
+        self.last_ring_seq = -1  # Ring slot sequence of last_frame_seq
+        self.last_frame_timestamp = 0.0
+        self.frame_size: Tuple[int, int] = (0, 0)  # (width, height) of the worker's source frames
+        self.stats: Dict = {}
+        self.jpeg_cache = JpegFrameCache(camera_id)
+
+        # Ring read + render cache (many viewers share one copy/render per published frame)
+        self._frame_lock = threading.Lock()
+        self._frame_seq = -1
+        self._frame: Optional[np.ndarray] = None
+
+    @property
+    def last_annotated_frame(self) -> Optional[np.ndarray]:
+        """Newest frame from the worker's shared-memory ring with the overlay drawn on it"""
+        with self._frame_lock:
+            if self.ring.closed:
+                return self._frame  # Camera stopped - viewers keep the last rendered frame
+            latest = self.ring.read_latest(self._frame_seq)
+            if latest is not None:
+                frame, self._frame_seq, _ = latest
+                self._frame = self.pool.tracking_service.draw_tracks(frame, self.camera_id,
+                                                                     tracks=self._tracks_for(frame))
+            return self._frame
+
+    def _render(self, seq: int, tracks: TrackSnapshot, frame_size: Tuple[int, int]) -> Optional[np.ndarray]:
+        """
+        Ring frame seq with the overlay of its own state message (JPEG cache source)
+
+        Returns:
+            Annotated frame, or None if the ring slot was already overwritten (a newer frame is published)
+        """
+        with self._frame_lock:
+            if self._frame_seq == seq:
+                return self._frame
+            if self.ring.closed:
+                return None
+            read = self.ring.read(seq)
+            if read is None:
+                return None
+            frame, _ = read
+            self._frame_seq = seq
+            self._frame = self.pool.tracking_service.draw_tracks(frame, self.camera_id,
+                                                                 tracks=self._tracks_for(frame, tracks, frame_size))
+            return self._frame
+
+    def _tracks_for(self, frame: np.ndarray, tracks: TrackSnapshot = None,
+                    frame_size: Tuple[int, int] = None) -> TrackSnapshot:
+        """Mirrored tracks, rescaled if the ring had to downscale the frame"""
+        tracks = tracks if tracks is not None else self.last_tracks
+        width, height = frame_size or self.frame_size
+        if not width or (frame.shape[1] == width and frame.shape[0] == height):
+            return tracks
+        return tracks.scaled(frame.shape[1] / width, frame.shape[0] / height)
+
+    def apply_state(self, state: Dict):
+        """Mirror a state message from the worker"""
+        self.last_tracks = state['tracks']
+        self.fps = state['fps']
+        self.frame_count = state['frame_count']
+        self.last_frame_seq = state['frame_seq']
+        self.last_ring_seq = state['ring_seq']
+        self.last_frame_timestamp = state['frame_timestamp']
+        self.frame_size = state['frame_size']
+        self.is_running = state['is_running']
+        self.stats = state['stats']
+        # The ring slot of this seq is only copied out (and drawn on) when a viewer actually asks for it
+        self.jpeg_cache.publish(self.last_frame_seq,
+                                partial(self._render, self.last_ring_seq, self.last_tracks, self.frame_size),
+                                self.last_frame_timestamp)
+
+    def stop(self):
+        self.pool.stop_camera(self.camera_id)
+
+    def release_ring(self):
+        """Detach and destroy the frame ring (waits for viewers reading it)"""
+        self.is_running = False
+        with self._frame_lock:
+            if self.ring.closed:
+                return
+            self.ring.close()
+            self.ring.unlink()
+
+    def get_stats(self) -> dict:
+        """Runtime statistics for camera status"""
+        return {**self.stats, "worker": self.worker_index, "jpeg_cache": self.jpeg_cache.get_stats()}
+
+
+class CameraWorkerPool:
+    """
+    Spawns and supervises camera worker processes (API side)
+    Cameras are assigned to the least-loaded worker
+    """
+
+    def __init__(self, tracking_service, db_session_factory, num_workers: int = None):
+        """
+        Args:
+            tracking_service: API-process TrackingService (owns the global tracker and zones)
+            db_session_factory: SQLAlchemy session factory for count updates
+            num_workers: Worker process count. If None, uses value from config
+        """
+        self.tracking_service = tracking_service
+        self.global_tracker = tracking_service.global_tracker
+        self.db_session_factory = db_session_factory
+        self.num_workers = max(1, num_workers or settings.CAMERA_WORKER_PROCESSES)
+
+        self.context = mp.get_context('spawn')  # Fresh interpreters: no forked CUDA/thread state
+        self.processes: List = []
+        self.channels: List[WorkerChannel] = []
+        self.assignments: Dict[int, int] = {}  # camera_id -> worker index
+        self.processors: Dict[int, RemoteCameraProcessor] = {}
+        self.lock = threading.Lock()
+        self.running = False
+
+        # Statistics
+        self.match_requests = 0
+        self.state_messages = 0
+
+    def start(self):
+        """Spawn the worker processes (idempotent)"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+
+        from services.occupancy_aggregator import get_occupancy_aggregator
+        self.occupancy = get_occupancy_aggregator(self.db_session_factory)
+
+        for index in range(self.num_workers):
+            parent_conn, child_conn = self.context.Pipe(duplex=True)
+            process = self.context.Process(target=_camera_worker_main, args=(index, child_conn),
+                                           name=f"camera-worker-{index}", daemon=True)
+            process.start()
+            child_conn.close()
+
+            channel = WorkerChannel(parent_conn, lambda message, index=index: self._handle_message(index, message))
+            channel.start()
+            self.processes.append(process)
+            self.channels.append(channel)
+
+        logger.info(f"✅ Started {self.num_workers} camera worker processes")
+
+    def stop(self):
+        """Stop all workers and release the frame rings"""
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+
+        for channel in self.channels:
+            channel.send('shutdown')
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                logger.warning(f"Camera worker {process.name} did not exit, terminating")
+                process.terminate()
+        for channel in self.channels:
+            channel.closed = True
+            channel.connection.close()
+
+        for processor in self.processors.values():
+            processor.release_ring()
+        self.processors.clear()
+        self.assignments.clear()
+        self.processes = []
+        self.channels = []
+        logger.info("Camera worker processes stopped")
+
+    def start_camera(self, camera_id: int, rtsp_url: str) -> RemoteCameraProcessor:
+        """Create the camera's frame ring and hand the camera to the least-loaded worker"""
+        with self.lock:
+            loads = [0] * self.num_workers
+            for index in self.assignments.values():
+                loads[index] += 1
+            worker_index = loads.index(min(loads))
+
+            ring = SharedFrameRing(None, settings.CAMERA_WORKER_RING_SLOTS,
+                                   settings.CAMERA_WORKER_MAX_FRAME_HEIGHT, settings.CAMERA_WORKER_MAX_FRAME_WIDTH,
+                                   create=True)
+            processor = RemoteCameraProcessor(camera_id, rtsp_url, ring, self, worker_index)
+            self.assignments[camera_id] = worker_index
+            self.processors[camera_id] = processor
+
+        self.channels[worker_index].send('start', camera_id, rtsp_url, ring.spec())
+        logger.info(f"Camera {camera_id} assigned to worker {worker_index}")
+        return processor
+
+    def stop_camera(self, camera_id: int):
+        """Stop a camera in its worker and release its ring"""
+        with self.lock:
+            worker_index = self.assignments.pop(camera_id, None)
+            processor = self.processors.pop(camera_id, None)
+        if worker_index is None:
+            return
+
+        try:
+            self.channels[worker_index].request('stop', camera_id, timeout=10.0)
+        except Exception as e:
+            logger.warning(f"Worker {worker_index} did not confirm stop of camera {camera_id}: {e}")
+        processor.release_ring()
+
+    def _handle_message(self, worker_index: int, message: tuple):
+        """Dispatch a message from a worker (runs on that worker's reader thread)"""
+        kind = message[0]
+
+        if kind == 'request':
+            _, request_id, request_kind, *payload = message
+            channel = self.channels[worker_index]
+            try:
+                channel.reply(request_id, self._handle_request(request_kind, payload))
+            except Exception as e:
+                channel.reply(request_id, error=str(e))
+
+        elif kind == 'state':
+            _, camera_id, state = message
+            self.state_messages += 1
+            processor = self.processors.get(camera_id)
+            if processor:
+                processor.apply_state(state)
+                self._mirror_tracks(camera_id, state['tracks'])
+
+        elif kind == 'count':
+            _, camera_id, person_count = message
+            processor = self.processors.get(camera_id)
+            if processor:
+                processor.last_person_count = person_count
+                self.occupancy.report(camera_id, person_count)
+                processor.last_update_time = datetime.now()
+
+        elif kind == 'name':
+            _, global_id, name = message
+            self.global_tracker.update_person_name(global_id, name)
+
+        elif kind == 'embedding':
+            _, camera_id, local_track_id, embedding, quality = message
+            self.global_tracker.on_embedding(camera_id, local_track_id, embedding, quality)
+
+        elif kind == 'remove_track':
+            _, camera_id, local_track_id = message
+            self.global_tracker.remove_camera_track(camera_id, local_track_id)
+
+        elif kind == 'closed':
+            if self.running:
+                logger.error(f"❌ Camera worker {worker_index} exited unexpectedly")
+                for camera_id, index in list(self.assignments.items()):
+                    if index == worker_index and camera_id in self.processors:
+                        self.processors[camera_id].is_running = False
+
+    def _handle_request(self, kind: str, payload: list):
+        if kind == 'match':
+            camera_id, local_track_id, embedding, quality, bbox = payload
+            self.match_requests += 1
+            global_id = self.global_tracker.match_or_create_person(
+                camera_id=camera_id,
+                local_track_id=local_track_id,
+                face_embedding=embedding,
+                face_quality=quality,
+                bbox=bbox
+            )
+            person = self.global_tracker.get_person(global_id)
+            return global_id, person.name if person else None
+        if kind == 'match_frame':
+            camera_id, tracks = payload
+            self.match_requests += 1
+            global_ids = self.global_tracker.match_frame(camera_id, tracks)
+            persons = [self.global_tracker.get_person(global_id) for global_id in global_ids]
+            return [(global_id, person.name if person else None) for global_id, person in zip(global_ids, persons)]
+        if kind == 'stats':
+            return self.global_tracker.get_statistics()
+        raise ValueError(f"Unknown request {kind!r}")
+
+    def _mirror_tracks(self, camera_id: int, tracks: TrackSnapshot):
+        """Keep the API-process TrackingService view in sync for room/zone routes"""
+        camera_state = self.tracking_service.camera_tracks[camera_id]
+        camera_state['tracks'] = tracks
+        camera_state['count'] = len(tracks)
+        camera_state['last_update'] = datetime.now()
+        for track_id, global_id in tracks.global_id_items().items():
+            self.tracking_service.global_id_map[f"{camera_id}_{track_id}"] = global_id
+
+    def get_stats(self) -> Dict:
+        """Get pool statistics"""
+        return {
+            'workers': [
+                {
+                    'index': index,
+                    'pid': process.pid,
+                    'alive': process.is_alive(),
+                    'cameras': sorted(cid for cid, w in self.assignments.items() if w == index)
+                }
+                for index, process in enumerate(self.processes)
+            ],
+            'match_requests': self.match_requests,
+            'state_messages': self.state_messages
+        }
+
+
+def _camera_worker_main(worker_index: int, connection):
+    """
+    Worker process entry point
+    Owns YOLO, the per-worker TrackingService and CameraProcessors for its cameras,
+    and publishes annotated frames + tracks back to the API process
+    """
+    from logging_config import setup_logging
+    from services.yolo_service import YOLOService
+    from services.tracking_service import TrackingService
+    from services.inference_scheduler import InferenceScheduler
+    from services.camera_service import CameraProcessor
+    from database import SessionLocal
+
+    setup_logging(log_level=settings.LOG_LEVEL)
+    log = get_logger(f"{__name__}.worker{worker_index}")
+
+    commands: "queue.Queue[tuple]" = queue.Queue()
+    channel = WorkerChannel(connection, commands.put)
+    channel.start()
+
+    yolo_service = YOLOService()
+    tracking_service = TrackingService(global_tracker=RemoteGlobalTracker(channel))
+    scheduler = InferenceScheduler(yolo_service) if settings.INFERENCE_BATCHING_ENABLED else None
+    if scheduler:
+        scheduler.start()
+
+    processors: Dict[int, CameraProcessor] = {}
+    rings: Dict[int, SharedFrameRing] = {}
+    published: Dict[int, Tuple[object, int]] = {}  # camera_id -> (last published snapshot, ring seq)
+
+    def count_sink(camera_id: int, person_count: int):
+        channel.send('count', camera_id, person_count)
+
+    def stop_camera(camera_id: int):
+        processor = processors.pop(camera_id, None)
+        if processor:
+            processor.stop()
+        ring = rings.pop(camera_id, None)
+        if ring:
+            ring.close()
+        published.pop(camera_id, None)
+
+    log.info(f"Camera worker {worker_index} ready")
+    publish_interval = 1.0 / 60
+
+    while True:
+        # Commands from the API process
+        try:
+            timeout = publish_interval if processors else 1.0
+            command = commands.get(timeout=timeout)
+        except queue.Empty:
+            command = None
+
+        if command is not None:
+            kind = command[0]
+            if kind in ('shutdown', 'closed'):
+                break
+            if kind == 'start':
+                _, camera_id, rtsp_url, ring_spec = command
+                rings[camera_id] = SharedFrameRing.attach(ring_spec)
+                # Reads (camera position, room zones) use the DB directly; count writes go through the API process
+                processor = CameraProcessor(camera_id, rtsp_url, yolo_service, tracking_service, SessionLocal,
+                                            inference_scheduler=scheduler, count_sink=count_sink)
+                processors[camera_id] = processor
+                processor.start()
+            elif kind == 'request':
+                _, request_id, request_kind, *payload = command
+                if request_kind == 'stop':
+                    stop_camera(payload[0])
+                channel.reply(request_id, True)
+
+        # Publish new raw frames + their tracks (the overlay is drawn in the API process on demand)
+        for camera_id, processor in processors.items():
+            snapshot = processor.snapshot
+            if snapshot is None:
+                continue
+            last_snapshot, seq = published.get(camera_id, (None, 0))
+            if snapshot is last_snapshot:
+                continue
+
+            seq += 1
+            rings[camera_id].write(snapshot.frame, seq, snapshot.timestamp or time.time())
+            published[camera_id] = (snapshot, seq)
+            channel.send('state', camera_id, {
+                'tracks': snapshot.tracks,
+                'fps': processor.fps,
+                'frame_count': processor.frame_count,
+                'frame_seq': snapshot.seq,
+                'ring_seq': seq,
+                'frame_timestamp': snapshot.timestamp,
+                'frame_size': (snapshot.frame.shape[1], snapshot.frame.shape[0]),
+                'is_running': processor.is_running,
+                'stats': processor.get_stats()
+            })
+
+    for camera_id in list(processors.keys()):
+        stop_camera(camera_id)
+    if scheduler:
+        scheduler.stop()
+    log.info(f"Camera worker {worker_index} stopped")
@@ -0,0 +1,268 @@
+"""
+Cold Gallery Resolver for Re-ID lookups against the database
+Embeddings that miss the in-memory FAISS / gallery search are matched against persons
+stored in detected_persons (pgvector) by a background thread, batched into one SQL
+round trip per tick, so the frame path never waits on the database
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Float, Integer, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from logging_config import get_logger
+from config import get_settings
+from database import SessionLocal, engine
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class ColdLookup:
+    """An embedding waiting for a database lookup"""
+    camera_id: int
+    local_track_id: int
+    global_id: int  # Provisional ID the track holds meanwhile
+    embedding: np.ndarray
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+# (lookup, candidate rows best first) -> True if the track was merged into a stored person
+MatchCallback = Callable[[ColdLookup, List[Dict]], bool]
+
+
+class ColdGalleryResolver:
+    """
+    Batched pgvector lookups for embeddings the in-memory search could not place
+    - submit() returns immediately; the track keeps its provisional ID
+    - All lookups queued within max_wait go out as one LATERAL query (top-k per embedding)
+    - The callback merges the provisional ID into a stored person on a hit
+    - Tracks without a hit go into a short-lived negative cache and are not re-queried
+    """
+
+    QUERY = text("""
+        SELECT q.idx, p.global_id, p.face_embedding, p.assigned_name, p.face_quality,
+               p.first_seen, p.last_seen, p.total_appearances, p.cameras_visited,
+               1 - (p.face_embedding <=> q.embedding) AS similarity
+        FROM unnest(:indices, CAST(:embeddings AS vector[])) AS q(idx, embedding)
+        CROSS JOIN LATERAL (
+            SELECT global_id, face_embedding, assigned_name, face_quality,
+                   first_seen, last_seen, total_appearances, cameras_visited
+            FROM detected_persons
+            WHERE face_embedding IS NOT NULL
+              AND global_id <> ALL(:exclude_ids)
+            ORDER BY face_embedding <=> q.embedding
+            LIMIT :top_k
+        ) p
+        WHERE 1 - (p.face_embedding <=> q.embedding) > :threshold
+        ORDER BY q.idx, similarity DESC
+    """).bindparams(
+        bindparam('indices', type_=ARRAY(Integer)),
+        bindparam('exclude_ids', type_=ARRAY(Integer)),
+        bindparam('threshold', type_=Float)
+    ).columns(face_embedding=Vector(512))
+
+    def __init__(self, callback: MatchCallback, exclude_ids: Callable[[], List[int]],
+                 threshold: float, top_k: int = 5, max_batch_size: int = None,
+                 max_wait_ms: float = None, negative_ttl: float = None):
+        """
+        Initialize cold gallery resolver
+
+        Args:
+            callback: Receives (lookup, candidate rows best first); returns True if the track was merged
+            exclude_ids: Global IDs not to return (persons already searched in memory)
+            threshold: Minimum cosine similarity for a candidate
+            top_k: Candidates returned per embedding
+            max_batch_size: Maximum embeddings per query. If None, uses value from config
+            max_wait_ms: Maximum time the oldest lookup waits for a batch to fill. If None, uses value from config
+            negative_ttl: Seconds a track without a match is not looked up again. If None, uses value from config
+        """
+        self.callback = callback
+        self.exclude_ids = exclude_ids
+        self.threshold = threshold
+        self.top_k = top_k
+        self.max_batch_size = max(1, max_batch_size or settings.COLD_GALLERY_MAX_BATCH_SIZE)
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.COLD_GALLERY_MAX_WAIT_MS) / 1000.0
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.COLD_GALLERY_NEGATIVE_TTL
+
+        self.pending: Deque[ColdLookup] = deque()
+        self.pending_keys = set()
+        self.negative_cache: Dict[Tuple[int, int], float] = {}  # {(camera_id, local_track_id): expiry}
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+        # pgvector only exists on PostgreSQL (local sqlite databases skip the cold gallery)
+        self.available = engine.dialect.name == 'postgresql'
+
+        # Statistics
+        self.lookups_submitted = 0
+        self.lookups_skipped = 0
+        self.matches = 0
+        self.queries_run = 0
+        self.query_failures = 0
+        self.last_batch_size = 0
+        self.last_query_latency = 0.0
+
+        if not self.available:
+            logger.info("Cold gallery disabled (database has no pgvector)")
+
+    def start(self):
+        """Start the resolver thread (idempotent)"""
+        with self.condition:
+            if self.running or not self.available:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"✅ Cold gallery resolver started (max_batch={self.max_batch_size}, "
+                    f"max_wait={self.max_wait * 1000:.0f}ms, negative_ttl={self.negative_ttl:.0f}s)")
+
+    def stop(self):
+        """Stop the resolver thread and discard lookups still waiting"""
+        with self.condition:
+            if not self.running:
+                return
+            self.running = False
+            self.pending.clear()
+            self.pending_keys.clear()
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Cold gallery resolver stopped")
+
+    def submit(self, camera_id: int, local_track_id: int, global_id: int, embedding: np.ndarray) -> bool:
+        """
+        Queue a database lookup for a track holding a provisional ID
+
+        Args:
+            camera_id: Camera that owns the track
+            local_track_id: Local track ID
+            global_id: Provisional global ID the track holds until the lookup returns
+            embedding: 512-dim Re-ID embedding
+
+        Returns:
+            True if queued; False if the track is already queued or recently had no match
+        """
+        key = (camera_id, local_track_id)
+        now = time.monotonic()
+        with self.condition:
+            if not self.running or key in self.pending_keys or self.negative_cache.get(key, 0.0) > now:
+                self.lookups_skipped += 1
+                return False
+            self.pending.append(ColdLookup(camera_id, local_track_id, global_id, embedding))
+            self.pending_keys.add(key)
+            self.lookups_submitted += 1
+            self.condition.notify_all()
+        return True
+
+    def _next_batch(self) -> List[ColdLookup]:
+        """Wait until a batch is full or the oldest lookup reaches its deadline"""
+        with self.condition:
+            while self.running and not self.pending:
+                self.condition.wait()
+
+            while self.running and len(self.pending) < self.max_batch_size:
+                remaining = self.pending[0].submitted_at + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(timeout=remaining)
+
+            batch = []
+            while self.pending and len(batch) < self.max_batch_size:
+                batch.append(self.pending.popleft())
+            return batch
+
+    def _query(self, batch: List[ColdLookup]) -> List[List[Dict]]:
+        """One round trip: top-k stored persons above threshold for every embedding of the batch"""
+        candidates: List[List[Dict]] = [[] for _ in batch]
+        db = SessionLocal()
+        try:
+            result = db.execute(self.QUERY, {
+                'indices': list(range(len(batch))),
+                # One vector[] literal: '{"[...]","[...]"}'
+                'embeddings': '{' + ','.join(f'"[{",".join(map(str, lookup.embedding.tolist()))}]"'
+                                             for lookup in batch) + '}',
+                'exclude_ids': list(self.exclude_ids()) or [-1],
+                'top_k': self.top_k,
+                'threshold': self.threshold
+            })
+            for row in result.mappings():
+                candidates[row['idx']].append(dict(row))
+        finally:
+            db.close()
+        return candidates
+
+    def _run_loop(self):
+        """Resolver loop: collect a batch, run one query, hand each result to the callback"""
+        while self.running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            start = time.monotonic()
+            try:
+                results = self._query(batch)
+            except Exception as e:
+                # Dropped without negative-caching: a DB outage says nothing about the tracks,
+                # so their next embeddings are looked up again
+                logger.error(f"Cold gallery lookup of {len(batch)} embeddings failed: {e}")
+                with self.condition:
+                    self.query_failures += 1
+                    for lookup in batch:
+                        self.pending_keys.discard((lookup.camera_id, lookup.local_track_id))
+                continue
+
+            self.queries_run += 1
+            self.last_batch_size = len(batch)
+            self.last_query_latency = time.monotonic() - start
+
+            expiry = time.monotonic() + self.negative_ttl
+            for lookup, candidates in zip(batch, results):
+                key = (lookup.camera_id, lookup.local_track_id)
+                merged = False
+                try:
+                    merged = self.callback(lookup, candidates)
+                except Exception as e:
+                    logger.error(f"Cold gallery callback failed for Cam{lookup.camera_id} "
+                                 f"Track{lookup.local_track_id}: {e}")
+                with self.condition:
+                    self.pending_keys.discard(key)
+                    if merged:
+                        self.matches += 1
+                    else:
+                        self.negative_cache[key] = expiry
+
+            self._expire_negative_cache()
+
+    def _expire_negative_cache(self):
+        """Drop expired negative cache entries"""
+        now = time.monotonic()
+        with self.condition:
+            expired = [key for key, expiry in self.negative_cache.items() if expiry <= now]
+            for key in expired:
+                del self.negative_cache[key]
+
+    def get_stats(self) -> Dict:
+        """Get resolver statistics"""
+        with self.condition:
+            queued = len(self.pending)
+            negative = len(self.negative_cache)
+        return {
+            'available': self.available,
+            'running': self.running,
+            'queued': queued,
+            'negative_cache': negative,
+            'lookups_submitted': self.lookups_submitted,
+            'lookups_skipped': self.lookups_skipped,
+            'matches': self.matches,
+            'queries_run': self.queries_run,
+            'query_failures': self.query_failures,
+            'last_batch_size': self.last_batch_size,
+            'last_query_latency_ms': round(self.last_query_latency * 1000, 1)
+        }
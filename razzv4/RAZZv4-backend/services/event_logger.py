@@ -1,16 +1,57 @@
 """
 Event Logging Service for Tracking Events
 Logs entry, exit, motion, and unauthorized access events
+Write-behind: callers only append to a bounded queue; a writer thread flushes by size or
+time in one round trip, and spills to local segment files while the database is unreachable.
+Subscribers (WebSocket clients) receive every event as it is logged (push stream)
 """
 
+import asyncio
+import csv
+import glob
+import io
+import json
 import logging
+import os
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Optional, List
-from sqlalchemy.orm import Session
+from typing import Dict, Optional, List, Tuple
+from sqlalchemy import insert
 from models import TrackingEvent
 from collections import deque
+from config import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Columns written per event (id and defaults come from the database)
+EVENT_COLUMNS = ('room_id', 'camera_id', 'person_id', 'event_type', 'track_id',
+                 'confidence', 'bbox', 'event_metadata', 'timestamp')
+
+
+def _json_default(value):
+    """Spill files store timestamps as ISO strings"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _is_unreachable(error: Exception) -> bool:
+    """
+    Connection-type failure (database down, connection dropped) as opposed to a row the database
+    rejects; matches SQLAlchemy's wrappers and raw DB-API errors from the COPY cursor alike
+    """
+    return any(cls.__name__ in ('OperationalError', 'InterfaceError', 'DisconnectionError')
+               for cls in type(error).__mro__)
+
+
+def _load_event(line: str) -> Dict:
+    """Event from a spill file line"""
+    event = json.loads(line)
+    if event.get('timestamp'):
+        event['timestamp'] = datetime.fromisoformat(event['timestamp'])
+    return event
 
 
 class EventLogger:
@@ -20,21 +61,67 @@ class EventLogger:
     - Exit events: Person leaves (track lost)
     - Motion events: Person movement updates
     - Unauthorized events: Unknown person in restricted area
+    
+    Logging never waits on the database: a full queue or an unreachable database spills events
+    to append-only segment files, which the writer replays once the database is back. Rows the
+    database rejects (e.g. a room deleted meanwhile) are dropped and counted as lost
     """
     
-    def __init__(self, db_session_factory, batch_size: int = 10):
+    COPY_SQL = f"COPY tracking_events ({', '.join(EVENT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    
+    def __init__(self, db_session_factory, batch_size: int = None, flush_interval: float = None,
+                 max_queue_size: int = None, spill_dir: str = None, retry_interval: float = None,
+                 segment_max_events: int = None):
         """
         Initialize event logger
         
         Args:
             db_session_factory: Database session factory
-            batch_size: Number of events to batch before writing to DB
+            batch_size: Maximum events per database write. If None, uses value from config
+            flush_interval: Seconds queued events wait at most before a write. If None, uses value from config
+            max_queue_size: Events held in memory before new ones spill to disk. If None, uses value from config
+            spill_dir: Directory of spill segment files. If None, uses value from config
+            retry_interval: Seconds to spill without trying the database after a failed write.
+                            If None, uses value from config
+            segment_max_events: Events per spill segment file. If None, uses value from config
         """
         self.db_session_factory = db_session_factory
-        self.batch_size = batch_size
+        self.batch_size = max(1, batch_size or settings.EVENT_BATCH_SIZE)
+        self.flush_interval = flush_interval if flush_interval is not None else settings.EVENT_FLUSH_INTERVAL
+        self.max_queue_size = max_queue_size or settings.EVENT_QUEUE_SIZE
+        self.spill_dir = spill_dir or settings.EVENT_SPILL_DIR
+        self.retry_interval = retry_interval if retry_interval is not None else settings.EVENT_RETRY_INTERVAL
+        self.segment_max_events = segment_max_events or settings.EVENT_SPILL_SEGMENT_EVENTS
+        
         self.event_queue = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.retry_at = 0.0  # Monotonic time before which writes go straight to disk
+        
+        # Spill segments (left over from a previous run are replayed too)
+        self.spill_lock = threading.Lock()
+        self.segment = None
+        self.segment_events = 0
+        self.spill_pending = bool(glob.glob(os.path.join(self.spill_dir, 'events-*.jsonl')))
         
-        logger.info(f"✅ Event logger initialized (batch_size={batch_size})")
+        # Push stream subscribers: {asyncio.Queue: event loop it belongs to}
+        self.subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self.subscribers_lock = threading.Lock()
+        
+        # Statistics
+        self.events_queued = 0
+        self.events_written = 0
+        self.events_spilled = 0
+        self.events_replayed = 0
+        self.events_lost = 0
+        self.flushes = 0
+        self.write_failures = 0
+        self.last_flush_size = 0
+        self.last_flush_latency = 0.0
+        
+        logger.info(f"✅ Event logger initialized (batch_size={self.batch_size}, "
+                    f"flush_interval={self.flush_interval}s, spill_dir={self.spill_dir})")
     
     def log_entry(
         self,
@@ -66,7 +153,7 @@ class EventLogger:
             'track_id': track_id,
             'confidence': confidence,
             'bbox': bbox,
-            'metadata': metadata or {},
+            'event_metadata': metadata or {},
             'timestamp': datetime.now()
         }
         
@@ -101,7 +188,7 @@ class EventLogger:
             'track_id': track_id,
             'confidence': None,
             'bbox': None,
-            'metadata': metadata or {},
+            'event_metadata': metadata or {},
             'timestamp': datetime.now()
         }
         
@@ -117,24 +204,22 @@ class EventLogger:
         person_id: Optional[int],
         track_id: int,
         bbox: Dict[str, int],
-        confidence: Optional[float] = None
+        confidence: Optional[float] = None,
+        metadata: Optional[Dict] = None
     ):
         """
         Log person motion/update event (periodic updates for active tracks)
+        Callers throttle motion events per person to keep the write volume down
         
         Args:
             room_id: Vault room ID
             camera_id: Camera ID
-            person_id: Person ID
+            person_id: Person ID (None for unknown)
             track_id: Tracking ID
             bbox: Current bounding box
             confidence: Recognition confidence
+            metadata: Additional data (e.g., dwell time)
         """
-        # Motion events are logged less frequently to reduce DB load
-        # Only log if person is identified (has person_id)
-        if person_id is None:
-            return
-        
         event = {
             'room_id': room_id,
             'camera_id': camera_id,
@@ -143,7 +228,7 @@ class EventLogger:
             'track_id': track_id,
             'confidence': confidence,
             'bbox': bbox,
-            'metadata': {},
+            'event_metadata': metadata or {},
             'timestamp': datetime.now()
         }
         
@@ -177,7 +262,7 @@ class EventLogger:
             'track_id': track_id,
             'confidence': None,
             'bbox': bbox,
-            'metadata': {'reason': reason},
+            'event_metadata': {'reason': reason},
             'timestamp': datetime.now()
         }
         
@@ -185,39 +270,292 @@ class EventLogger:
         
         logger.warning(f"🚨 UNAUTHORIZED - Room {room_id}, Camera {camera_id}: Person {person_id or 'Unknown'}")
     
-    def _queue_event(self, event: Dict):
-        """Add event to queue and flush if batch size reached"""
-        self.event_queue.append(event)
+    def start(self):
+        """Start the writer thread (idempotent)"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        logger.info("Event writer started")
+    
+    def stop(self):
+        """Stop the writer thread; queued events are written (or spilled) before it exits"""
+        with self.condition:
+            if not self.running:
+                return
+            self.running = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=10)
+        self.flush_events()
+        logger.info("Event writer stopped")
+    
+    def subscribe(self, loop: asyncio.AbstractEventLoop, max_size: int = 256) -> asyncio.Queue:
+        """
+        Receive every logged event (as returned by get_recent_events) on an asyncio queue
         
-        if len(self.event_queue) >= self.batch_size:
-            self.flush_events()
+        Args:
+            loop: Event loop of the consumer (events are delivered thread-safely onto it)
+            max_size: Events buffered for a slow consumer (oldest dropped first)
+        """
+        queue = asyncio.Queue(maxsize=max_size)
+        with self.subscribers_lock:
+            self.subscribers[queue] = loop
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Stop delivering events to a queue"""
+        with self.subscribers_lock:
+            self.subscribers.pop(queue, None)
+    
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: Dict):
+        """Runs on the consumer's loop: a full queue loses its oldest event, never blocks the producer"""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+    
+    def _publish(self, event: Dict):
+        """Fan an event out to the push stream subscribers"""
+        with self.subscribers_lock:
+            subscribers = list(self.subscribers.items())
+        if not subscribers:
+            return
+        public = self._public(event)
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, public)
+            except RuntimeError:
+                self.unsubscribe(queue)  # Loop closed
+    
+    @staticmethod
+    def _public(event: Dict) -> Dict:
+        """Event in the shape of get_recent_events (without the database ID)"""
+        return {
+            'room_id': event['room_id'],
+            'camera_id': event['camera_id'],
+            'person_id': event['person_id'],
+            'event_type': event['event_type'],
+            'track_id': event['track_id'],
+            'confidence': event['confidence'],
+            'bbox': event['bbox'],
+            'metadata': event['event_metadata'],
+            'timestamp': event['timestamp'].isoformat()
+        }
+    
+    def _queue_event(self, event: Dict):
+        """
+        Hand an event to the writer thread (never touches the database) and the push stream
+        A full queue spills the event to disk instead of blocking or dropping it
+        """
+        self._publish(event)
+        with self.condition:
+            if len(self.event_queue) < self.max_queue_size:
+                self.event_queue.append(event)
+                self.events_queued += 1
+                if len(self.event_queue) >= self.batch_size:
+                    self.condition.notify_all()
+                return
+        self._spill([event])
+    
+    def _next_batch(self) -> List[Dict]:
+        """Wait until a batch is full or the flush interval has passed"""
+        with self.condition:
+            deadline = time.monotonic() + self.flush_interval
+            while self.running and len(self.event_queue) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(timeout=remaining)
+            
+            batch = []
+            while self.event_queue and len(batch) < self.batch_size:
+                batch.append(self.event_queue.popleft())
+            return batch
+    
+    def _run_loop(self):
+        """Writer loop: flush by size or time, spill while the database is down, replay once it is back"""
+        while self.running:
+            batch = self._next_batch()
+            if batch:
+                self._write_or_spill(batch)
+            if self.spill_pending and time.monotonic() >= self.retry_at:
+                self._replay_spill()
     
     def flush_events(self):
-        """Write all queued events to database"""
-        if not self.event_queue:
+        """Write all queued events now (on stop; the writer thread normally does this)"""
+        while True:
+            with self.condition:
+                batch = [self.event_queue.popleft() for _ in range(min(self.batch_size, len(self.event_queue)))]
+            if not batch:
+                return
+            self._write_or_spill(batch)
+    
+    def _write_or_spill(self, events: List[Dict]):
+        """Write a batch; while the database is unreachable (or after it was) spill it to disk"""
+        if time.monotonic() < self.retry_at:
+            self._spill(events)
             return
+        start = time.monotonic()
+        written, remaining = self._write_salvaging(events)
+        if remaining:
+            self._spill(remaining)
+        if written:
+            self.events_written += written
+            self.flushes += 1
+            self.last_flush_size = written
+            self.last_flush_latency = time.monotonic() - start
+            logger.debug(f"💾 Flushed {written} events to database")
+    
+    def _write_salvaging(self, events: List[Dict]) -> Tuple[int, List[Dict]]:
+        """
+        Write events in one round trip; if the database rejects the batch, write it row by row
+        and drop the rejected rows (counted in events_lost)
         
+        Returns:
+            (events written, events not attempted because the database became unreachable);
+            the retry window is opened when the second part is not empty
+        """
         try:
-            db = self.db_session_factory()
-            
-            # Batch insert events
-            events_to_insert = []
-            while self.event_queue:
-                event_data = self.event_queue.popleft()
-                event = TrackingEvent(**event_data)
-                events_to_insert.append(event)
-            
-            db.bulk_save_objects(events_to_insert)
+            self._write(events)
+            return len(events), []
+        except Exception as e:
+            if _is_unreachable(e):
+                return self._unreachable(e, events, 0)
+            logger.warning(f"⚠️  Database rejected a batch of {len(events)} events, writing row by row: {str(e)}")
+        
+        written = 0
+        for i, event in enumerate(events):
+            try:
+                self._write([event])
+                written += 1
+            except Exception as e:
+                if _is_unreachable(e):
+                    return self._unreachable(e, events[i:], written)
+                self.events_lost += 1
+                logger.error(f"❌ Dropped {event.get('event_type')} event (room {event.get('room_id')}, "
+                             f"camera {event.get('camera_id')}) rejected by the database: {str(e)}")
+        return written, []
+    
+    def _unreachable(self, error: Exception, remaining: List[Dict], written: int) -> Tuple[int, List[Dict]]:
+        """Database unreachable: stop writing until the retry interval has passed"""
+        logger.error(f"❌ Database unreachable, {len(remaining)} events kept on disk: {str(error)}")
+        self.write_failures += 1
+        self.retry_at = time.monotonic() + self.retry_interval
+        return written, remaining
+    
+    def _write(self, events: List[Dict]):
+        """One round trip: COPY on PostgreSQL (psycopg2), a multi-row INSERT elsewhere"""
+        db = self.db_session_factory()
+        try:
+            dialect = db.get_bind().dialect
+            if dialect.name == 'postgresql' and dialect.driver == 'psycopg2':
+                cursor = db.connection().connection.cursor()
+                try:
+                    cursor.copy_expert(self.COPY_SQL, self._csv(events))
+                finally:
+                    cursor.close()
+            else:
+                db.execute(insert(TrackingEvent), events)
             db.commit()
-            
-            logger.debug(f"💾 Flushed {len(events_to_insert)} events to database")
-            
+        except Exception:
+            db.rollback()
+            raise
+        finally:
             db.close()
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to flush events: {str(e)}")
-            # Clear queue to avoid memory buildup
-            self.event_queue.clear()
+    
+    @staticmethod
+    def _csv(events: List[Dict]) -> io.StringIO:
+        """Events as COPY csv (JSON columns serialized, None -> NULL)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for event in events:
+            row = []
+            for column in EVENT_COLUMNS:
+                value = event.get(column)
+                if isinstance(value, (dict, list)):
+                    value = json.dumps(value)
+                elif isinstance(value, datetime):
+                    value = value.isoformat()
+                row.append(value)
+            writer.writerow(row)
+        buffer.seek(0)
+        return buffer
+    
+    def _spill(self, events: List[Dict]):
+        """Append events to the current spill segment (JSON lines); a new segment is started when full"""
+        with self.spill_lock:
+            try:
+                if self.segment is None or self.segment_events >= self.segment_max_events:
+                    self._close_segment()
+                    os.makedirs(self.spill_dir, exist_ok=True)
+                    path = os.path.join(self.spill_dir, f"events-{time.time_ns()}.jsonl")
+                    self.segment = open(path, 'a', encoding='utf-8')
+                for event in events:
+                    self.segment.write(json.dumps(event, default=_json_default) + '\n')
+                self.segment.flush()
+                self.segment_events += len(events)
+                self.events_spilled += len(events)
+                self.spill_pending = True
+            except OSError as e:
+                logger.error(f"❌ Failed to spill {len(events)} events to {self.spill_dir}: {str(e)}")
+                self.events_lost += len(events)
+    
+    def _close_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment = None
+            self.segment_events = 0
+    
+    def _replay_spill(self):
+        """Write spilled segments back oldest first (one round trip per segment, deleted once committed)"""
+        with self.spill_lock:
+            self._close_segment()  # New spills go to a fresh segment
+            paths = sorted(glob.glob(os.path.join(self.spill_dir, 'events-*.jsonl')))
+            self.spill_pending = False
+        
+        for path in paths:
+            try:
+                events = self._read_segment(path)
+                written, remaining = self._write_salvaging(events) if events else (0, [])
+                self.events_replayed += written
+                if remaining:
+                    # Only the events not written yet are retried (no duplicates after a partial replay)
+                    self._rewrite_segment(path, remaining)
+                    self.spill_pending = True
+                    return
+                os.remove(path)
+                logger.info(f"♻️  Replayed {written} spilled events from {os.path.basename(path)}")
+            except OSError as e:
+                logger.error(f"❌ Failed to replay {path}, retrying later: {str(e)}")
+                self.retry_at = time.monotonic() + self.retry_interval
+                self.spill_pending = True
+                return
+    
+    def _read_segment(self, path: str) -> List[Dict]:
+        """Events of a spill segment; unreadable lines (e.g. truncated by a crash) are counted as lost"""
+        events = []
+        with open(path, encoding='utf-8') as segment:
+            for number, line in enumerate(segment, 1):
+                if not line.strip():
+                    continue
+                try:
+                    events.append(_load_event(line))
+                except (ValueError, TypeError, AttributeError) as e:
+                    self.events_lost += 1
+                    logger.error(f"❌ Skipped unreadable line {number} of {os.path.basename(path)}: {str(e)}")
+        return events
+    
+    @staticmethod
+    def _rewrite_segment(path: str, events: List[Dict]):
+        """Replace a segment with the events still to replay"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as segment:
+            for event in events:
+                segment.write(json.dumps(event, default=_json_default) + '\n')
+        os.replace(temp_path, path)
     
     def get_recent_events(
         self,
@@ -256,7 +594,7 @@ class EventLogger:
                     'track_id': event.track_id,
                     'confidence': event.confidence,
                     'bbox': event.bbox,
-                    'metadata': event.metadata,
+                    'metadata': event.event_metadata,
                     'timestamp': event.timestamp.isoformat()
                 }
                 for event in events
@@ -269,10 +607,24 @@ class EventLogger:
             logger.error(f"Error getting recent events: {str(e)}")
             return []
     
-    def __del__(self):
-        """Flush remaining events on shutdown"""
-        if hasattr(self, 'event_queue'):
-            self.flush_events()
+    def get_stats(self) -> Dict:
+        """Get writer statistics"""
+        with self.condition:
+            queued = len(self.event_queue)
+        return {
+            'running': self.running,
+            'queued': queued,
+            'events_queued': self.events_queued,
+            'events_written': self.events_written,
+            'events_spilled': self.events_spilled,
+            'events_replayed': self.events_replayed,
+            'events_lost': self.events_lost,
+            'spill_pending': self.spill_pending,
+            'flushes': self.flushes,
+            'write_failures': self.write_failures,
+            'last_flush_size': self.last_flush_size,
+            'last_flush_latency_ms': round(self.last_flush_latency * 1000, 1)
+        }
 
 
 # Global instance
@@ -280,8 +632,16 @@ _event_logger_instance = None
 
 
 def get_event_logger(db_session_factory) -> EventLogger:
-    """Get singleton event logger"""
+    """Get singleton event logger (writer thread started)"""
     global _event_logger_instance
     if _event_logger_instance is None:
         _event_logger_instance = EventLogger(db_session_factory)
+        _event_logger_instance.start()
     return _event_logger_instance
+
+
+def shutdown_event_logger():
+    """Write queued events and stop the writer (no-op if the logger was never created)"""
+    if _event_logger_instance is not None:
+        _event_logger_instance.stop()
+
@@ -3,12 +3,19 @@ FAISS Index Service for Person Re-Identification
 Fast similarity search for person embeddings across cameras
 """
 
+import json
+import os
 import numpy as np
 import logging
 from typing import List, Tuple, Optional, Dict
 import threading
+from config import get_settings
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+INDEX_TYPES = ('flat', 'ivf', 'ivfpq', 'hnsw')
+TRAINED_INDEX_TYPES = ('ivf', 'ivfpq')  # Need training vectors before the first add
 
 
 class FAISSIndexService:
@@ -17,49 +24,161 @@ class FAISSIndexService:
     - Fast nearest neighbor search (< 1ms for 10K persons)
     - Supports real-time gallery updates
     - Thread-safe operations
+    - Vectors are keyed by global ID (IndexIDMap2): updates and removals really delete the
+      old vector, so index size and search cost follow live persons
+    - Indexes that cannot remove (HNSW, GPU) keep tombstones: searches over-fetch past them and
+      the index is compacted once tombstones exceed compact_ratio of its size
+    - Index type is configurable: exact 'flat', 'ivf' (IVF-Flat), 'ivfpq' (IVF-PQ) or 'hnsw';
+      IVF types stay on the exact flat index until train_min_size embeddings exist, then are
+      trained on them and take over
     """
     
-    def __init__(self, embedding_dim: int = 512, use_gpu: bool = False):
+    MIN_COMPACT_TOMBSTONES = 64  # Small indexes are not rebuilt after every few updates
+    
+    def __init__(self, embedding_dim: int = 512, use_gpu: bool = False, compact_ratio: float = None,
+                 index_type: str = None, nlist: int = None, nprobe: int = None, pq_m: int = None,
+                 hnsw_m: int = None, ef_search: int = None, ef_construction: int = None,
+                 train_min_size: int = None):
         """
         Initialize FAISS index
         
         Args:
             embedding_dim: Dimension of embeddings (512 for OSNet)
-            use_gpu: Use GPU for FAISS (requires faiss-gpu)
+            use_gpu: Use GPU for FAISS (requires faiss-gpu, flat index only)
+            compact_ratio: Tombstone fraction that triggers compaction. If None, uses value from config
+            index_type: 'flat', 'ivf', 'ivfpq' or 'hnsw'. If None, uses value from config
+            nlist: IVF cells (0 = 4 * sqrt(N) at training time). If None, uses value from config
+            nprobe: IVF cells visited per search. If None, uses value from config
+            pq_m: IVF-PQ sub-quantizers (must divide embedding_dim). If None, uses value from config
+            hnsw_m: HNSW graph neighbors per node. If None, uses value from config
+            ef_search: HNSW search breadth. If None, uses value from config
+            ef_construction: HNSW build breadth. If None, uses value from config
+            train_min_size: Embeddings needed before an IVF index is trained. If None, uses value from config
         """
         self.embedding_dim = embedding_dim
         self.use_gpu = use_gpu
+        self.compact_ratio = compact_ratio if compact_ratio is not None else settings.FAISS_COMPACT_TOMBSTONE_RATIO
+        self.index_type = (index_type or settings.FAISS_INDEX_TYPE).lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported FAISS index type: {self.index_type} (expected one of {INDEX_TYPES})")
+        self.nlist = settings.FAISS_IVF_NLIST if nlist is None else nlist
+        self.nprobe = nprobe or settings.FAISS_IVF_NPROBE
+        self.pq_m = pq_m or settings.FAISS_PQ_M
+        self.hnsw_m = hnsw_m or settings.FAISS_HNSW_M
+        self.ef_search = ef_search or settings.FAISS_HNSW_EF_SEARCH
+        self.ef_construction = ef_construction or settings.FAISS_HNSW_EF_CONSTRUCTION
+        self.train_min_size = train_min_size or settings.FAISS_TRAIN_MIN_SIZE
+        self.active_type = 'flat'  # Type actually in use (IVF types start flat until trained)
         self.index = None
+        self.supports_removal = True
+        self.lock = threading.RLock()
+        
+        # Tombstone mode only (index positions instead of IDs)
         self.global_id_map = {}  # {index_position: global_id}
         self.global_id_to_position = {}  # {global_id: index_position}
-        self.lock = threading.RLock()
+        self.live_embeddings: Dict[int, np.ndarray] = {}  # {global_id: embedding} for compaction
+        self.tombstones = 0
+        self.compactions = 0
         
         try:
             import faiss
             self.faiss = faiss
             self._initialize_index()
-            logger.info(f"✅ FAISS index initialized (dim={embedding_dim}, gpu={use_gpu})")
+            logger.info(f"✅ FAISS index initialized (dim={embedding_dim}, type={self.index_type}, gpu={use_gpu})")
         except ImportError:
             logger.error("❌ FAISS not installed. Install with: pip install faiss-cpu")
             logger.warning("⚠️  Falling back to brute-force search")
             self.faiss = None
     
-    def _initialize_index(self):
-        """Initialize FAISS index for cosine similarity"""
+    def _initialize_index(self, training_vectors: Optional[np.ndarray] = None):
+        """
+        Initialize FAISS index for cosine similarity
+        
+        Args:
+            training_vectors: Embeddings to train IVF types on; with fewer than train_min_size
+                              the exact flat index is used for now
+        """
         if not self.faiss:
             return
         
-        # Use IndexFlatIP for cosine similarity (Inner Product)
-        # Since embeddings are normalized, IP = cosine similarity
-        self.index = self.faiss.IndexFlatIP(self.embedding_dim)
+        self.global_id_map.clear()
+        self.global_id_to_position.clear()
+        self.live_embeddings.clear()
+        self.tombstones = 0
         
-        if self.use_gpu and self.faiss.get_num_gpus() > 0:
-            try:
-                res = self.faiss.StandardGpuResources()
-                self.index = self.faiss.index_cpu_to_gpu(res, 0, self.index)
-                logger.info("🚀 FAISS index moved to GPU")
-            except Exception as e:
-                logger.warning(f"Failed to move FAISS to GPU: {e}")
+        index_type = self.index_type
+        if index_type in TRAINED_INDEX_TYPES and (training_vectors is None or len(training_vectors) < self.train_min_size):
+            index_type = 'flat'
+        self.active_type = index_type
+        
+        # Inner product on normalized embeddings = cosine similarity
+        metric = self.faiss.METRIC_INNER_PRODUCT
+        
+        if index_type == 'flat':
+            self.index = self.faiss.IndexIDMap2(self.faiss.IndexFlatIP(self.embedding_dim))
+            self.supports_removal = True
+            
+            if self.use_gpu and self.faiss.get_num_gpus() > 0:
+                try:
+                    res = self.faiss.StandardGpuResources()
+                    # GPU flat indexes have no remove_ids: positions + tombstones instead
+                    self.index = self.faiss.index_cpu_to_gpu(res, 0, self.faiss.IndexFlatIP(self.embedding_dim))
+                    self.supports_removal = False
+                    logger.info("🚀 FAISS index moved to GPU")
+                except Exception as e:
+                    logger.warning(f"Failed to move FAISS to GPU: {e}")
+        
+        elif index_type in TRAINED_INDEX_TYPES:
+            nlist = self.nlist or int(4 * np.sqrt(len(training_vectors)))
+            nlist = max(1, min(nlist, len(training_vectors) // 39))  # FAISS wants ~39 training points per cell
+            encoding = 'Flat' if index_type == 'ivf' else f"PQ{self.pq_m}"
+            self.index = self.faiss.index_factory(self.embedding_dim, f"IVF{nlist},{encoding}", metric)
+            self.index.train(np.ascontiguousarray(training_vectors, dtype='float32'))
+            self._configure_ivf(self.index)
+            self.supports_removal = True
+            logger.info(f"🧮 FAISS {index_type} index trained on {len(training_vectors)} embeddings (nlist={nlist})")
+        
+        else:  # hnsw: no removal, tombstones + compaction
+            self.index = self.faiss.index_factory(self.embedding_dim, f"HNSW{self.hnsw_m}", metric)
+            self.index.hnsw.efConstruction = self.ef_construction
+            self.index.hnsw.efSearch = self.ef_search
+            self.supports_removal = False
+    
+    def _configure_ivf(self, index):
+        """Search breadth + ID lookup (reconstruct / remove by global ID) for an IVF index"""
+        ivf = self.faiss.extract_index_ivf(index)
+        ivf.nprobe = self.nprobe
+        ivf.set_direct_map_type(self.faiss.DirectMap.Hashtable)
+    
+    def _remove_ids(self, ids: np.ndarray) -> int:
+        """
+        remove_ids with the selector the index handles efficiently
+        - IDMap2(flat) scans every stored ID against the selector: IDSelectorBatch (hashed lookup)
+        - IVF hashtable direct maps only accept IDSelectorArray (looked up per ID)
+        """
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+        if self.active_type in TRAINED_INDEX_TYPES:
+            return self.index.remove_ids(self.faiss.IDSelectorArray(len(ids), self.faiss.swig_ptr(ids)))
+        return self.index.remove_ids(self.faiss.IDSelectorBatch(len(ids), self.faiss.swig_ptr(ids)))
+    
+    def _live_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, vectors) of every live embedding (flat or tombstone-mode index)"""
+        if not self.supports_removal:
+            ids = np.fromiter(self.live_embeddings, dtype=np.int64, count=len(self.live_embeddings))
+            vectors = np.stack(list(self.live_embeddings.values())) if len(ids) else np.zeros((0, self.embedding_dim), 'float32')
+            return ids, vectors
+        ids = self.faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        return ids, self.index.index.reconstruct_n(0, self.index.ntotal)
+    
+    def _maybe_train(self):
+        """Switch from the interim flat index to the configured IVF type once enough embeddings exist"""
+        if self.active_type != 'flat' or self.index_type not in TRAINED_INDEX_TYPES:
+            return
+        if self.index.ntotal - self.tombstones < self.train_min_size:
+            return
+        ids, vectors = self._live_vectors()
+        self._initialize_index(training_vectors=vectors)
+        self.index.add_with_ids(vectors, ids)
     
     def is_available(self) -> bool:
         """Check if FAISS is available"""
@@ -67,7 +186,7 @@ class FAISSIndexService:
     
     def add_embedding(self, global_id: int, embedding: np.ndarray) -> bool:
         """
-        Add or update embedding in the index
+        Add or update embedding in the index (an update replaces the old vector)
         
         Args:
             global_id: Global person ID
@@ -81,19 +200,29 @@ class FAISSIndexService:
         
         with self.lock:
             try:
+                embedding_2d = embedding.reshape(1, -1).astype('float32')
+                
+                if self.supports_removal:
+                    ids = np.array([global_id], dtype=np.int64)
+                    self._remove_ids(ids)
+                    self.index.add_with_ids(embedding_2d, ids)
+                    self._maybe_train()
+                    logger.debug(f"Added embedding for Global ID {global_id}")
+                    return True
+                
                 # Check if already exists
                 if global_id in self.global_id_to_position:
-                    # Remove old embedding first
+                    # Tombstone the old embedding first
                     self.remove_embedding(global_id)
                 
                 # Add to index
-                embedding_2d = embedding.reshape(1, -1).astype('float32')
                 position = self.index.ntotal
                 self.index.add(embedding_2d)
                 
                 # Update mappings
                 self.global_id_map[position] = global_id
                 self.global_id_to_position[global_id] = position
+                self.live_embeddings[global_id] = embedding_2d[0]
                 
                 logger.debug(f"Added embedding for Global ID {global_id} at position {position}")
                 return True
@@ -106,23 +235,215 @@ class FAISSIndexService:
         """
         Remove embedding from index
         
-        Note: FAISS IndexFlatIP doesn't support removal, so we mark as invalid
-        and rebuild index periodically
-        
         Args:
             global_id: Global person ID
         
         Returns:
             True if removed successfully
         """
+        if not self.is_available():
+            return False
+        
         with self.lock:
+            if self.supports_removal:
+                return self._remove_ids(np.array([global_id], dtype=np.int64)) > 0
+            
             if global_id in self.global_id_to_position:
-                position = self.global_id_to_position[global_id]
+                position = self.global_id_to_position.pop(global_id)
                 del self.global_id_map[position]
-                del self.global_id_to_position[global_id]
+                del self.live_embeddings[global_id]
+                self.tombstones += 1
+                if self.tombstones > max(self.MIN_COMPACT_TOMBSTONES, self.compact_ratio * self.index.ntotal):
+                    self._compact()
                 return True
         return False
     
+    def add_embeddings(self, global_ids: List[int], embeddings: np.ndarray) -> int:
+        """
+        Bulk add or update (one index call instead of one per person)
+        
+        Args:
+            global_ids: Global person IDs
+            embeddings: (N, 512) normalized embeddings aligned with global_ids
+        
+        Returns:
+            Number of embeddings added
+        """
+        if not self.is_available() or not global_ids:
+            return 0
+        
+        vectors = np.ascontiguousarray(embeddings, dtype='float32')
+        with self.lock:
+            if not self.supports_removal:
+                # Tombstone old vectors, then one add for the batch
+                for global_id in global_ids:
+                    if global_id in self.global_id_to_position:
+                        self.remove_embedding(global_id)
+                start = self.index.ntotal
+                self.index.add(vectors)
+                for position, (global_id, vector) in enumerate(zip(global_ids, vectors), start):
+                    self.global_id_map[position] = global_id
+                    self.global_id_to_position[global_id] = position
+                    self.live_embeddings[global_id] = vector
+                return len(global_ids)
+            
+            ids = np.asarray(global_ids, dtype=np.int64)
+            self._remove_ids(ids)
+            self.index.add_with_ids(vectors, ids)
+            self._maybe_train()
+            return len(ids)
+    
+    def _indexed_ids(self) -> np.ndarray:
+        """Global IDs of every vector in a removal-capable index (ID map or IVF inverted lists)"""
+        if self.active_type in TRAINED_INDEX_TYPES:
+            ivf = self.faiss.extract_index_ivf(self.index)
+            invlists = ivf.invlists
+            ids = [self.faiss.rev_swig_ptr(invlists.get_ids(cell), invlists.list_size(cell)).copy()
+                   for cell in range(ivf.nlist) if invlists.list_size(cell)]
+            return np.concatenate(ids).astype(np.int64) if ids else np.zeros(0, dtype=np.int64)
+        return self.faiss.vector_to_array(self.index.id_map).astype(np.int64)
+    
+    def retain_embeddings(self, global_ids) -> int:
+        """
+        Remove every embedding whose global ID is not in global_ids
+        (e.g. persons a loaded snapshot still holds but that are no longer tracked)
+        
+        Args:
+            global_ids: Global person IDs to keep
+        
+        Returns:
+            Number of embeddings removed
+        """
+        if not self.is_available():
+            return 0
+        
+        keep = set(global_ids)
+        with self.lock:
+            if not self.supports_removal:
+                stale = [global_id for global_id in self.global_id_to_position if global_id not in keep]
+                for global_id in stale:
+                    self.remove_embedding(global_id)
+                return len(stale)
+        
+            indexed = self._indexed_ids()
+            stale = indexed[~np.isin(indexed, np.fromiter(keep, dtype=np.int64, count=len(keep)))]
+            return self._remove_ids(stale) if len(stale) else 0
+    
+    def get_embedding(self, global_id: int) -> Optional[np.ndarray]:
+        """Stored vector of a person (None if not indexed)"""
+        if not self.is_available():
+            return None
+        with self.lock:
+            if not self.supports_removal:
+                return self.live_embeddings.get(global_id)
+            try:
+                return self.index.reconstruct(int(global_id))  # Approximate for IVF-PQ
+            except RuntimeError:
+                return None
+    
+    def save(self, path: str, metadata: Dict = None) -> bool:
+        """
+        Write the index and its sidecar (<path>.json) to disk
+        The index is copied under the lock and written outside it; both files are replaced
+        atomically, the sidecar last, so a reader never pairs a new sidecar with an old index
+        
+        Args:
+            path: Index file path
+            metadata: Extra sidecar fields (e.g. the watermark for database replay)
+        
+        Returns:
+            True if written
+        """
+        if not self.is_available():
+            return False
+        
+        with self.lock:
+            if self.supports_removal:
+                snapshot = self.faiss.clone_index(self.index)
+                snapshot_type = self.active_type
+            else:
+                # Tombstone mode (HNSW, GPU): persist the live vectors as a CPU ID-mapped flat index
+                snapshot = self.faiss.IndexIDMap2(self.faiss.IndexFlatIP(self.embedding_dim))
+                snapshot.add_with_ids(*reversed(self._live_vectors()))
+                snapshot_type = 'flat'
+        
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        sidecar = dict(metadata or {}, dimension=self.embedding_dim, count=snapshot.ntotal, index_type=snapshot_type)
+        self.faiss.write_index(snapshot, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        with open(f"{path}.json.tmp", 'w') as f:
+            json.dump(sidecar, f)
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+        logger.debug(f"💾 FAISS index saved: {snapshot.ntotal} embeddings -> {path}")
+        return True
+    
+    def load(self, path: str) -> Optional[Dict]:
+        """
+        Replace the index with a snapshot written by save()
+        
+        Args:
+            path: Index file path
+        
+        Returns:
+            Sidecar metadata, or None if there is no usable snapshot
+        """
+        if not self.is_available() or not (os.path.exists(path) and os.path.exists(f"{path}.json")):
+            return None
+        
+        try:
+            with open(f"{path}.json") as f:
+                sidecar = json.load(f)
+            loaded = self.faiss.read_index(path)
+            if loaded.d != self.embedding_dim or loaded.ntotal != sidecar.get('count'):
+                logger.warning(f"⚠️  FAISS snapshot {path} does not match its sidecar, ignoring it")
+                return None
+        except Exception as e:
+            logger.warning(f"⚠️  Could not read FAISS snapshot {path}: {e}")
+            return None
+        
+        snapshot_type = sidecar.get('index_type', 'flat')
+        with self.lock:
+            if snapshot_type == self.index_type and snapshot_type in TRAINED_INDEX_TYPES:
+                # Trained index of the configured type: use as is (direct map is not serialized)
+                self._configure_ivf(loaded)
+                self._initialize_index()
+                self.index, self.active_type = loaded, snapshot_type
+            elif snapshot_type == 'flat':
+                # Exact vectors: re-add into the configured index type (trains IVF if large enough)
+                ids = self.faiss.vector_to_array(loaded.id_map).astype(np.int64)
+                vectors = loaded.index.reconstruct_n(0, loaded.ntotal)
+                self._initialize_index(training_vectors=vectors)
+                if len(ids):
+                    self.add_embeddings(ids.tolist(), vectors)
+            else:
+                logger.warning(f"⚠️  FAISS snapshot {path} is a {snapshot_type} index, "
+                               f"configured type is {self.index_type}; ignoring it")
+                return None
+        
+        logger.info(f"📂 FAISS index loaded from {path}: {loaded.ntotal} embeddings")
+        return sidecar
+    
+    def _compact(self):
+        """Rebuild a tombstone-mode index from its live vectors"""
+        live = dict(self.live_embeddings)
+        before = self.index.ntotal
+        self.index.reset()
+        self.global_id_map.clear()
+        self.global_id_to_position.clear()
+        self.live_embeddings.clear()
+        self.tombstones = 0
+        
+        if live:
+            global_ids = list(live)
+            self.index.add(np.stack([live[global_id] for global_id in global_ids]))
+            for position, global_id in enumerate(global_ids):
+                self.global_id_map[position] = global_id
+                self.global_id_to_position[global_id] = position
+            self.live_embeddings.update(live)
+        
+        self.compactions += 1
+        logger.debug(f"🗜️ FAISS index compacted: {before} -> {self.index.ntotal} vectors")
+    
     def search(self, 
                query_embedding: np.ndarray, 
                k: int = 5,
@@ -146,9 +467,10 @@ class FAISSIndexService:
                 if self.index.ntotal == 0:
                     return []
                 
-                # Search
+                # Search (over-fetch past tombstones so k live matches can still come back)
                 query_2d = query_embedding.reshape(1, -1).astype('float32')
-                distances, indices = self.index.search(query_2d, min(k, self.index.ntotal))
+                fetch = min(k + self.tombstones, self.index.ntotal)
+                distances, indices = self.index.search(query_2d, fetch)
                 
                 # Convert to results
                 results = []
@@ -156,10 +478,13 @@ class FAISSIndexService:
                     if idx == -1:  # Invalid index
                         continue
                     
-                    if idx not in self.global_id_map:
-                        continue
+                    if self.supports_removal:
+                        global_id = int(idx)
+                    elif idx in self.global_id_map:
+                        global_id = self.global_id_map[idx]
+                    else:
+                        continue  # Tombstone
                     
-                    global_id = self.global_id_map[idx]
                     similarity = float(dist)  # Already cosine similarity (normalized embeddings)
                     
                     if similarity >= threshold:
@@ -168,7 +493,7 @@ class FAISSIndexService:
                 # Sort by similarity (descending)
                 results.sort(key=lambda x: x[1], reverse=True)
                 
-                return results
+                return results[:k]
                 
             except Exception as e:
                 logger.error(f"Error searching FAISS index: {e}")
@@ -233,23 +558,30 @@ class FAISSIndexService:
         with self.lock:
             logger.info(f"Rebuilding FAISS index with {len(embeddings_dict)} embeddings...")
             
-            # Reset index
-            self._initialize_index()
-            self.global_id_map.clear()
-            self.global_id_to_position.clear()
+            # Reset index (IVF types are trained on the embeddings being added)
+            embeddings_dict = {global_id: embedding for global_id, embedding in embeddings_dict.items()
+                               if embedding is not None}
+            vectors = np.stack(list(embeddings_dict.values())).astype('float32') if embeddings_dict else None
+            self._initialize_index(training_vectors=vectors)
             
             # Add all embeddings
-            for global_id, embedding in embeddings_dict.items():
-                if embedding is not None:
-                    self.add_embedding(global_id, embedding)
+            if embeddings_dict:
+                self.add_embeddings(list(embeddings_dict), vectors)
             
             logger.info(f"✅ FAISS index rebuilt: {self.index.ntotal} embeddings")
     
     def get_stats(self) -> Dict:
         """Get index statistics"""
         with self.lock:
+            available = self.is_available()
             return {
-                'total_embeddings': self.index.ntotal if self.is_available() else 0,
+                'total_embeddings': (self.index.ntotal - self.tombstones) if available else 0,
+                'index_size': self.index.ntotal if available else 0,
+                'tombstones': self.tombstones,
+                'compactions': self.compactions,
+                'supports_removal': self.supports_removal,
+                'index_type': self.index_type,
+                'active_type': self.active_type,
                 'dimension': self.embedding_dim,
                 'gpu_enabled': self.use_gpu,
                 'faiss_available': self.is_available()
@@ -0,0 +1,138 @@
+"""
+Encoded Frame Cache
+Per-camera JPEG cache keyed by frame sequence number, so every MJPEG viewer and
+snapshot request for the same frame reuses one encode per (quality, scale) variant
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Union
+import cv2
+import numpy as np
+from logging_config import get_logger
+from config import get_settings
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+FrameSource = Union[np.ndarray, Callable[[], Optional[np.ndarray]]]
+
+
+@dataclass(frozen=True)
+class EncodedFrame:
+    """JPEG bytes for one frame variant"""
+    seq: int
+    timestamp: float
+    quality: int
+    scale: float
+    jpeg: bytes
+
+
+class JpegFrameCache:
+    """
+    Encode-once JPEG cache for one camera
+    - The producer publishes each new annotated frame (cheap: stores a reference and notifies)
+    - The first consumer that asks for a (quality, scale) variant encodes it; all others reuse the bytes
+    - Consumers block on a "new frame" condition instead of re-sending duplicates on a timer
+    - Nothing is encoded while nobody is watching
+    """
+
+    def __init__(self, camera_id: int):
+        self.camera_id = camera_id
+        self.condition = threading.Condition()
+        self.encode_lock = threading.Lock()
+
+        self.seq = -1
+        self.timestamp = 0.0
+        self.source: Optional[FrameSource] = None
+        self.variants: Dict[Tuple[int, float], EncodedFrame] = {}
+
+        # Statistics
+        self.frames_published = 0
+        self.encodes = 0
+        self.hits = 0
+
+    def publish(self, seq: int, frame: FrameSource, timestamp: float = None):
+        """
+        Register a new annotated frame (producer side)
+
+        Args:
+            seq: Frame sequence number (must increase)
+            frame: The frame, or a callable returning it when first needed
+            timestamp: Capture time (defaults to now)
+        """
+        with self.condition:
+            if seq <= self.seq:
+                return
+            self.seq = seq
+            self.timestamp = timestamp or time.time()
+            self.source = frame
+            self.variants = {}
+            self.frames_published += 1
+            self.condition.notify_all()
+
+    def get(self, quality: int = None, scale: float = 1.0, after_seq: int = -1,
+            timeout: Optional[float] = None) -> Optional[EncodedFrame]:
+        """
+        Get the newest frame as JPEG, optionally waiting for one newer than after_seq
+
+        Args:
+            quality: JPEG quality (10-95). If None, uses STREAM_JPEG_QUALITY from config
+            scale: Resize factor (0.1-1.0)
+            after_seq: Sequence number the caller already has
+            timeout: Seconds to wait for a newer frame (None = don't wait)
+
+        Returns:
+            EncodedFrame, or None if no (newer) frame is available
+        """
+        quality = int(min(95, max(10, quality if quality is not None else settings.STREAM_JPEG_QUALITY)))
+        scale = round(min(1.0, max(0.1, scale)), 2)
+        key = (quality, scale)
+
+        with self.condition:
+            if self.seq <= after_seq and timeout:
+                self.condition.wait_for(lambda: self.seq > after_seq, timeout=timeout)
+            if self.seq <= after_seq or self.source is None:
+                return None
+            cached = self.variants.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            seq, timestamp, source = self.seq, self.timestamp, self.source
+
+        # Encode outside the condition so publishers never wait on JPEG work
+        with self.encode_lock:
+            with self.condition:
+                cached = self.variants.get(key) if self.seq == seq else None
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            frame = source() if callable(source) else source
+            if frame is None:
+                return None
+            if scale < 1.0:
+                frame = cv2.resize(frame, (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ret:
+                logger.error(f"Failed to encode JPEG for camera {self.camera_id}")
+                return None
+
+            encoded = EncodedFrame(seq=seq, timestamp=timestamp, quality=quality, scale=scale, jpeg=buffer.tobytes())
+            self.encodes += 1
+            with self.condition:
+                if self.seq == seq:
+                    self.variants[key] = encoded
+            return encoded
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        return {
+            'seq': self.seq,
+            'frames_published': self.frames_published,
+            'encodes': self.encodes,
+            'hits': self.hits,
+            'variants': [f"q{q}@{s}" for q, s in self.variants]
+        }
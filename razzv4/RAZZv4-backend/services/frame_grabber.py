@@ -0,0 +1,201 @@
+"""
+RTSP Frame Grabber
+Dedicated thread per camera that drains the RTSP stream with grab() and only
+decodes (retrieve) into a single "latest frame" slot when the consumer asks for it
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict
+import cv2
+import numpy as np
+from logging_config import get_logger
+from config import get_settings
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class GrabbedFrame:
+    """Latest decoded frame handed to the consumer"""
+    frame: np.ndarray
+    seq: int  # Packet sequence number (counts every grab, so gaps = skipped frames)
+    timestamp: float  # Capture time (time.time() when the packet was grabbed)
+
+
+class FrameGrabber:
+    """
+    Decoupled RTSP reader
+    - grab() runs for every packet so the network/decoder buffer never backs up
+    - retrieve() runs only on the first grab after the consumer requested a frame
+    - The consumer always receives the newest frame, so latency stays at one frame
+    """
+
+    def __init__(self, camera_id: int, rtsp_url: str, reconnect_delay: float = None,
+                 max_consecutive_failures: int = 10):
+        """
+        Initialize frame grabber
+
+        Args:
+            camera_id: Camera identifier (for logging)
+            rtsp_url: RTSP stream URL
+            reconnect_delay: Seconds between reconnect attempts. If None, uses value from config
+            max_consecutive_failures: Failed grabs before the stream is reopened
+        """
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.reconnect_delay = reconnect_delay if reconnect_delay is not None else settings.CAMERA_RECONNECT_DELAY
+        self.max_consecutive_failures = max_consecutive_failures
+
+        self.capture: Optional[cv2.VideoCapture] = None
+        self.is_running = False
+        self.is_connected = False
+        self.thread: Optional[threading.Thread] = None
+
+        # Latest-frame slot
+        self.condition = threading.Condition()
+        self.latest: Optional[GrabbedFrame] = None
+        self.frame_requested = False
+
+        # Statistics
+        self.packets_grabbed = 0
+        self.frames_decoded = 0
+
+    def start(self):
+        """Start the grabber thread"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"Frame grabber started for camera {self.camera_id}")
+
+    def stop(self):
+        """Stop the grabber thread (the thread releases the stream on exit)"""
+        self.is_running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=5)
+            if self.thread.is_alive():
+                # Still blocked in grab() on a stalled stream - releasing now would pull the
+                # capture out from under it; the thread releases it once grab() returns
+                logger.warning(f"Frame grabber for camera {self.camera_id} still blocked, releasing on exit")
+                return
+        self._release()
+        logger.info(f"Frame grabber stopped for camera {self.camera_id}")
+
+    def read(self, after_seq: int = -1, timeout: float = 1.0) -> Optional[GrabbedFrame]:
+        """
+        Request a frame and wait until one newer than after_seq is decoded
+
+        Args:
+            after_seq: Sequence number of the last frame the consumer already used
+            timeout: Seconds to wait before giving up
+
+        Returns:
+            GrabbedFrame, or None if no new frame arrived in time
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.is_running and (self.latest is None or self.latest.seq <= after_seq):
+                self.frame_requested = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(timeout=remaining)
+            if self.latest is None or self.latest.seq <= after_seq:
+                return None
+            return self.latest
+
+    def _connect(self) -> bool:
+        """Attempt to connect to RTSP stream"""
+        try:
+            self._release()
+
+            # Suppress FFmpeg warnings (harmless H.264 decoding messages from network packet loss)
+            os.environ['OPENCV_FFMPEG_LOGLEVEL'] = '-8'  # Quiet mode
+
+            self.capture = cv2.VideoCapture(self.rtsp_url)
+
+            # Keep the driver buffer minimal - we drain it ourselves
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+            if not self.capture.isOpened():
+                logger.error(f"Failed to open RTSP stream for camera {self.camera_id}")
+                return False
+
+            logger.info(f"Successfully connected to camera {self.camera_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error connecting to camera {self.camera_id}: {e}")
+            return False
+
+    def _release(self):
+        """Release the current capture, if any"""
+        self.is_connected = False
+        if self.capture:
+            self.capture.release()
+            self.capture = None
+
+    def _grab_loop(self):
+        """Grab every packet; decode only when a frame was requested"""
+        try:
+            self._grab_until_stopped()
+        finally:
+            self._release()
+
+    def _grab_until_stopped(self):
+        """Connect / grab / reconnect until stop() is called"""
+        while self.is_running:
+            if not self._connect():
+                time.sleep(self.reconnect_delay)
+                continue
+
+            self.is_connected = True
+            consecutive_failures = 0
+
+            while self.is_running:
+                if not self.capture.grab():
+                    consecutive_failures += 1
+                    if consecutive_failures >= self.max_consecutive_failures:
+                        logger.error(f"Too many consecutive failures for camera {self.camera_id}, reconnecting...")
+                        break
+                    logger.warning(f"Failed to grab frame from camera {self.camera_id}")
+                    time.sleep(0.1)
+                    continue
+
+                consecutive_failures = 0
+                captured_at = time.time()
+                self.packets_grabbed += 1
+
+                if not self.frame_requested:
+                    continue
+
+                ret, frame = self.capture.retrieve()
+                if not ret or frame is None:
+                    continue
+
+                self.frames_decoded += 1
+                with self.condition:
+                    self.latest = GrabbedFrame(frame=frame, seq=self.packets_grabbed, timestamp=captured_at)
+                    self.frame_requested = False
+                    self.condition.notify_all()
+
+            self._release()
+            if self.is_running:
+                time.sleep(self.reconnect_delay)
+
+    def get_stats(self) -> Dict:
+        """Get grabber statistics"""
+        return {
+            'connected': self.is_connected,
+            'packets_grabbed': self.packets_grabbed,
+            'frames_decoded': self.frames_decoded,
+            'decode_ratio': round(self.frames_decoded / self.packets_grabbed, 3) if self.packets_grabbed else 0.0,
+            'latest_seq': self.latest.seq if self.latest else None
+        }
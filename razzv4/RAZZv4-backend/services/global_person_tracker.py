@@ -10,14 +10,30 @@ import threading
 import time
 import numpy as np
 from typing import Dict, List, Optional, Tuple
+from scipy.optimize import linear_sum_assignment
 from dataclasses import dataclass, field
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, defer
 from database import SessionLocal
-from models import DetectedPerson
+from models import Camera, DetectedPerson
+from services.cold_gallery_resolver import ColdGalleryResolver, ColdLookup
+from services.reid_partitions import ReIDPartitions
+from services.hot_gallery import HotGallery
+from services.room_presence import RoomPresence
+from services.event_logger import get_event_logger
+from config import get_settings
 import json
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# (local_track_id, bbox, embedding or None, quality) - one track of a camera frame
+FrameTrack = Tuple[int, Optional[Tuple[int, int, int, int]], Optional[np.ndarray], float]
+
+SPATIAL_IOU_THRESHOLD = 0.25  # Lenient: overlapping views never line up exactly
+SPATIAL_MAX_AGE = 3.0  # Seconds a position on another camera stays valid (camera processing delays)
 
 
 @dataclass
@@ -41,11 +57,28 @@ class GlobalPerson:
     best_face_quality: float = 0.0
     best_face_embedding: Optional[np.ndarray] = None
     
+    # Multi-shot appearance gallery (face_embedding above is the EMA template over all shots):
+    # preallocated (gallery_size, dim) matrix, the first len(gallery_qualities) rows are shots
+    gallery_shots: Optional[np.ndarray] = None
+    gallery_qualities: List[float] = field(default_factory=list)
+    
+    @property
+    def gallery(self) -> np.ndarray:
+        """Gallery shots as a (shots, dim) view of the preallocated matrix (no copy)"""
+        if self.gallery_shots is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self.gallery_shots[:len(self.gallery_qualities)]
+    
     def update_from_camera(self, camera_id: int, local_track_id: int, 
                           face_embedding: Optional[np.ndarray] = None,
                           face_quality: float = 0.0,
-                          bbox: Optional[Tuple[int, int, int, int]] = None):
-        """Update person state from camera detection"""
+                          bbox: Optional[Tuple[int, int, int, int]] = None) -> bool:
+        """
+        Update person state from camera detection
+        
+        Returns:
+            True if the appearance gallery changed (template worth re-indexing)
+        """
         self.camera_tracks[camera_id] = local_track_id
         self.last_seen = time.time()
         self.cameras_visited.add(camera_id)
@@ -55,14 +88,90 @@ class GlobalPerson:
         if bbox is not None:
             self.camera_positions[camera_id] = bbox
         
-        # Update face embedding if quality is better
-        if face_embedding is not None and face_quality > self.best_face_quality:
-            self.best_face_quality = face_quality
-            self.best_face_embedding = face_embedding.copy()
-            
-            # Update primary embedding if significantly better
-            if self.face_embedding is None or face_quality > self.best_face_quality * 0.8:
-                self.face_embedding = face_embedding.copy()
+        if face_embedding is None:
+            return False
+        return self.add_embedding(face_embedding, face_quality)
+    
+    def seed_gallery(self):
+        """Start the gallery from a persisted template (only the template is stored in the database)"""
+        if self.face_embedding is not None and not self.gallery_qualities:
+            self._store_shot(0, self.face_embedding / (np.linalg.norm(self.face_embedding) + 1e-8),
+                             self.best_face_quality, settings.REID_GALLERY_SIZE)
+    
+    def clear_gallery(self):
+        """Drop the gallery shots and their matrix (demoted persons keep only the template)"""
+        self.gallery_shots = None
+        self.gallery_qualities = []
+    
+    def _store_shot(self, slot: int, embedding: np.ndarray, quality: float, gallery_size: int):
+        """Write a shot into a gallery row (slot == shot count appends), allocating the matrix on first use"""
+        if self.gallery_shots is None or len(self.gallery_shots) < gallery_size:
+            grown = np.zeros((gallery_size, len(embedding)), dtype=np.float32)
+            if self.gallery_shots is not None:
+                grown[:len(self.gallery_shots)] = self.gallery_shots
+            self.gallery_shots = grown
+        self.gallery_shots[slot] = embedding
+        if slot == len(self.gallery_qualities):
+            self.gallery_qualities.append(quality)
+        else:
+            self.gallery_qualities[slot] = quality
+    
+    def add_embedding(self, embedding: np.ndarray, quality: float,
+                      smoothing: float = None, gallery_size: int = None, max_similarity: float = None) -> bool:
+        """
+        Fold a new Re-ID embedding into the appearance model
+        - Template (face_embedding): quality-weighted EMA, so weak crops move it less
+        - Gallery: at most gallery_size shots; a crop is admitted only if it is sufficiently
+          different from every shot, or if it beats its near-duplicate / the weakest shot on quality
+        
+        Args:
+            embedding: 512-dim Re-ID embedding
+            quality: Crop quality score (bbox size)
+            smoothing: EMA weight of the old template. If None, uses GLOBAL_ID_FEATURE_SMOOTHING
+            gallery_size: Maximum gallery shots. If None, uses value from config
+            max_similarity: Shots at least this similar count as the same view. If None, uses value from config
+        
+        Returns:
+            True if the gallery changed
+        """
+        smoothing = settings.GLOBAL_ID_FEATURE_SMOOTHING if smoothing is None else smoothing
+        gallery_size = gallery_size or settings.REID_GALLERY_SIZE
+        max_similarity = settings.REID_GALLERY_MAX_SIMILARITY if max_similarity is None else max_similarity
+        embedding = embedding / (np.linalg.norm(embedding) + 1e-8)
+        
+        if self.face_embedding is None:
+            self.face_embedding = embedding.copy()
+        else:
+            weight = 1.0 - smoothing
+            if self.best_face_quality > 0:
+                weight *= min(1.0, quality / self.best_face_quality)
+            template = smoothing * self.face_embedding + weight * embedding
+            self.face_embedding = template / (np.linalg.norm(template) + 1e-8)
+        
+        if self.best_face_embedding is None or quality > self.best_face_quality:
+            self.best_face_quality = quality
+            self.best_face_embedding = embedding.copy()
+        
+        shot_count = len(self.gallery_qualities)
+        if shot_count == 0:
+            self._store_shot(0, embedding, quality, gallery_size)
+            return True
+        
+        similarities = self.gallery @ embedding
+        nearest = int(np.argmax(similarities))
+        if similarities[nearest] >= max_similarity:
+            # Same view as an existing shot: keep whichever crop is better
+            slot = nearest if quality > self.gallery_qualities[nearest] else None
+        elif shot_count < gallery_size:
+            slot = shot_count
+        else:
+            weakest = int(np.argmin(self.gallery_qualities))
+            slot = weakest if quality > self.gallery_qualities[weakest] else None
+        
+        if slot is None:
+            return False
+        self._store_shot(slot, embedding, quality, gallery_size)
+        return True
     
     def remove_camera_track(self, camera_id: int):
         """Remove tracking from a specific camera"""
@@ -117,13 +226,64 @@ class GlobalPersonTracker:
         # Camera-to-global mapping
         self.camera_track_to_global: Dict[Tuple[int, int], int] = {}  # {(camera_id, local_track_id): global_id}
         
-        # Thread safety
+        # Database sync bookkeeping: persons changed since the last sync, and IDs that were
+        # merged away or cleaned up (marked inactive in the database on next sync)
+        self.dirty_ids: set = set()
+        self.deactivated_ids: set = set()
+        
+        # Thread safety (sync_lock serializes syncs; the DB write itself runs outside self.lock)
         self.lock = threading.RLock()
+        self.sync_lock = threading.Lock()
+        
+        # Sync metrics
+        self.sync_count = 0
+        self.sync_failures = 0
+        self.rows_written = 0
+        self.last_sync_rows = 0
+        self.last_sync_latency = 0.0
+        self.last_sync_lock_time = 0.0
         
         # FAISS index for fast similarity search
         from services.faiss_index_service import get_faiss_service
         self.faiss_service = get_faiss_service()
         
+        # Tiered gallery: hot = persons seen within person_timeout (exact numpy search), cold =
+        # persons demoted by cleanup (FAISS, searched only on a hot miss, promoted back on a match)
+        self.hot_gallery = HotGallery()
+        self.cold_persons: Dict[int, GlobalPerson] = {}  # {global_id: demoted person}, oldest first
+        self.cold_tier_size = settings.REID_COLD_TIER_SIZE
+        self.cold_searches = 0
+        self.cold_hits = 0
+        self.promotions = 0
+        self.demotions = 0
+        
+        # FAISS snapshot on disk (fast restart: only rows after its watermark are replayed)
+        self.snapshot_path = settings.FAISS_SNAPSHOT_PATH
+        self.snapshot_interval = settings.FAISS_SNAPSHOT_INTERVAL
+        self.last_snapshot_time = time.time()
+        
+        # Camera -> vault room (partitions and room events; refreshed on cleanup)
+        self.camera_rooms: Dict[int, int] = {}
+        
+        # Per-room partitions of the gallery (searched before the global index)
+        self.partitions: Optional[ReIDPartitions] = None
+        if settings.REID_PARTITIONS_ENABLED:
+            self.partitions = ReIDPartitions()
+        
+        # Entry / motion / exit events per room (EventLogger writes them and pushes them to subscribers)
+        self.presence: Optional[RoomPresence] = None
+        if settings.EVENTS_ENABLED:
+            self.presence = RoomPresence(get_event_logger(SessionLocal))
+        
+        self._load_camera_rooms()
+        
+        # Stored persons not in memory are matched in the background (pgvector, batched)
+        self.cold_resolver: Optional[ColdGalleryResolver] = None
+        if settings.COLD_GALLERY_ENABLED:
+            self.cold_resolver = ColdGalleryResolver(self._on_cold_match, self._memory_ids,
+                                                     threshold=face_similarity_threshold)
+            self.cold_resolver.start()
+        
         # Load existing persons from database
         self._load_from_database()
         
@@ -146,86 +306,297 @@ class GlobalPersonTracker:
                                face_quality: float = 0.0,
                                bbox: Optional[Tuple[int, int, int, int]] = None) -> int:
         """
-        Match person to existing global ID or create new one
-        Uses SPATIAL FIRST (immediate), then Re-ID (after 3+ frames)
-        
-        Matching Priority:
-        1. Check if track already mapped (return existing ID)
-        2. Try spatial matching FIRST (works from frame 1, even without embedding)
-        3. Try Re-ID matching (requires embedding, more accurate)
-        4. Create new person
+        Match a single track to an existing global ID or create a new one
+        (a one-track match_frame; camera loops should send the whole frame to match_frame)
         
         Args:
             camera_id: Source camera ID
             local_track_id: Local tracking ID from this camera
-            face_embedding: 512-dim Re-ID embedding (if available after 3+ frames)
+            face_embedding: 512-dim Re-ID embedding (if available)
             face_quality: Embedding quality score
             bbox: Person bounding box (for spatial reasoning)
         
         Returns:
             global_id: Unique person ID across all cameras
         """
+        return self.match_frame(camera_id, [(local_track_id, bbox, face_embedding, face_quality)])[0]
+    
+    def match_frame(self, camera_id: int, tracks: List[FrameTrack]) -> List[int]:
+        """
+        Match every track of one camera frame to global IDs in a single pass
+        Takes the lock once; unmapped tracks are scored against all candidate persons in one
+        cost matrix and solved with linear-sum assignment, so two tracks of a frame never
+        share a person
+        
+        Matching Priority:
+        1. Track already mapped (keep existing ID)
+        2. Cost matrix over active persons: spatial IoU with their boxes on other cameras
+           (seen within SPATIAL_MAX_AGE) outranks Re-ID similarity; both add up when they agree
+        3. Re-ID search over the hot / cold tiers and galleries for tracks still unmatched
+        4. Create new person
+        
+        Args:
+            camera_id: Source camera ID
+            tracks: (local_track_id, bbox, embedding or None, quality) per track
+        
+        Returns:
+            global IDs aligned with tracks
+        """
+        global_ids: List[Optional[int]] = [None] * len(tracks)
+        
         with self.lock:
-            # Check if this camera track is already mapped
-            key = (camera_id, local_track_id)
-            if key in self.camera_track_to_global:
-                global_id = self.camera_track_to_global[key]
-                
+            now = time.time()
+            unmapped = []
+            for i, (local_track_id, bbox, embedding, quality) in enumerate(tracks):
+                global_id = self.camera_track_to_global.get((camera_id, local_track_id))
+                person = self.persons.get(global_id) if global_id is not None else None
+                if person is None:
+                    unmapped.append(i)
+                    continue
                 # Update existing person (may now have embedding)
-                if global_id in self.persons:
-                    person = self.persons[global_id]
-                    
-                    # If we now have an embedding, update it and add to FAISS
-                    if face_embedding is not None and person.face_embedding is None:
-                        person.face_embedding = face_embedding.copy()
-                        person.best_face_quality = face_quality
-                        person.best_face_embedding = face_embedding.copy()
-                        
-                        # Add to FAISS for future fast matching
-                        from services.faiss_index_service import get_faiss_service
-                        faiss = get_faiss_service()
-                        if faiss.is_available():
-                            faiss.add_embedding(global_id, face_embedding)
-                            logger.debug(f"📊 Added embedding to FAISS for Global ID {global_id}")
-                    
-                    person.update_from_camera(camera_id, local_track_id, face_embedding, face_quality, bbox)
-                    return global_id
+                if person.update_from_camera(camera_id, local_track_id, embedding, quality, bbox):
+                    self._index_template(person)
+                global_ids[i] = global_id
             
-            # PRIORITY 1: Try SPATIAL matching FIRST (works from frame 1, instant cross-camera matching)
-            if bbox is not None:
-                spatial_match = self._find_best_spatial_match(bbox, camera_id)
-                
-                if spatial_match:
-                    global_id = spatial_match
-                    person = self.persons[global_id]
-                    person.update_from_camera(camera_id, local_track_id, face_embedding, face_quality, bbox)
-                    self.camera_track_to_global[key] = global_id
-                    
-                    logger.info(f"✅ Spatial match: Global ID {global_id} on camera {camera_id} (track {local_track_id})")
-                    return global_id
+            if not unmapped:
+                self.dirty_ids.update(global_ids)
+                self._record_frame(camera_id, tracks, global_ids, now)
+                return global_ids
+            
+            claimed = set(global_ids)
+            candidates = [global_id for global_id, person in self.persons.items()
+                          if global_id not in claimed and person.is_active(self.person_timeout)]
+            spatial, appearance = self._frame_scores(camera_id, [tracks[i] for i in unmapped], candidates, now)
+            scores = spatial + appearance
             
-            # PRIORITY 2: Try Re-ID matching (more accurate, requires 3+ frames for embedding)
-            if face_embedding is not None:
-                face_match = self._find_best_face_match(face_embedding, camera_id)
+            if candidates:
+                rows, cols = linear_sum_assignment(-scores)
+                for row, col in zip(rows, cols):
+                    if scores[row, col] <= 0:
+                        continue
+                    i, global_id = unmapped[row], candidates[col]
+                    local_track_id, bbox, embedding, quality = tracks[i]
+                    self._assign_track(global_id, camera_id, local_track_id, embedding, quality, bbox)
+                    global_ids[i] = global_id
+                    claimed.add(global_id)
+                    if spatial[row, col] > 0:
+                        logger.info(f"✅ Spatial match: Global ID {global_id} on camera {camera_id} (track {local_track_id})")
+                    else:
+                        logger.info(f"✅ Re-ID match: Global ID {global_id} on camera {camera_id} (track {local_track_id})")
+            
+            for i in unmapped:
+                if global_ids[i] is not None:
+                    continue
+                local_track_id, bbox, embedding, quality = tracks[i]
                 
-                if face_match:
-                    global_id = face_match
-                    person = self.persons[global_id]
-                    person.update_from_camera(camera_id, local_track_id, face_embedding, face_quality, bbox)
-                    self.camera_track_to_global[key] = global_id
-                    
-                    logger.info(f"✅ Re-ID match: Global ID {global_id} on camera {camera_id} (track {local_track_id})")
-                    return global_id
+                # Inactive / database persons are only reachable through the Re-ID search
+                if embedding is not None:
+                    face_match = self._find_best_face_match(embedding, camera_id)
+                    if face_match is not None and face_match not in claimed:
+                        self._assign_track(face_match, camera_id, local_track_id, embedding, quality, bbox)
+                        global_ids[i] = face_match
+                        claimed.add(face_match)
+                        logger.info(f"✅ Re-ID match: Global ID {face_match} on camera {camera_id} (track {local_track_id})")
+                        continue
+                
+                # No match found - create new person (provisional until the database lookup returns)
+                global_id = self._create_new_person(camera_id, local_track_id, embedding, quality, bbox)
+                global_ids[i] = global_id
+                claimed.add(global_id)
+                logger.info(f"🆕 New person: Global ID {global_id} on camera {camera_id} (track {local_track_id})")
+                if embedding is not None and self.cold_resolver is not None:
+                    self.cold_resolver.submit(camera_id, local_track_id, global_id, embedding)
+            
+            self.dirty_ids.update(global_ids)
+            self._record_frame(camera_id, tracks, global_ids, now)
+        
+        return global_ids
+    
+    def _record_frame(self, camera_id: int, tracks: List[FrameTrack], global_ids: List[int], now: float):
+        """Keep the persons of a frame in the room partition of their camera and emit room events"""
+        room_id = self.camera_rooms.get(camera_id)
+        for (local_track_id, bbox, _, _), global_id in zip(tracks, global_ids):
+            person = self.persons.get(global_id)
+            if person is None:
+                continue
+            if self.partitions is not None:
+                self.partitions.update(global_id, (camera_id,), person.face_embedding, now)
+            if self.presence is not None and room_id is not None:
+                self.presence.observe(room_id, camera_id, global_id, local_track_id, bbox, person.name, now)
+        
+        # Exits between cleanup runs
+        if self.presence is not None and now - self.presence.last_expire >= 1.0:
+            self.presence.expire(now)
+    
+    def _load_camera_rooms(self):
+        """Camera -> room mapping for partitions and room events (cameras added later are picked up on cleanup)"""
+        try:
+            db = SessionLocal()
+            try:
+                cameras = db.query(Camera.id, Camera.vault_room_id).all()
+            finally:
+                db.close()
+            with self.lock:
+                for camera_id, room_id in cameras:
+                    self.camera_rooms[camera_id] = room_id
+                    if self.partitions is not None:
+                        self.partitions.set_camera_room(camera_id, room_id)
+        except Exception as e:
+            logger.error(f"Failed to load camera rooms: {e}")
+    
+    def _assign_track(self, global_id: int, camera_id: int, local_track_id: int,
+                      embedding: Optional[np.ndarray], quality: float,
+                      bbox: Optional[Tuple[int, int, int, int]]):
+        """Map a camera track to an existing person and fold in its observation"""
+        person = self.persons[global_id]
+        if person.update_from_camera(camera_id, local_track_id, embedding, quality, bbox):
+            self._index_template(person)
+        self.camera_track_to_global[(camera_id, local_track_id)] = global_id
+    
+    def on_embedding(self, camera_id: int, local_track_id: int, embedding: np.ndarray,
+                     quality: float = 0.0) -> Optional[int]:
+        """
+        Deliver an asynchronously extracted Re-ID embedding for a camera track
+        
+        Tracks are matched without an embedding first (spatial or new person). A person that
+        was created without one holds a provisional ID: if the embedding matches a known person,
+        the provisional ID is merged into that person and the track follows on its next match.
+        
+        Args:
+            camera_id: Source camera ID
+            local_track_id: Local tracking ID the crop was taken from
+            embedding: 512-dim Re-ID embedding
+            quality: Embedding quality score
+        
+        Returns:
+            global_id the track belongs to after merging, or None if the track is gone
+        """
+        with self.lock:
+            global_id = self.camera_track_to_global.get((camera_id, local_track_id))
+            person = self.persons.get(global_id) if global_id is not None else None
+            if person is None:
+                return None  # Track ended before its embedding arrived
+            
+            if person.face_embedding is None:
+                match_id = self._find_best_face_match(embedding, camera_id)
+                match = self.persons.get(match_id) if match_id is not None else None
+                # Never merge two people visible on the same camera at the same time
+                if (match is not None and match_id != global_id
+                        and match.camera_tracks.get(camera_id, local_track_id) == local_track_id):
+                    self._merge_person(global_id, match_id)
+                    logger.info(f"🔗 Re-ID merge: provisional Global ID {global_id} -> {match_id} "
+                                f"on camera {camera_id} (track {local_track_id})")
+                    global_id, person = match_id, match
+                elif self.cold_resolver is not None:
+                    # Not in memory: the stored persons are searched in the background
+                    self.cold_resolver.submit(camera_id, local_track_id, global_id, embedding)
+            
+            if person.add_embedding(embedding, quality):
+                self._index_template(person)
+            self.dirty_ids.add(global_id)
             
-            # No match found - create new person
-            global_id = self._create_new_person(camera_id, local_track_id, face_embedding, face_quality, bbox)
-            logger.info(f"🆕 New person: Global ID {global_id} on camera {camera_id} (track {local_track_id})")
             return global_id
     
+    def _memory_ids(self) -> List[int]:
+        """Global IDs held in memory, hot or cold (already covered by the FAISS / gallery search)"""
+        with self.lock:
+            return list(self.persons) + list(self.cold_persons)
+    
+    def _on_cold_match(self, lookup: ColdLookup, candidates: List[Dict]) -> bool:
+        """
+        Cold gallery result: merge a provisional person into the best stored person
+        (runs on the resolver thread)
+        
+        Args:
+            lookup: The submitted lookup
+            candidates: Stored persons above the similarity threshold, best first
+        
+        Returns:
+            True if the provisional ID was merged
+        """
+        with self.lock:
+            key = (lookup.camera_id, lookup.local_track_id)
+            if self.camera_track_to_global.get(key) != lookup.global_id or lookup.global_id not in self.persons:
+                return False  # Track ended or was already re-matched meanwhile
+            
+            for row in candidates:
+                stored_id = row['global_id']
+                if stored_id in self.persons or stored_id in self.cold_persons:
+                    continue  # Loaded since the query; the in-memory search is authoritative
+                
+                person = GlobalPerson(
+                    global_id=stored_id,
+                    face_embedding=np.asarray(row['face_embedding'], dtype=np.float32),
+                    name=row['assigned_name'],
+                    best_face_quality=row['face_quality'] or 0.0
+                )
+                person.first_seen = row['first_seen'].timestamp()
+                person.last_seen = row['last_seen'].timestamp()
+                person.total_appearances = row['total_appearances'] or 0
+                person.cameras_visited = set(row['cameras_visited'] or [])
+                person.seed_gallery()
+                self.persons[stored_id] = person
+                self._index_template(person)
+                
+                self._merge_person(lookup.global_id, stored_id)
+                logger.info(f"📥 Cold gallery match: provisional Global ID {lookup.global_id} -> {stored_id} "
+                            f"on camera {lookup.camera_id} (track {lookup.local_track_id}, "
+                            f"similarity={row['similarity']:.3f})")
+                return True
+            return False
+    
+    def _index_template(self, person: GlobalPerson):
+        """
+        (Re-)index a person's template in FAISS
+        Only called when the gallery changed, so the index is not rewritten on every shot
+        """
+        if person.face_embedding is not None and self.faiss_service.is_available():
+            self.faiss_service.add_embedding(person.global_id, person.face_embedding)
+            logger.debug(f"📊 Indexed template in FAISS for Global ID {person.global_id}")
+        if person.face_embedding is not None:
+            self.hot_gallery.upsert(person.global_id, person.face_embedding)
+        if self.partitions is not None:
+            self.partitions.update(person.global_id, person.camera_tracks, person.face_embedding, reindex=True)
+    
+    def _merge_person(self, source_id: int, target_id: int):
+        """Fold a provisional person into another (camera mappings, positions, statistics)"""
+        source = self.persons.pop(source_id)
+        target = self.persons[target_id]
+        
+        for key, global_id in self.camera_track_to_global.items():
+            if global_id == source_id:
+                self.camera_track_to_global[key] = target_id
+        
+        target.camera_tracks.update(source.camera_tracks)
+        target.camera_positions.update(source.camera_positions)
+        target.cameras_visited |= source.cameras_visited
+        target.total_appearances += source.total_appearances
+        target.first_seen = min(target.first_seen, source.first_seen)
+        target.last_seen = max(target.last_seen, source.last_seen)
+        target.name = target.name or source.name
+        
+        if source.gallery_qualities:
+            for embedding, quality in zip(source.gallery, source.gallery_qualities):
+                target.add_embedding(embedding, quality)
+            self._index_template(target)
+        self.faiss_service.remove_embedding(source_id)
+        self.hot_gallery.remove(source_id)
+        if self.partitions is not None:
+            self.partitions.remove(source_id)
+        if self.presence is not None:
+            self.presence.merge(source_id, target_id)
+        
+        self.dirty_ids.discard(source_id)
+        self.dirty_ids.add(target_id)
+        self.deactivated_ids.add(source_id)
+    
     def _find_best_face_match(self, query_embedding: np.ndarray, camera_id: int) -> Optional[int]:
         """
         Find best matching person by Re-ID embedding similarity
-        Uses FAISS for fast search, falls back to database if needed
+        Searches the room partitions of this camera first, then the hot tier (exact, persons
+        seen within person_timeout), the cold tier (FAISS) only when both miss, then the gallery
+        shots. A cold match is promoted back into memory; stored persons neither hot nor cold
+        are looked up by the cold gallery resolver off the frame path
         
         Args:
             query_embedding: Re-ID embedding to match
@@ -237,25 +608,22 @@ class GlobalPersonTracker:
         best_match_id = None
         best_similarity = self.face_similarity_threshold
         
-        # Build embeddings dict for FAISS fallback
-        embeddings_dict = {}
-        for global_id, person in self.persons.items():
-            if not person.is_active(self.person_timeout):
-                continue
-            if person.face_embedding is not None:
-                embeddings_dict[global_id] = person.face_embedding
-        
-        # Use FAISS search with fallback to brute-force
-        matches = self.faiss_service.search_with_fallback(
-            query_embedding=query_embedding,
-            embeddings_dict=embeddings_dict,
-            k=5,
-            threshold=self.face_similarity_threshold
-        )
+        # Partitions first: only persons recently seen in this camera's room or adjacent rooms
+        matches = None
+        if self.partitions is not None:
+            matches = self.partitions.search(query_embedding, camera_id, k=5, threshold=self.face_similarity_threshold)
+        
+        # Partition miss: hot tier (someone who just left a camera's view)
+        if not matches:
+            matches = self.hot_gallery.search(query_embedding, k=5, threshold=self.face_similarity_threshold)
+        
+        # Hot miss: cold tier
+        if not matches:
+            matches = self._search_cold_tier(query_embedding)
         
         if matches:
             for global_id, similarity in matches:
-                person = self.persons.get(global_id)
+                person = self.persons.get(global_id) or self.cold_persons.get(global_id)
                 if person is None:
                     continue
                 
@@ -270,153 +638,167 @@ class GlobalPersonTracker:
                     best_similarity = similarity
                     best_match_id = global_id
         
-        # If no match in memory, check database (for cross-camera sharing)
+        if best_match_id in self.cold_persons:
+            self._promote(best_match_id)
+        
+        # Template missed: try every person's gallery shots (other poses/views seen earlier)
         if best_match_id is None:
-            try:
-                db = SessionLocal()
-                try:
-                    # Query database for persons with Re-ID embeddings
-                    # Use vector similarity search (pgvector)
-                    from sqlalchemy import text
-                    
-                    result = db.execute(text("""
-                        SELECT global_id, face_embedding, 
-                               1 - (face_embedding <=> :embedding::vector) as similarity
-                        FROM detected_persons
-                        WHERE face_embedding IS NOT NULL
-                          AND is_active = true
-                        ORDER BY face_embedding <=> :embedding::vector
-                        LIMIT 5
-                    """), {'embedding': query_embedding.tolist()})
-                    
-                    for row in result:
-                        global_id, embedding_list, similarity = row
-                        
-                        if similarity > best_similarity:
-                            best_similarity = similarity
-                            best_match_id = global_id
-                            
-                            # Load this person into memory for future use
-                            dp = db.query(DetectedPerson).filter(
-                                DetectedPerson.global_id == global_id
-                            ).first()
-                            
-                            if dp and global_id not in self.persons:
-                                person = GlobalPerson(
-                                    global_id=dp.global_id,
-                                    face_embedding=np.array(dp.face_embedding),
-                                    name=dp.assigned_name,
-                                    best_face_quality=dp.face_quality or 0.0
-                                )
-                                person.first_seen = dp.first_seen.timestamp()
-                                person.last_seen = dp.last_seen.timestamp()
-                                person.cameras_visited = set(dp.cameras_visited or [])
-                                self.persons[global_id] = person
-                                logger.info(f"📥 Loaded person {global_id} from database for matching")
-                            
-                            break
-                    
-                finally:
-                    db.close()
-            except Exception as e:
-                logger.error(f"Database face matching error: {e}")
+            best_match_id, best_similarity = self._find_best_gallery_match(query_embedding, best_similarity)
         
         if best_match_id:
             logger.debug(f"Face match: Global ID {best_match_id} (similarity={best_similarity:.3f})")
         
         return best_match_id
     
-    def _find_best_spatial_match(self, bbox: Tuple[int, int, int, int], camera_id: int) -> Optional[int]:
+    def _search_cold_tier(self, query_embedding: np.ndarray) -> List[Tuple[int, float]]:
         """
-        Find best matching person by spatial position (for overlapping camera views)
+        FAISS search over every indexed person (without FAISS: brute force over the cold templates)
         
-        When two cameras view the same space, the same person appears in similar positions.
-        We use IoU (Intersection over Union) to match bounding boxes.
-        
-        This is the PRIMARY matching method for first 3 frames (before Re-ID embedding available)
+        Returns:
+            (global_id, similarity) of persons in memory or in the cold tier, best first
+        """
+        self.cold_searches += 1
+        if self.faiss_service.is_available():
+            matches = self.faiss_service.search(query_embedding, k=5, threshold=self.face_similarity_threshold)
+        else:
+            matches = self.faiss_service.search_with_fallback(
+                query_embedding=query_embedding,
+                embeddings_dict={global_id: person.face_embedding for global_id, person in self.cold_persons.items()},
+                k=5,
+                threshold=self.face_similarity_threshold
+            )
+        # Stored persons evicted from the cold tier are the cold gallery resolver's job
+        matches = [(global_id, similarity) for global_id, similarity in matches
+                   if global_id in self.persons or global_id in self.cold_persons]
+        if matches:
+            self.cold_hits += 1
+        return matches
+    
+    def _promote(self, global_id: int) -> GlobalPerson:
+        """Move a cold person back into memory and the hot tier"""
+        person = self.cold_persons.pop(global_id)
+        person.seed_gallery()
+        self.persons[global_id] = person
+        self.hot_gallery.upsert(global_id, person.face_embedding)
+        self.deactivated_ids.discard(global_id)
+        self.dirty_ids.add(global_id)
+        self.promotions += 1
+        logger.debug(f"🔥 Promoted Global ID {global_id} to the hot tier")
+        return person
+    
+    def _find_best_gallery_match(self, query_embedding: np.ndarray,
+                                 threshold: float) -> Tuple[Optional[int], float]:
+        """
+        Best person by maximum similarity over their gallery shots
         
         Args:
-            bbox: Person bounding box [x1, y1, x2, y2]
-            camera_id: Source camera ID
+            query_embedding: Re-ID embedding to match
+            threshold: Minimum similarity for a match
         
         Returns:
-            global_id of best match, or None
+            (global_id or None, similarity)
         """
-        best_match_id = None
-        best_iou = 0.25  # Reduced threshold for more lenient matching (was 0.3)
-        
-        current_time = time.time()
-        
+        best_id, best_similarity = None, threshold
+        query = query_embedding.astype(np.float32, copy=False)
         for global_id, person in self.persons.items():
-            # Only match active persons
-            if not person.is_active(self.person_timeout):
-                continue
-            
-            # Don't match with same camera (already handled by ByteTrack)
-            if camera_id in person.camera_tracks:
-                continue
-            
-            # Check if person is currently visible on ANY other camera
-            if not person.camera_positions:
-                continue
-            
-            # Extended time window for spatial matching (3 seconds instead of 2)
-            # Allows for slight delays in camera processing
-            time_since_seen = current_time - person.last_seen
-            if time_since_seen > 3.0:
+            if not person.gallery_qualities:
                 continue
-            
-            # Compare with all camera positions this person is currently in
-            for other_camera_id, other_bbox in person.camera_positions.items():
-                if other_camera_id == camera_id:
-                    continue
-                
-                # Calculate IoU (Intersection over Union)
-                iou = self._calculate_iou(bbox, other_bbox)
-                
-                if iou > best_iou:
-                    best_iou = iou
-                    best_match_id = global_id
-        
-        if best_match_id:
-            logger.debug(f"Spatial match: Global ID {best_match_id} (IoU={best_iou:.3f})")
-        
-        return best_match_id
+            similarity = float(np.max(person.gallery @ query))
+            if similarity > best_similarity:
+                best_id, best_similarity = global_id, similarity
+        if best_id is not None:
+            logger.debug(f"Gallery match: Global ID {best_id} (similarity={best_similarity:.3f})")
+        return best_id, best_similarity
     
-    @staticmethod
-    def _calculate_iou(bbox1: Tuple[int, int, int, int], bbox2: Tuple[int, int, int, int]) -> float:
+    def _frame_scores(self, camera_id: int, tracks: List[FrameTrack], candidates: List[int],
+                      now: float) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Calculate Intersection over Union between two bounding boxes
+        Spatial and appearance score matrices of unmapped tracks against candidate persons
+        
+        When two cameras view the same space, the same person appears in similar positions,
+        so IoU with a person's box on another camera is the primary (frame 1) evidence.
+        Scores are 0 where a pair is not a match; spatial scores are 1 + IoU so they always
+        outrank Re-ID similarity.
         
         Args:
-            bbox1, bbox2: Bounding boxes as [x1, y1, x2, y2]
+            camera_id: Source camera ID
+            tracks: (local_track_id, bbox, embedding or None, quality) per unmapped track
+            candidates: Active, unclaimed global IDs (matrix columns)
+            now: Epoch seconds of the frame
         
         Returns:
-            IoU score (0-1, where 1 = perfect overlap)
+            (spatial, appearance) arrays of shape (len(tracks), len(candidates))
         """
-        x1_min, y1_min, x1_max, y1_max = bbox1
-        x2_min, y2_min, x2_max, y2_max = bbox2
+        spatial = np.zeros((len(tracks), len(candidates)))
+        appearance = np.zeros((len(tracks), len(candidates)))
+        if not candidates:
+            return spatial, appearance
+        persons = [self.persons[global_id] for global_id in candidates]
         
-        # Calculate intersection
-        inter_x_min = max(x1_min, x2_min)
-        inter_y_min = max(y1_min, y2_min)
-        inter_x_max = min(x1_max, x2_max)
-        inter_y_max = min(y1_max, y2_max)
+        # Spatial: boxes of candidates currently visible on other cameras, grouped per person
+        box_rows = [i for i, track in enumerate(tracks) if track[1] is not None]
+        box_columns, box_starts, other_boxes = [], [], []
+        for column, person in enumerate(persons):
+            # Same camera is ByteTrack's job; stale positions are not evidence
+            if camera_id in person.camera_tracks or now - person.last_seen > SPATIAL_MAX_AGE:
+                continue
+            boxes = [bbox for other_camera_id, bbox in person.camera_positions.items() if other_camera_id != camera_id]
+            if boxes:
+                box_columns.append(column)
+                box_starts.append(len(other_boxes))
+                other_boxes.extend(boxes)
         
-        if inter_x_max < inter_x_min or inter_y_max < inter_y_min:
-            return 0.0
+        if box_rows and other_boxes:
+            track_boxes = np.array([tracks[i][1] for i in box_rows], dtype=np.float64)
+            iou = self._iou_matrix(track_boxes, np.array(other_boxes, dtype=np.float64))
+            best_iou = np.maximum.reduceat(iou, box_starts, axis=1)  # Best camera per person
+            spatial[np.ix_(box_rows, box_columns)] = np.where(best_iou > SPATIAL_IOU_THRESHOLD, 1.0 + best_iou, 0.0)
         
-        inter_area = (inter_x_max - inter_x_min) * (inter_y_max - inter_y_min)
+        # Appearance: best of template and gallery shots
+        embedding_rows = [i for i, track in enumerate(tracks) if track[2] is not None]
+        if embedding_rows:
+            queries = np.stack([tracks[i][2] / (np.linalg.norm(tracks[i][2]) + 1e-8) for i in embedding_rows])
+            # Per person against their preallocated gallery matrix (no gallery-wide stack per frame)
+            shot_columns, best = [], []
+            for column, person in enumerate(persons):
+                if person.face_embedding is None:
+                    continue
+                similarity = queries @ person.face_embedding
+                if person.gallery_qualities:
+                    similarity = np.maximum(similarity, (queries @ person.gallery.T).max(axis=1))
+                shot_columns.append(column)
+                best.append(similarity)
+            
+            if shot_columns:
+                similarity = np.stack(best, axis=1)
+                # Temporal-spatial consistency: boost persons recently seen on this camera
+                boost = np.array([1.1 if camera_id in persons[column].cameras_visited
+                                  and now - persons[column].last_seen < 5.0 else 1.0 for column in shot_columns])
+                similarity = similarity * boost
+                appearance[np.ix_(embedding_rows, shot_columns)] = np.where(
+                    similarity > self.face_similarity_threshold, similarity, 0.0)
         
-        # Calculate union
-        area1 = (x1_max - x1_min) * (y1_max - y1_min)
-        area2 = (x2_max - x2_min) * (y2_max - y2_min)
-        union_area = area1 + area2 - inter_area
+        return spatial, appearance
+    
+    @staticmethod
+    def _iou_matrix(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+        """
+        Pairwise Intersection over Union
         
-        if union_area == 0:
-            return 0.0
+        Args:
+            boxes1: (N, 4) boxes as [x1, y1, x2, y2]
+            boxes2: (M, 4) boxes as [x1, y1, x2, y2]
         
-        return inter_area / union_area
+        Returns:
+            (N, M) IoU scores (0-1, where 1 = perfect overlap)
+        """
+        top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+        bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+        inter_area = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+        area1 = np.prod(boxes1[:, 2:] - boxes1[:, :2], axis=1)
+        area2 = np.prod(boxes2[:, 2:] - boxes2[:, :2], axis=1)
+        union_area = area1[:, None] + area2[None, :] - inter_area
+        return np.divide(inter_area, union_area, out=np.zeros_like(inter_area), where=union_area > 0)
     
     def _create_new_person(self,
                           camera_id: int,
@@ -428,22 +810,16 @@ class GlobalPersonTracker:
         global_id = self.next_global_id
         self.next_global_id += 1
         
-        person = GlobalPerson(
-            global_id=global_id,
-            face_embedding=face_embedding.copy() if face_embedding is not None else None,
-            best_face_quality=face_quality,
-            best_face_embedding=face_embedding.copy() if face_embedding is not None else None
-        )
+        person = GlobalPerson(global_id=global_id)
         
-        person.update_from_camera(camera_id, local_track_id, face_embedding, face_quality, bbox)
+        # Embedding (if any) seeds the template and gallery
+        if person.update_from_camera(camera_id, local_track_id, face_embedding, face_quality, bbox):
+            # Add embedding to FAISS index for fast future searches
+            self._index_template(person)
         
         self.persons[global_id] = person
         self.camera_track_to_global[(camera_id, local_track_id)] = global_id
         
-        # Add embedding to FAISS index for fast future searches
-        if face_embedding is not None and self.faiss_service.is_available():
-            self.faiss_service.add_embedding(global_id, face_embedding)
-        
         return global_id
     
     def update_person_name(self, global_id: int, name: str):
@@ -451,6 +827,7 @@ class GlobalPersonTracker:
         with self.lock:
             if global_id in self.persons:
                 self.persons[global_id].name = name
+                self.dirty_ids.add(global_id)
                 logger.info(f"Updated name for Global ID {global_id}: {name}")
     
     def get_person(self, global_id: int) -> Optional[GlobalPerson]:
@@ -473,6 +850,7 @@ class GlobalPersonTracker:
                 # Remove from person's camera tracks
                 if global_id in self.persons:
                     self.persons[global_id].remove_camera_track(camera_id)
+                    self.dirty_ids.add(global_id)
                 
                 # Remove mapping
                 del self.camera_track_to_global[key]
@@ -492,7 +870,27 @@ class GlobalPersonTracker:
                 'active_persons': len(active_persons),
                 'persons_with_faces': sum(1 for p in self.persons.values() if p.face_embedding is not None),
                 'multi_camera_persons': sum(1 for p in active_persons if len(p.cameras_visited) > 1),
-                'total_mappings': len(self.camera_track_to_global)
+                'total_mappings': len(self.camera_track_to_global),
+                'tiers': {
+                    'hot': self.hot_gallery.get_stats(),
+                    'cold_persons': len(self.cold_persons),
+                    'cold_searches': self.cold_searches,
+                    'cold_hits': self.cold_hits,
+                    'promotions': self.promotions,
+                    'demotions': self.demotions
+                },
+                'cold_gallery': self.cold_resolver.get_stats() if self.cold_resolver else None,
+                'partitions': self.partitions.get_stats() if self.partitions else None,
+                'presence': self.presence.get_stats() if self.presence else None,
+                'db_sync': {
+                    'syncs': self.sync_count,
+                    'failures': self.sync_failures,
+                    'dirty_persons': len(self.dirty_ids),
+                    'rows_written': self.rows_written,
+                    'last_rows': self.last_sync_rows,
+                    'last_latency_ms': round(self.last_sync_latency * 1000, 1),
+                    'last_lock_ms': round(self.last_sync_lock_time * 1000, 2)
+                }
             }
     
     def _cleanup_loop(self):
@@ -501,18 +899,33 @@ class GlobalPersonTracker:
             try:
                 time.sleep(self.cleanup_interval)
                 self._cleanup_inactive_persons()
+                self._load_camera_rooms()
             except Exception as e:
                 logger.error(f"Error in cleanup loop: {e}")
     
     def _cleanup_inactive_persons(self):
-        """Remove persons that haven't been seen recently"""
+        """
+        Demote persons not seen within person_timeout from memory and the hot tier to the
+        cold tier (persons without a template are dropped), and promote recently seen persons
+        the hot tier is missing (e.g. loaded from the database)
+        """
         with self.lock:
             current_time = time.time()
             inactive_ids = []
             
             for global_id, person in self.persons.items():
-                if not person.is_active(self.person_timeout):
+                if current_time - person.last_seen >= self.person_timeout:
                     inactive_ids.append(global_id)
+                elif person.face_embedding is not None and global_id not in self.hot_gallery:
+                    self.hot_gallery.upsert(global_id, person.face_embedding)
+            
+            # Room memberships outside the partition window (person stays in the global index)
+            if self.partitions is not None:
+                self.partitions.expire(current_time)
+            
+            # Exits of rooms no camera frame has reported on since
+            if self.presence is not None:
+                self.presence.expire(current_time)
             
             if inactive_ids:
                 logger.info(f"🧹 Cleaning up {len(inactive_ids)} inactive persons")
@@ -526,38 +939,89 @@ class GlobalPersonTracker:
                     for key in keys_to_remove:
                         del self.camera_track_to_global[key]
                     
-                    # Remove person
-                    del self.persons[global_id]
+                    # Remove person (final state written as inactive on next sync)
+                    person = self.persons.pop(global_id)
+                    self.hot_gallery.remove(global_id)
+                    self.dirty_ids.discard(global_id)
+                    self.deactivated_ids.add(global_id)
+                    
+                    # Cold tier: template stays in FAISS (and room partitions until they expire)
+                    if person.face_embedding is not None:
+                        person.camera_tracks.clear()
+                        person.camera_positions.clear()
+                        person.clear_gallery()
+                        self.cold_persons[global_id] = person
+                        self.demotions += 1
+                    elif self.partitions is not None:
+                        self.partitions.remove(global_id)
+            
+            # Bounded cold tier: the oldest demotions leave FAISS and are found by the cold gallery resolver
+            while len(self.cold_persons) > self.cold_tier_size:
+                global_id = next(iter(self.cold_persons))
+                del self.cold_persons[global_id]
+                self.faiss_service.remove_embedding(global_id)
+                if self.partitions is not None:
+                    self.partitions.remove(global_id)
     
     def shutdown(self):
         """Shutdown the tracker"""
         logger.info("Shutting down global person tracker")
         self.running = False
+        if self.cold_resolver is not None:
+            self.cold_resolver.stop()
         if self.cleanup_thread.is_alive():
             self.cleanup_thread.join(timeout=2.0)
         if hasattr(self, 'sync_thread') and self.sync_thread.is_alive():
             self.sync_thread.join(timeout=2.0)
         # Final sync to database
         self._sync_to_database()
+        self.save_snapshot()
     
     def _load_from_database(self):
-        """Load active persons from database on startup"""
+        """
+        Load active persons from database on startup
+        With a FAISS snapshot on disk the index is read from the file, person rows are loaded
+        without their embeddings (templates come from the index) and only active rows changed
+        after the snapshot's watermark that the index does not hold are indexed; without one,
+        all embeddings are indexed in bulk. The index is then trimmed to the loaded persons
+        (the snapshot also holds demoted, merged and deactivated persons)
+        """
+        sidecar = self.faiss_service.load(self.snapshot_path) if self.snapshot_path else None
+        watermark = datetime.fromtimestamp(sidecar['watermark']) if sidecar else None
+        if sidecar:
+            self.next_global_id = max(self.next_global_id, sidecar.get('next_global_id', 1))
+        
         try:
             db = SessionLocal()
             try:
-                # Load active persons from last 1 hour
-                active_persons = db.query(DetectedPerson).filter(
+                # Active rows whose embedding the index does not have yet
+                changed_query = db.query(DetectedPerson.global_id, DetectedPerson.face_embedding).filter(
+                    DetectedPerson.face_embedding.isnot(None),
+                    DetectedPerson.is_active == True
+                )
+                if watermark is not None:
+                    changed_query = changed_query.filter(DetectedPerson.last_seen > watermark)
+                changed = {global_id: np.asarray(embedding, dtype=np.float32) for global_id, embedding in changed_query}
+                if sidecar:
+                    # The snapshot holds the EMA template; the row only holds the best-quality crop
+                    # (and last_seen moves without the embedding changing), so it never overwrites it
+                    changed = {global_id: embedding for global_id, embedding in changed.items()
+                               if self.faiss_service.get_embedding(global_id) is None}
+                
+                # Add changed embeddings to FAISS index (one bulk call)
+                if changed:
+                    self.faiss_service.add_embeddings(list(changed), np.stack(list(changed.values())))
+                
+                # Active persons (embedding column not read; the index already holds it)
+                active_persons = db.query(DetectedPerson).options(defer(DetectedPerson.face_embedding)).filter(
                     DetectedPerson.is_active == True
                 ).all()
                 
                 for dp in active_persons:
                     # Convert database model to in-memory GlobalPerson
-                    face_emb = None
-                    if dp.face_embedding is not None:
-                        try:
-                            face_emb = np.array(dp.face_embedding)
-                        except:
-                            pass
+                    face_emb = changed.get(dp.global_id)
+                    if face_emb is None:
+                        face_emb = self.faiss_service.get_embedding(dp.global_id)
                     
                     person = GlobalPerson(
                         global_id=dp.global_id,
@@ -566,6 +1030,7 @@ class GlobalPersonTracker:
                         best_face_quality=dp.face_quality or 0.0,
                         best_face_embedding=face_emb
                     )
+                    person.seed_gallery()
                     
                     person.first_seen = dp.first_seen.timestamp()
                     person.last_seen = dp.last_seen.timestamp()
@@ -573,16 +1038,21 @@ class GlobalPersonTracker:
                     person.cameras_visited = set(dp.cameras_visited or [])
                     
                     self.persons[dp.global_id] = person
-                    
-                    # Add embedding to FAISS index
-                    if face_emb is not None and self.faiss_service.is_available():
-                        self.faiss_service.add_embedding(dp.global_id, face_emb)
-                    
-                    # Update next_global_id
-                    if dp.global_id >= self.next_global_id:
-                        self.next_global_id = dp.global_id + 1
+                    if face_emb is not None and time.time() - person.last_seen < self.person_timeout:
+                        self.hot_gallery.upsert(dp.global_id, face_emb)
+                
+                # Persons not loaded (cold, merged, deactivated at shutdown) would crowd FAISS results
+                # forever: cold-tier eviction only removes persons in cold_persons
+                stale = self.faiss_service.retain_embeddings(self.persons.keys())
                 
-                logger.info(f"📥 Loaded {len(active_persons)} active persons from database")
+                # Never reuse an ID of a stored (even inactive) person
+                max_global_id = db.query(func.max(DetectedPerson.global_id)).scalar()
+                if max_global_id is not None and max_global_id >= self.next_global_id:
+                    self.next_global_id = max_global_id + 1
+                
+                logger.info(f"📥 Loaded {len(active_persons)} active persons from database "
+                            f"({len(changed)} embeddings {'replayed after snapshot' if sidecar else 'indexed'}, "
+                            f"{stale} stale embeddings removed)")
                 if self.faiss_service.is_available():
                     stats = self.faiss_service.get_stats()
                     logger.info(f"🔍 FAISS index initialized with {stats['total_embeddings']} embeddings")
@@ -592,88 +1062,163 @@ class GlobalPersonTracker:
         except Exception as e:
             logger.error(f"Failed to load persons from database: {e}")
     
+    def save_snapshot(self) -> bool:
+        """
+        Persist the FAISS index with a watermark; on the next start only database rows
+        changed after the watermark are replayed
+        """
+        if not self.snapshot_path:
+            return False
+        # Taken before the index copy: changes in between are both saved and replayed (harmless)
+        metadata = {'watermark': time.time(), 'next_global_id': self.next_global_id}
+        try:
+            saved = self.faiss_service.save(self.snapshot_path, metadata)
+            self.last_snapshot_time = time.time()
+            return saved
+        except Exception as e:
+            logger.error(f"Failed to save FAISS snapshot: {e}")
+            return False
+    
     def _database_sync_loop(self):
-        """Background thread to sync persons to database"""
+        """Background thread to sync persons to database (and snapshot the FAISS index)"""
         while self.running:
             try:
                 time.sleep(self.db_sync_interval)
                 self._sync_to_database()
+                if time.time() - self.last_snapshot_time >= self.snapshot_interval:
+                    self.save_snapshot()
             except Exception as e:
                 logger.error(f"Error in database sync loop: {e}")
     
     def _sync_to_database(self):
-        """Sync in-memory persons to database"""
-        with self.lock:
+        """
+        Sync persons changed since the last sync to the database
+        Only the snapshot of dirty persons is taken under self.lock; rows are built and
+        written with one bulk upsert after the lock is released, so cameras never wait on the DB
+        """
+        with self.sync_lock:
+            lock_start = time.time()
+            with self.lock:
+                dirty_ids, self.dirty_ids = self.dirty_ids, set()
+                deactivated_ids, self.deactivated_ids = self.deactivated_ids, set()
+                snapshots = [self._snapshot_person(self.persons[global_id])
+                             for global_id in dirty_ids if global_id in self.persons]
+            self.last_sync_lock_time = time.time() - lock_start
+            
+            if not snapshots and not deactivated_ids:
+                return
+            
+            start = time.time()
             try:
                 db = SessionLocal()
                 try:
-                    for global_id, person in self.persons.items():
-                        # Check if person exists in database
-                        dp = db.query(DetectedPerson).filter(
-                            DetectedPerson.global_id == global_id
-                        ).first()
-                        
-                        # Calculate average dimensions from positions
-                        avg_height = 0.0
-                        avg_width = 0.0
-                        if person.camera_positions:
-                            heights = []
-                            widths = []
-                            for bbox in person.camera_positions.values():
-                                x1, y1, x2, y2 = bbox
-                                heights.append(y2 - y1)
-                                widths.append(x2 - x1)
-                            avg_height = sum(heights) / len(heights) if heights else 0.0
-                            avg_width = sum(widths) / len(widths) if widths else 0.0
-                        
-                        # Prepare current positions for JSON
-                        current_positions = {}
-                        for cam_id, bbox in person.camera_positions.items():
-                            current_positions[str(cam_id)] = {
-                                'bbox': list(bbox),
-                                'timestamp': datetime.now().isoformat()
-                            }
-                        
-                        if dp:
-                            # Update existing record
-                            dp.assigned_name = person.name
-                            dp.last_seen = datetime.fromtimestamp(person.last_seen)
-                            dp.total_appearances = person.total_appearances
-                            dp.cameras_visited = list(person.cameras_visited)
-                            dp.is_active = person.is_active(self.person_timeout)
-                            dp.current_positions = current_positions
-                            dp.avg_height_pixels = avg_height
-                            dp.avg_width_pixels = avg_width
-                            
-                            # Update face embedding if better quality
-                            if person.face_embedding is not None and person.best_face_quality > (dp.face_quality or 0):
-                                dp.face_embedding = person.face_embedding.tolist()
-                                dp.face_quality = person.best_face_quality
-                        else:
-                            # Create new record
-                            dp = DetectedPerson(
-                                global_id=global_id,
-                                assigned_name=person.name,
-                                face_embedding=person.face_embedding.tolist() if person.face_embedding is not None else None,
-                                face_quality=person.best_face_quality,
-                                avg_height_pixels=avg_height,
-                                avg_width_pixels=avg_width,
-                                first_seen=datetime.fromtimestamp(person.first_seen),
-                                last_seen=datetime.fromtimestamp(person.last_seen),
-                                total_appearances=person.total_appearances,
-                                cameras_visited=list(person.cameras_visited),
-                                is_active=person.is_active(self.person_timeout),
-                                current_positions=current_positions
-                            )
-                            db.add(dp)
+                    rows = [self._person_row(snapshot) for snapshot in snapshots]
+                    if rows:
+                        db.execute(self._upsert_statement(db, rows))
+                    
+                    # Provisional IDs merged into another person / cleaned up persons are no longer active
+                    if deactivated_ids:
+                        db.query(DetectedPerson).filter(
+                            DetectedPerson.global_id.in_(deactivated_ids)
+                        ).update({DetectedPerson.is_active: False}, synchronize_session=False)
                     
                     db.commit()
-                    logger.debug(f"💾 Synced {len(self.persons)} persons to database")
+                    
+                    self.sync_count += 1
+                    self.last_sync_rows = len(rows) + len(deactivated_ids)
+                    self.rows_written += self.last_sync_rows
+                    self.last_sync_latency = time.time() - start
+                    logger.debug(f"💾 Synced {len(rows)} persons to database "
+                                 f"({len(deactivated_ids)} deactivated, {self.last_sync_latency * 1000:.0f}ms)")
                     
                 finally:
                     db.close()
             except Exception as e:
+                # Keep the changes for the next sync (newer changes are already marked dirty)
+                with self.lock:
+                    self.dirty_ids |= dirty_ids
+                    self.deactivated_ids |= deactivated_ids
+                self.sync_failures += 1
                 logger.error(f"Failed to sync persons to database: {e}")
+    
+    def _snapshot_person(self, person: GlobalPerson) -> Dict:
+        """Copy the fields the database row needs (called under self.lock, no DB or JSON work)"""
+        return {
+            'global_id': person.global_id,
+            'name': person.name,
+            'face_embedding': person.face_embedding,  # Replaced, never mutated in place
+            'face_quality': person.best_face_quality,
+            'first_seen': person.first_seen,
+            'last_seen': person.last_seen,
+            'total_appearances': person.total_appearances,
+            'cameras_visited': list(person.cameras_visited),
+            'is_active': person.is_active(self.person_timeout),
+            'camera_positions': dict(person.camera_positions)
+        }
+    
+    @staticmethod
+    def _person_row(snapshot: Dict) -> Dict:
+        """detected_persons row for a person snapshot"""
+        positions = snapshot['camera_positions']
+        
+        # Calculate average dimensions from positions
+        avg_height = 0.0
+        avg_width = 0.0
+        if positions:
+            avg_height = sum(y2 - y1 for _, y1, _, y2 in positions.values()) / len(positions)
+            avg_width = sum(x2 - x1 for x1, _, x2, _ in positions.values()) / len(positions)
+        
+        # Prepare current positions for JSON
+        timestamp = datetime.now().isoformat()
+        current_positions = {
+            str(cam_id): {'bbox': [int(v) for v in bbox], 'timestamp': timestamp}
+            for cam_id, bbox in positions.items()
+        }
+        
+        embedding = snapshot['face_embedding']
+        return {
+            'global_id': snapshot['global_id'],
+            'assigned_name': snapshot['name'],
+            'face_embedding': embedding.tolist() if embedding is not None else None,
+            'face_quality': snapshot['face_quality'],
+            'avg_height_pixels': avg_height,
+            'avg_width_pixels': avg_width,
+            'first_seen': datetime.fromtimestamp(snapshot['first_seen']),
+            'last_seen': datetime.fromtimestamp(snapshot['last_seen']),
+            'total_appearances': snapshot['total_appearances'],
+            'cameras_visited': snapshot['cameras_visited'],
+            'is_active': snapshot['is_active'],
+            'current_positions': current_positions
+        }
+    
+    @staticmethod
+    def _upsert_statement(db: Session, rows: List[Dict]):
+        """
+        Single INSERT ... ON CONFLICT (global_id) DO UPDATE for all rows
+        first_seen is kept from the existing row; the embedding is only replaced by a better-quality one
+        """
+        dialect = postgresql if db.get_bind().dialect.name == 'postgresql' else sqlite
+        table = DetectedPerson.__table__
+        stmt = dialect.insert(table).values(rows)
+        excluded = stmt.excluded
+        better_embedding = (excluded.face_embedding.isnot(None)) & (
+            excluded.face_quality > func.coalesce(table.c.face_quality, 0))
+        
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.global_id],
+            set_={
+                'assigned_name': excluded.assigned_name,
+                'last_seen': excluded.last_seen,
+                'total_appearances': excluded.total_appearances,
+                'cameras_visited': excluded.cameras_visited,
+                'is_active': excluded.is_active,
+                'current_positions': excluded.current_positions,
+                'avg_height_pixels': excluded.avg_height_pixels,
+                'avg_width_pixels': excluded.avg_width_pixels,
+                'face_embedding': case((better_embedding, excluded.face_embedding), else_=table.c.face_embedding),
+                'face_quality': case((better_embedding, excluded.face_quality), else_=table.c.face_quality)
+            }
+        )
 
 
 # Global singleton instance
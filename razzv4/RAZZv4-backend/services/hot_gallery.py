@@ -0,0 +1,102 @@
+"""
+Hot tier of the person gallery
+Templates of persons seen within the tracker's person_timeout, kept in one contiguous
+numpy matrix and searched exactly with a single matrix-vector product, so re-matching
+someone who just left a camera's view never touches FAISS
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+class HotGallery:
+    """
+    Exact in-memory search over recently seen persons
+    - One row per person in a preallocated float32 matrix (doubles when full)
+    - upsert() overwrites the person's row in place; remove() moves the last row into the gap
+    - Membership is managed by the tracker (promotion on match / cleanup, demotion on cleanup)
+    """
+
+    def __init__(self, embedding_dim: int = 512, initial_capacity: int = 64):
+        """
+        Initialize hot gallery
+
+        Args:
+            embedding_dim: Dimension of embeddings (512 for OSNet)
+            initial_capacity: Rows allocated up front
+        """
+        self.embedding_dim = embedding_dim
+        self.matrix = np.zeros((max(1, initial_capacity), embedding_dim), dtype=np.float32)
+        self.ids: List[int] = []  # Row -> global_id
+        self.rows: Dict[int, int] = {}  # global_id -> row
+
+        # Statistics
+        self.searches = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, global_id: int) -> bool:
+        return global_id in self.rows
+
+    def upsert(self, global_id: int, embedding: np.ndarray):
+        """Add a person or replace their template"""
+        row = self.rows.get(global_id)
+        if row is None:
+            if len(self.ids) == len(self.matrix):
+                grown = np.zeros((len(self.matrix) * 2, self.embedding_dim), dtype=np.float32)
+                grown[:len(self.matrix)] = self.matrix
+                self.matrix = grown
+            row = len(self.ids)
+            self.ids.append(global_id)
+            self.rows[global_id] = row
+        self.matrix[row] = embedding / (np.linalg.norm(embedding) + 1e-8)
+
+    def remove(self, global_id: int) -> bool:
+        """Drop a person (the last row fills the gap)"""
+        row = self.rows.pop(global_id, None)
+        if row is None:
+            return False
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.matrix[row] = self.matrix[last]
+            self.ids[row] = moved_id
+            self.rows[moved_id] = row
+        self.ids.pop()
+        return True
+
+    def search(self, query_embedding: np.ndarray, k: int = 5, threshold: float = 0.5) -> List[Tuple[int, float]]:
+        """
+        Exact cosine search
+
+        Args:
+            query_embedding: Query embedding (normalized)
+            k: Number of results
+            threshold: Minimum similarity
+
+        Returns:
+            (global_id, similarity) best first
+        """
+        count = len(self.ids)
+        if count == 0:
+            return []
+        self.searches += 1
+
+        similarities = self.matrix[:count] @ query_embedding.astype(np.float32, copy=False)
+        top = np.argpartition(-similarities, k)[:k] if count > k else np.arange(count)
+        top = top[np.argsort(-similarities[top])]
+        results = [(self.ids[i], float(similarities[i])) for i in top if similarities[i] > threshold]
+        if results:
+            self.hits += 1
+        return results
+
+    def get_stats(self) -> Dict:
+        """Get hot tier statistics"""
+        return {
+            'size': len(self.ids),
+            'capacity': len(self.matrix),
+            'searches': self.searches,
+            'hits': self.hits
+        }
@@ -0,0 +1,181 @@
+"""
+Inference Scheduler for cross-camera batched YOLO detection
+Collects pending frames from all camera processors and runs them as one batched predict call
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+import numpy as np
+import supervision as sv
+from logging_config import get_logger
+from config import get_settings
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class InferenceRequest:
+    """A single frame waiting for detection"""
+    camera_id: int
+    frame: np.ndarray
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class InferenceScheduler:
+    """
+    Central YOLO inference scheduler owned by CameraService
+    - Camera threads submit frames and block on their own result
+    - A single worker thread drains the queue and runs one batched predict
+    - A batch is dispatched when it is full or the oldest request hits its deadline
+    """
+
+    def __init__(self, yolo_service, max_batch_size: int = None, max_wait_ms: float = None):
+        """
+        Initialize inference scheduler
+
+        Args:
+            yolo_service: YOLOService instance (the only caller of the model once started)
+            max_batch_size: Maximum frames per predict call. If None, uses value from config
+            max_wait_ms: Maximum time the oldest frame waits for a batch to fill. If None, uses value from config
+        """
+        self.yolo_service = yolo_service
+        self.max_batch_size = max(1, max_batch_size or settings.INFERENCE_MAX_BATCH_SIZE)
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.INFERENCE_MAX_WAIT_MS) / 1000.0
+
+        self.pending: Deque[InferenceRequest] = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.batches_run = 0
+        self.frames_processed = 0
+        self.last_batch_size = 0
+        self.last_batch_latency = 0.0
+
+        logger.info(f"✅ Inference scheduler initialized (max_batch={self.max_batch_size}, max_wait={self.max_wait * 1000:.0f}ms)")
+
+    def start(self):
+        """Start the batching worker thread (idempotent)"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        logger.info("Inference scheduler started")
+
+    def stop(self):
+        """Stop the worker thread and fail any frames still waiting"""
+        with self.condition:
+            if not self.running:
+                return
+            self.running = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+        with self.condition:
+            while self.pending:
+                request = self.pending.popleft()
+                if not request.future.done():
+                    request.future.set_exception(RuntimeError("Inference scheduler stopped"))
+        logger.info("Inference scheduler stopped")
+
+    def submit(self, camera_id: int, frame: np.ndarray) -> Future:
+        """
+        Queue a frame for the next batch
+
+        Args:
+            camera_id: Camera that owns the frame
+            frame: BGR frame from OpenCV
+
+        Returns:
+            Future resolving to (person_count, detections_list, detections_sv)
+        """
+        request = InferenceRequest(camera_id=camera_id, frame=frame)
+        with self.condition:
+            if not self.running:
+                request.future.set_exception(RuntimeError("Inference scheduler is not running"))
+                return request.future
+            self.pending.append(request)
+            self.condition.notify_all()
+        return request.future
+
+    def detect_people(self, camera_id: int, frame: np.ndarray,
+                      timeout: Optional[float] = 5.0) -> Tuple[int, List[dict], sv.Detections]:
+        """
+        Blocking drop-in for YOLOService.detect_people that goes through the batch queue
+
+        Args:
+            camera_id: Camera that owns the frame
+            frame: BGR frame from OpenCV
+            timeout: Seconds to wait for the batch result
+
+        Returns:
+            Tuple of (person_count, detections_list, detections_sv)
+        """
+        return self.submit(camera_id, frame).result(timeout=timeout)
+
+    def _next_batch(self) -> List[InferenceRequest]:
+        """Wait until a batch is full or the oldest request reaches its deadline"""
+        with self.condition:
+            while self.running and not self.pending:
+                self.condition.wait()
+
+            while self.running and len(self.pending) < self.max_batch_size:
+                remaining = self.pending[0].submitted_at + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(timeout=remaining)
+
+            batch = []
+            while self.pending and len(batch) < self.max_batch_size:
+                batch.append(self.pending.popleft())
+            return batch
+
+    def _run_loop(self):
+        """Worker loop: collect a batch, run one predict, hand each camera its result"""
+        while self.running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            start = time.monotonic()
+            try:
+                results = self.yolo_service.detect_people_batch([request.frame for request in batch])
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            except Exception as e:
+                logger.error(f"Error running batched inference for {len(batch)} frames: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+            self.last_batch_latency = time.monotonic() - start
+            self.last_batch_size = len(batch)
+            self.batches_run += 1
+            self.frames_processed += len(batch)
+            logger.debug(f"Batched inference: {len(batch)} frames in {self.last_batch_latency * 1000:.1f}ms")
+
+    def get_stats(self) -> Dict:
+        """Get scheduler statistics"""
+        with self.condition:
+            queue_depth = len(self.pending)
+        return {
+            'running': self.running,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': queue_depth,
+            'batches_run': self.batches_run,
+            'frames_processed': self.frames_processed,
+            'avg_batch_size': round(self.frames_processed / self.batches_run, 2) if self.batches_run else 0.0,
+            'last_batch_size': self.last_batch_size,
+            'last_batch_latency_ms': round(self.last_batch_latency * 1000, 2)
+        }
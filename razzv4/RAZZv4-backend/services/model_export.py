@@ -0,0 +1,236 @@
+"""
+YOLO Model Export for CPU inference backends
+Exports .pt weights to ONNX Runtime / OpenVINO (optionally int8, calibrated on our own
+camera footage) once, and caches the result so later starts load it directly
+"""
+
+import fcntl
+import glob
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+import cv2
+import numpy as np
+from logging_config import get_logger
+from config import get_settings
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Backends that need an exported model (pytorch loads the .pt directly)
+EXPORT_BACKENDS = ('onnx', 'openvino')
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+
+def exported_model_path(model_name: str, backend: str, imgsz: int, int8: bool, export_dir: str = None) -> Path:
+    """
+    Cache location of an exported model
+
+    Args:
+        model_name: Source weights (e.g. yolo11m.pt)
+        backend: 'onnx' or 'openvino'
+        imgsz: Export input size
+        int8: Whether the export is int8-quantized
+        export_dir: Cache directory. If None, uses value from config
+
+    Returns:
+        .onnx file path or OpenVINO model directory path
+    """
+    export_dir = Path(export_dir or settings.YOLO_EXPORT_DIR)
+    stem = f"{Path(model_name).stem}_{imgsz}{'_int8' if int8 else ''}"
+    if backend == 'onnx':
+        return export_dir / f"{stem}.onnx"
+    return export_dir / f"{stem}_openvino_model"
+
+
+@contextmanager
+def _export_lock(path: Path):
+    """Cross-process lock so several camera workers never export the same model at once"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(f"{path}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def ensure_exported_model(model_name: str, backend: str, imgsz: int = None, int8: bool = False,
+                          calibration_source: str = None, export_dir: str = None) -> str:
+    """
+    Return the cached export for a model/backend, exporting it on first use
+
+    Args:
+        model_name: Source .pt weights
+        backend: 'onnx' or 'openvino'
+        imgsz: Export input size. If None, uses value from config
+        int8: Quantize to int8 (needs calibration_source)
+        calibration_source: Video file, RTSP URL or image directory for int8 calibration.
+                            If None, uses value from config
+        export_dir: Cache directory. If None, uses value from config
+
+    Returns:
+        Path to load with ultralytics.YOLO
+    """
+    if backend not in EXPORT_BACKENDS:
+        raise ValueError(f"Unsupported export backend: {backend}")
+
+    imgsz = imgsz or settings.YOLO_IMGSZ
+    target = exported_model_path(model_name, backend, imgsz, int8, export_dir)
+
+    with _export_lock(target):
+        if target.exists():
+            logger.info(f"✅ Using cached {backend}{' int8' if int8 else ''} model: {target}")
+            return str(target)
+
+        calibration_source = calibration_source or settings.YOLO_INT8_CALIBRATION_SOURCE
+        if int8 and not calibration_source:
+            raise ValueError("int8 export needs YOLO_INT8_CALIBRATION_SOURCE (video, RTSP URL or image directory)")
+
+        logger.info(f"📦 Exporting {model_name} to {backend}{' int8' if int8 else ''} (imgsz={imgsz}), first start only...")
+        # Export into a private directory next to the cache, then rename into place: a crashed
+        # export never leaves a partial "cached" model, and concurrent exports of the same
+        # weights (onnx and onnx int8 lock different targets) never share intermediate files
+        with tempfile.TemporaryDirectory(dir=target.parent, prefix=f".{target.name}.") as work_dir:
+            staged = Path(work_dir) / target.name
+            weights = _stage_weights(model_name, work_dir)
+            if backend == 'onnx':
+                _export_onnx(weights, staged, imgsz, int8, calibration_source)
+            else:
+                _export_openvino(weights, staged, imgsz, int8, calibration_source)
+            os.replace(staged, target)
+
+        logger.info(f"✅ Exported model cached at {target}")
+        return str(target)
+
+
+def _stage_weights(model_name: str, work_dir: str) -> str:
+    """Copy the .pt weights into work_dir (Ultralytics writes its exports next to the weights)"""
+    from ultralytics import YOLO
+
+    weights = Path(YOLO(model_name).ckpt_path)  # Resolves (and downloads) official weights
+    staged = Path(work_dir) / weights.name
+    shutil.copy2(weights, staged)
+    return str(staged)
+
+
+def _export_onnx(model_name: str, target: Path, imgsz: int, int8: bool, calibration_source: Optional[str]):
+    """FP32 ONNX via Ultralytics; int8 via ONNX Runtime static quantization on our frames"""
+    from ultralytics import YOLO
+
+    # Dynamic batch so the inference scheduler can send several cameras per call
+    exported = Path(YOLO(model_name).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True))
+
+    if not int8:
+        os.replace(exported, target)
+        return
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    frames = collect_calibration_frames(calibration_source)
+
+    class _FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.iterator = iter(frames)
+
+        def get_next(self):
+            frame = next(self.iterator, None)
+            if frame is None:
+                return None
+            return {'images': preprocess_frame(frame, imgsz)}
+
+    quantize_static(
+        str(exported), str(target), _FrameReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+    os.remove(exported)
+
+
+def _export_openvino(model_name: str, target: Path, imgsz: int, int8: bool, calibration_source: Optional[str]):
+    """OpenVINO IR via Ultralytics; int8 uses NNCF with a throwaway dataset built from our frames"""
+    from ultralytics import YOLO
+
+    export_kwargs = {'format': 'openvino', 'imgsz': imgsz, 'dynamic': True}
+
+    with tempfile.TemporaryDirectory(prefix='yolo_calib_') as calib_dir:
+        if int8:
+            export_kwargs['int8'] = True
+            export_kwargs['data'] = _write_calibration_dataset(collect_calibration_frames(calibration_source), calib_dir)
+        exported = YOLO(model_name).export(**export_kwargs)
+
+    os.replace(exported, target)
+
+
+def _write_calibration_dataset(frames: List[np.ndarray], directory: str) -> str:
+    """Write frames as an images-only dataset yaml (calibration needs inputs, not labels)"""
+    images_dir = Path(directory) / 'images'
+    images_dir.mkdir(parents=True)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(str(images_dir / f"calib_{i:05d}.jpg"), frame)
+
+    data_yaml = Path(directory) / 'calibration.yaml'
+    data_yaml.write_text(f"path: {directory}\ntrain: images\nval: images\nnames:\n  0: person\n")
+    return str(data_yaml)
+
+
+def iter_source_frames(source: str, max_frames: int, stride: int = 1) -> Iterator[np.ndarray]:
+    """
+    Read frames from an image directory, video file or stream
+
+    Args:
+        source: Directory of images, video path or RTSP URL
+        max_frames: Stop after this many frames
+        stride: Keep every Nth frame (videos/streams)
+    """
+    if os.path.isdir(source):
+        paths = sorted(p for pattern in IMAGE_EXTENSIONS for p in glob.glob(os.path.join(source, pattern)))
+        for path in paths[:max_frames]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                yield frame
+        return
+
+    capture = cv2.VideoCapture(source)
+    try:
+        index = kept = 0
+        while kept < max_frames:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            if index % stride == 0:
+                kept += 1
+                yield frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def collect_calibration_frames(source: str, num_frames: int = None) -> List[np.ndarray]:
+    """Sample calibration frames spread across the footage (every 10th frame of videos/streams)"""
+    num_frames = num_frames or settings.YOLO_INT8_CALIBRATION_FRAMES
+    frames = list(iter_source_frames(source, num_frames, stride=10))
+    if not frames:
+        raise ValueError(f"No calibration frames could be read from {source}")
+    logger.info(f"Collected {len(frames)} calibration frames from {source}")
+    return frames
+
+
+def preprocess_frame(frame: np.ndarray, imgsz: int) -> np.ndarray:
+    """Letterbox + BGR->RGB + CHW float32 [0, 1], matching Ultralytics preprocessing (batch of 1)"""
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
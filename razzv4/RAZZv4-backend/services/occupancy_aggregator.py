@@ -0,0 +1,219 @@
+"""
+Occupancy Count Aggregator
+All camera processors report people-count changes here instead of opening a transaction per
+change; per-camera and per-room totals are kept in memory and flushed on a timer with one
+set-based UPDATE per table, writing only the values that changed since the last flush
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Set
+from sqlalchemy import case, update
+from logging_config import get_logger
+from config import get_settings
+from models import Camera, VaultRoom
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+class OccupancyAggregator:
+    """
+    Coalescing people-count publisher
+    - report() only records the latest count of a camera (any thread, never touches the database)
+    - Room totals are the sum of their cameras' counts, recomputed in memory at flush time
+    - Flicker inside one flush interval (3 -> 4 -> 3) writes nothing
+    - A failed flush keeps the values pending and retries on the next tick
+    - The camera -> room mapping is reloaded every metadata interval, after invalidate()
+      (rooms / cameras edited) and when an unknown camera reports
+    """
+
+    def __init__(self, db_session_factory, flush_interval_ms: float = None, metadata_interval: float = None):
+        """
+        Initialize aggregator
+
+        Args:
+            db_session_factory: Database session factory
+            flush_interval_ms: Milliseconds between flushes. If None, uses value from config
+            metadata_interval: Seconds between camera -> room mapping reloads. If None, uses value from config
+        """
+        self.db_session_factory = db_session_factory
+        self.flush_interval = (flush_interval_ms if flush_interval_ms is not None
+                               else settings.OCCUPANCY_FLUSH_INTERVAL_MS) / 1000.0
+        self.metadata_interval = (metadata_interval if metadata_interval is not None
+                                  else settings.OCCUPANCY_METADATA_REFRESH)
+
+        self.camera_counts: Dict[int, int] = {}  # Latest count per camera
+        self.camera_rooms: Dict[int, Optional[int]] = {}  # {camera_id: vault_room_id}
+        self.room_ids: Set[int] = set()
+        self.written_cameras: Dict[int, int] = {}  # Values the database holds
+        self.written_rooms: Dict[int, int] = {}
+        self.mapping_stale = True  # Reload camera -> room mapping (startup, unknown camera, invalidate())
+        self.mapping_loaded_at = 0.0
+
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.reports = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.rows_written = 0
+        self.last_flush_latency = 0.0
+
+    def start(self):
+        """Start the flush thread (idempotent)"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"✅ Occupancy aggregator started (flush every {self.flush_interval * 1000:.0f}ms)")
+
+    def stop(self):
+        """Stop the flush thread after writing the pending counts"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return
+        self.stop_event.set()
+        thread.join(timeout=5)
+        self.flush()
+        logger.info("Occupancy aggregator stopped")
+
+    def report(self, camera_id: int, person_count: int):
+        """
+        Record a camera's current people count (written on the next flush)
+
+        Args:
+            camera_id: Camera ID
+            person_count: People currently counted by the camera
+        """
+        with self.lock:
+            self.camera_counts[camera_id] = person_count
+            if camera_id not in self.camera_rooms:
+                self.mapping_stale = True
+            self.reports += 1
+
+    def invalidate(self):
+        """Rooms or cameras were edited: reload the camera -> room mapping on the next flush"""
+        self.mapping_stale = True
+
+    def get_counts(self) -> Dict[str, Dict[int, int]]:
+        """In-memory totals: {'cameras': {camera_id: count}, 'rooms': {room_id: count}}"""
+        with self.lock:
+            return {'cameras': dict(self.camera_counts), 'rooms': self._room_totals()}
+
+    def _room_totals(self) -> Dict[int, int]:
+        """Sum of camera counts per room; rooms without cameras count 0 (caller holds self.lock)"""
+        totals = dict.fromkeys(self.room_ids, 0)
+        for camera_id, room_id in self.camera_rooms.items():
+            if room_id in totals:
+                totals[room_id] += self.camera_counts.get(camera_id, 0)
+        return totals
+
+    def _load_mapping(self, db):
+        """Camera -> room mapping, plus the counts the database holds for cameras not reported yet"""
+        rows = db.query(Camera.id, Camera.vault_room_id, Camera.current_people_count).all()
+        room_rows = db.query(VaultRoom.id, VaultRoom.current_people_count).all()
+        with self.lock:
+            self.camera_rooms = {camera_id: room_id for camera_id, room_id, _ in rows}
+            self.room_ids = {room_id for room_id, _ in room_rows}
+            for camera_id, _, stored in rows:
+                self.written_cameras.setdefault(camera_id, stored or 0)
+                self.camera_counts.setdefault(camera_id, stored or 0)
+            for room_id, stored in room_rows:
+                self.written_rooms.setdefault(room_id, stored or 0)
+
+            # Deleted cameras / rooms stop contributing (moved cameras count towards their new room)
+            for counts in (self.camera_counts, self.written_cameras):
+                for camera_id in [camera_id for camera_id in counts if camera_id not in self.camera_rooms]:
+                    del counts[camera_id]
+            for room_id in [room_id for room_id in self.written_rooms if room_id not in self.room_ids]:
+                del self.written_rooms[room_id]
+            self.mapping_stale = False
+            self.mapping_loaded_at = time.monotonic()
+
+    def flush(self) -> int:
+        """
+        Write changed camera and room counts (one UPDATE per table, one transaction)
+
+        Returns:
+            Rows written
+        """
+        with self.flush_lock:
+            start = time.monotonic()
+            try:
+                db = self.db_session_factory()
+                try:
+                    if self.mapping_stale or time.monotonic() - self.mapping_loaded_at >= self.metadata_interval:
+                        self._load_mapping(db)
+
+                    with self.lock:
+                        cameras = {camera_id: count for camera_id, count in self.camera_counts.items()
+                                   if camera_id in self.camera_rooms and self.written_cameras.get(camera_id) != count}
+                        rooms = {room_id: count for room_id, count in self._room_totals().items()
+                                 if self.written_rooms.get(room_id) != count}
+                    if not cameras and not rooms:
+                        return 0
+
+                    if cameras:
+                        db.execute(update(Camera).where(Camera.id.in_(cameras)).values(
+                            current_people_count=case(cameras, value=Camera.id)))
+                    if rooms:
+                        db.execute(update(VaultRoom).where(VaultRoom.id.in_(rooms)).values(
+                            current_people_count=case(rooms, value=VaultRoom.id)))
+                    db.commit()
+                finally:
+                    db.close()
+            except Exception as e:
+                self.flush_failures += 1
+                logger.error(f"Failed to flush occupancy counts: {e}")
+                return 0
+
+            with self.lock:
+                self.written_cameras.update(cameras)
+                self.written_rooms.update(rooms)
+            self.flushes += 1
+            self.rows_written += len(cameras) + len(rooms)
+            self.last_flush_latency = time.monotonic() - start
+            logger.debug(f"💾 Flushed occupancy: {len(cameras)} cameras, {len(rooms)} rooms")
+            return len(cameras) + len(rooms)
+
+    def _run_loop(self):
+        """Flush loop"""
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def get_stats(self) -> Dict:
+        """Get aggregator statistics"""
+        return {
+            'running': self.thread is not None,
+            'reports': self.reports,
+            'flushes': self.flushes,
+            'flush_failures': self.flush_failures,
+            'rows_written': self.rows_written,
+            'last_flush_latency_ms': round(self.last_flush_latency * 1000, 1)
+        }
+
+
+# Global instance
+_occupancy_aggregator = None
+
+
+def get_occupancy_aggregator(db_session_factory) -> OccupancyAggregator:
+    """Get singleton occupancy aggregator (flush thread started)"""
+    global _occupancy_aggregator
+    if _occupancy_aggregator is None:
+        _occupancy_aggregator = OccupancyAggregator(db_session_factory)
+        _occupancy_aggregator.start()
+    return _occupancy_aggregator
+
+
+def invalidate_occupancy_mapping():
+    """Rooms or cameras were edited: the running aggregator (if any) reloads its camera -> room mapping"""
+    if _occupancy_aggregator is not None:
+        _occupancy_aggregator.invalidate()
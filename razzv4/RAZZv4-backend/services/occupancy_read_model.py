@@ -0,0 +1,292 @@
+"""
+Live Occupancy Read Model
+A background thread rebuilds the per-room views served by the vault_rooms polling routes
+(people count, people list, tracking stats, all-room counts) at a fixed rate. Each view is
+versioned and pre-encoded, so a dashboard poll is a dict lookup - unchanged polls answer
+304 on If-None-Match - and never touches the database or the tracker locks
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from logging_config import get_logger
+from config import get_settings
+from models import VaultRoom, Camera
+from services.occupancy_aggregator import get_occupancy_aggregator, invalidate_occupancy_mapping
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# View names
+PEOPLE_COUNT = 'people_count'
+PEOPLE = 'people'
+TRACKING_STATS = 'tracking_stats'
+ALL_COUNTS = 'all_counts'
+
+# Per-frame fields: they alone never move a view's version (see OccupancyReadModel._publish)
+VOLATILE_FIELDS = frozenset({'bbox', 'confidence', 'last_seen', 'last_update'})
+
+
+def _stable(value):
+    """Payload without its volatile fields (change detection)"""
+    if isinstance(value, dict):
+        return {k: _stable(v) for k, v in value.items() if k not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        return [_stable(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class OccupancyView:
+    """One published version of a view"""
+    version: int
+    etag: str
+    body: bytes  # Encoded JSON payload
+
+
+class OccupancyReadModel:
+    """
+    Versioned live views of every vault room
+    - refresh() builds all views in one pass over the live pipeline state
+    - A view's version only moves when its content changed; per-frame fields (boxes, confidences,
+      last-seen times) alone republish at most once per volatile interval
+    - Room and camera metadata is cached and reloaded every metadata interval or after invalidate()
+    - get() is lock-free: published views are immutable and swapped in whole
+    """
+
+    def __init__(self, camera_service, tracking_service, db_session_factory,
+                 refresh_interval_ms: float = None, metadata_interval: float = None,
+                 volatile_interval: float = None):
+        """
+        Initialize read model
+
+        Args:
+            camera_service: CameraService (processor liveness)
+            tracking_service: TrackingService (live tracks and global IDs)
+            db_session_factory: Database session factory (room / camera metadata only)
+            refresh_interval_ms: Milliseconds between view rebuilds. If None, uses value from config
+            metadata_interval: Seconds between room / camera metadata reloads. If None, uses value from config
+            volatile_interval: Seconds between versions that only change per-frame fields. If None, uses value from config
+        """
+        self.camera_service = camera_service
+        self.tracking_service = tracking_service
+        self.db_session_factory = db_session_factory
+        self.refresh_interval = (refresh_interval_ms if refresh_interval_ms is not None
+                                 else settings.OCCUPANCY_READ_MODEL_INTERVAL_MS) / 1000.0
+        self.metadata_interval = (metadata_interval if metadata_interval is not None
+                                  else settings.OCCUPANCY_METADATA_REFRESH)
+        self.volatile_interval = (volatile_interval if volatile_interval is not None
+                                  else settings.OCCUPANCY_VOLATILE_REFRESH)
+
+        self.rooms: Dict[int, Dict] = {}  # {room_id: {'name': str, 'cameras': [{'id', 'name', 'is_active'}]}}
+        self.metadata_loaded_at = 0.0
+        self.metadata_stale = True
+
+        self.views: Dict[Tuple[str, Optional[int]], OccupancyView] = {}
+        self.payloads: Dict[Tuple[str, Optional[int]], Tuple[Dict, Dict]] = {}  # Last (stable, full) content per view
+        self.published_at: Dict[Tuple[str, Optional[int]], float] = {}
+        self.epoch = int(time.time())  # ETags never repeat across restarts
+
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.refreshes = 0
+        self.versions_published = 0
+        self.last_refresh_latency = 0.0
+
+    def start(self):
+        """Build the first views synchronously, then refresh in the background"""
+        global _active_read_model
+        if self.thread is not None:
+            return
+        self.refresh()
+        _active_read_model = self
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"✅ Occupancy read model started (refresh every {self.refresh_interval * 1000:.0f}ms)")
+
+    def stop(self):
+        """Stop the refresh thread"""
+        global _active_read_model
+        if _active_read_model is self:
+            _active_read_model = None
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def invalidate(self):
+        """Reload room / camera metadata on the next refresh (rooms or cameras were edited)"""
+        self.metadata_stale = True
+
+    def get(self, view: str, room_id: Optional[int] = None) -> Optional[OccupancyView]:
+        """Current version of a view (None if the room does not exist)"""
+        return self.views.get((view, room_id))
+
+    def _run_loop(self):
+        """Refresh loop"""
+        while not self.stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing occupancy read model: {e}")
+
+    def _load_metadata(self):
+        """Rooms with their cameras (one query per table)"""
+        db = self.db_session_factory()
+        try:
+            rooms = {room_id: {'name': name, 'cameras': []}
+                     for room_id, name in db.query(VaultRoom.id, VaultRoom.name).order_by(VaultRoom.id)}
+            for camera_id, name, room_id, is_active in db.query(
+                    Camera.id, Camera.name, Camera.vault_room_id, Camera.is_active).order_by(Camera.id):
+                if room_id in rooms:
+                    rooms[room_id]['cameras'].append({'id': camera_id, 'name': name, 'is_active': bool(is_active)})
+        finally:
+            db.close()
+        self.rooms = rooms
+        self.metadata_loaded_at = time.time()
+        self.metadata_stale = False
+
+    def refresh(self):
+        """Rebuild every view from the live pipeline state and publish the ones that changed"""
+        start = time.monotonic()
+        if self.metadata_stale or time.time() - self.metadata_loaded_at >= self.metadata_interval:
+            self._load_metadata()
+
+        now = time.time()
+        processors = self.camera_service.processors if self.camera_service else {}
+        camera_tracks = self.tracking_service.camera_tracks if self.tracking_service else {}
+
+        def running(camera_id: int) -> bool:
+            processor = processors.get(camera_id)
+            return bool(processor and processor.is_running)
+
+        live_keys = set()
+        all_rooms = []
+        stored_counts = get_occupancy_aggregator(self.db_session_factory).get_counts()
+        for room_id, room in self.rooms.items():
+            active = [camera for camera in room['cameras'] if camera['is_active']]
+            live_ids = [camera['id'] for camera in active if running(camera['id'])]
+
+            # People (one walk over the live tracks per room and refresh, shared by the views)
+            people_list = []
+            if self.tracking_service and live_ids:
+                people_list = [{k: v for k, v in person.items() if k != 'feature'}
+                               for person in self.tracking_service.get_people_in_room(live_ids)]
+            # Count unique people by global ID (same person in multiple cameras = 1 person)
+            unique_global_ids = set(person['track_id'] for person in people_list)
+
+            self._publish(live_keys, (PEOPLE_COUNT, room_id), {
+                "room_id": room_id,
+                "room_name": room['name'],
+                "total_people_count": len(unique_global_ids),
+                "cameras": [{
+                    "camera_id": camera['id'],
+                    "camera_name": camera['name'],
+                    "people_count": camera_tracks.get(camera['id'], {}).get('count', 0) if running(camera['id']) else 0
+                } for camera in active]
+            }, now)
+
+            self._publish(live_keys, (PEOPLE, room_id), {
+                "room_id": room_id,
+                "room_name": room['name'],
+                "current_people_count": len(unique_global_ids),
+                "total_detections": len(people_list),
+                "people": people_list
+            }, now)
+
+            camera_stats = []
+            for camera in active:
+                if not running(camera['id']):
+                    camera_stats.append({"camera_id": camera['id'], "camera_name": camera['name'],
+                                         "tracking_enabled": False})
+                    continue
+                cam_tracks = camera_tracks.get(camera['id'], {})
+                camera_stats.append({
+                    "camera_id": camera['id'],
+                    "camera_name": camera['name'],
+                    "tracking_enabled": True,
+                    "statistics": {
+                        "active_tracks": cam_tracks.get('count', 0),
+                        "bytetrack_confident": cam_tracks.get('bytetrack_confident', 0),
+                        "deepsort_assisted": cam_tracks.get('deepsort_assisted', 0),
+                        "last_update": cam_tracks.get('last_update').isoformat() if cam_tracks.get('last_update') else None
+                    }
+                })
+            self._publish(live_keys, (TRACKING_STATS, room_id), {
+                "room_id": room_id,
+                "room_name": room['name'],
+                "cameras": camera_stats
+            }, now)
+
+            # Stored counts (as written by the occupancy aggregator, read from its memory)
+            all_rooms.append({
+                "room_id": room_id,
+                "room_name": room['name'],
+                "total_people_count": stored_counts['rooms'].get(room_id, 0),
+                "cameras": [{
+                    "camera_id": camera['id'],
+                    "camera_name": camera['name'],
+                    "people_count": stored_counts['cameras'].get(camera['id'], 0)
+                } for camera in active]
+            })
+
+        self._publish(live_keys, (ALL_COUNTS, None), {"rooms": all_rooms}, now)
+
+        # Deleted rooms disappear (their routes answer 404)
+        for key in [key for key in self.views if key not in live_keys]:
+            del self.views[key]
+            self.payloads.pop(key, None)
+            self.published_at.pop(key, None)
+
+        self.refreshes += 1
+        self.last_refresh_latency = time.monotonic() - start
+
+    def _publish(self, live_keys: set, key: Tuple[str, Optional[int]], payload: Dict, now: float):
+        """
+        Publish a new version of a view if its content changed
+        Changes limited to volatile fields wait for the volatile interval, so a room whose
+        occupants only shift a few pixels keeps answering 304
+        """
+        live_keys.add(key)
+        stable = _stable(payload)
+        last = self.payloads.get(key)
+        if last is not None and last[0] == stable:
+            if last[1] == payload or now - self.published_at[key] < self.volatile_interval:
+                return
+        previous = self.views.get(key)
+        version = previous.version + 1 if previous else 1
+        body = json.dumps({**payload, "version": version, "timestamp": now}, default=str).encode()
+        self.payloads[key] = (stable, payload)
+        self.published_at[key] = now
+        view, room_id = key
+        self.views[key] = OccupancyView(version, f'"{self.epoch}-{view}-{room_id or "all"}-{version}"', body)
+        self.versions_published += 1
+
+    def get_stats(self) -> Dict:
+        """Get read model statistics"""
+        return {
+            'rooms': len(self.rooms),
+            'views': len(self.views),
+            'refreshes': self.refreshes,
+            'versions_published': self.versions_published,
+            'last_refresh_latency_ms': round(self.last_refresh_latency * 1000, 1)
+        }
+
+
+# Running read model (set by start), so writers outside the routes can invalidate it
+_active_read_model: Optional[OccupancyReadModel] = None
+
+
+def invalidate_occupancy():
+    """
+    Rooms or cameras were edited: the count aggregator reloads its camera -> room mapping on
+    its next flush and the live views reload room / camera metadata on their next refresh
+    (edits that bypass this are picked up within the metadata interval)
+    """
+    invalidate_occupancy_mapping()
+    if _active_read_model is not None:
+        _active_read_model.invalidate()
@@ -6,11 +6,9 @@ Best practice for cross-camera person tracking
 
 import torch
 import torch.nn as nn
-import torchvision.transforms as T
 import numpy as np
-from PIL import Image
 import logging
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from pathlib import Path
 import cv2
 
@@ -25,6 +23,10 @@ class OSNetReIDService:
     - Handles varying poses, occlusion, and viewing angles
     """
     
+    INPUT_SIZE = (256, 128)  # OSNet input size (height, width)
+    MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+    STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+    
     def __init__(self, model_name: str = "osnet_x1_0", device: str = "auto"):
         """
         Initialize OSNet Re-ID service
@@ -38,7 +40,10 @@ class OSNetReIDService:
         self.model_name = model_name
         self.device = self._setup_device(device)
         self.model = None
-        self.transform = None
+        
+        # ImageNet normalization folded into one multiply-add on uint8 RGB pixels
+        self.pixel_scale = 1.0 / (255.0 * self.STD)
+        self.pixel_offset = self.MEAN / self.STD
         
         try:
             self._load_model()
@@ -79,13 +84,6 @@ class OSNetReIDService:
             self.model.eval()
             self.model.to(self.device)
             
-            # Setup image preprocessing
-            self.transform = T.Compose([
-                T.Resize((256, 128)),  # OSNet input size (height, width)
-                T.ToTensor(),
-                T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-            ])
-            
         except ImportError:
             raise ImportError(
                 "torchreid not installed. Install with: pip install torchreid"
@@ -95,6 +93,68 @@ class OSNetReIDService:
         """Check if Re-ID service is available"""
         return self.model is not None
     
+    @staticmethod
+    def crop_person(frame: np.ndarray, bbox: Tuple[int, int, int, int], min_size: int = 64) -> Optional[np.ndarray]:
+        """
+        Crop a person box from a frame
+        
+        Args:
+            frame: Full frame (BGR format from OpenCV)
+            bbox: Person bounding box [x1, y1, x2, y2]
+            min_size: Minimum bbox size (pixels) to process
+        
+        Returns:
+            Crop (a view into frame), or None if the box is invalid or too small
+        """
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        
+        # Validate bbox; skip small bboxes (likely false detections)
+        if x2 - x1 < max(min_size, 1) or y2 - y1 < max(min_size, 1):
+            return None
+        
+        height_img, width_img = frame.shape[:2]
+        person_crop = frame[max(0, y1):min(height_img, y2), max(0, x1):min(width_img, x2)]
+        return person_crop if person_crop.size else None
+    
+    def preprocess_crops(self, crops: List[np.ndarray]) -> np.ndarray:
+        """
+        Resize + BGR->RGB + normalize a list of crops into one NCHW batch
+        (cv2 resize per crop, then a single vectorized pass over the whole batch)
+        
+        Args:
+            crops: BGR person crops of any size
+        
+        Returns:
+            float32 array of shape (N, 3, 256, 128)
+        """
+        height, width = self.INPUT_SIZE
+        batch = np.empty((len(crops), height, width, 3), dtype=np.uint8)
+        for i, crop in enumerate(crops):
+            # INTER_AREA when shrinking (anti-aliased), bilinear when enlarging
+            interpolation = cv2.INTER_AREA if crop.shape[0] > height else cv2.INTER_LINEAR
+            cv2.resize(crop, (width, height), dst=batch[i], interpolation=interpolation)
+        
+        rgb = batch[..., ::-1].astype(np.float32)
+        rgb *= self.pixel_scale
+        rgb -= self.pixel_offset
+        return np.ascontiguousarray(rgb.transpose(0, 3, 1, 2))
+    
+    def extract_crop_embeddings(self, crops: List[np.ndarray]) -> np.ndarray:
+        """
+        Run OSNet on a batch of crops in one forward pass
+        
+        Args:
+            crops: BGR person crops
+        
+        Returns:
+            (N, 512) L2-normalized embeddings
+        """
+        batch = torch.from_numpy(self.preprocess_crops(crops)).to(self.device)
+        with torch.no_grad():
+            features = self.model(batch).cpu().numpy()
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        return features / (norms + 1e-8)
+    
     def extract_embedding(self, 
                          frame: np.ndarray, 
                          bbox: Tuple[int, int, int, int],
@@ -114,54 +174,10 @@ class OSNetReIDService:
             return None
         
         try:
-            x1, y1, x2, y2 = bbox
-            
-            # Validate bbox
-            if x2 <= x1 or y2 <= y1:
+            person_crop = self.crop_person(frame, bbox, min_size)
+            if person_crop is None:
                 return None
-            
-            width = x2 - x1
-            height = y2 - y1
-            
-            # Skip small bboxes (likely false detections)
-            if width < min_size or height < min_size:
-                return None
-            
-            # Crop person region
-            height_img, width_img = frame.shape[:2]
-            x1 = max(0, x1)
-            y1 = max(0, y1)
-            x2 = min(width_img, x2)
-            y2 = min(height_img, y2)
-            
-            person_crop = frame[y1:y2, x1:x2]
-            
-            if person_crop.size == 0:
-                return None
-            
-            # Convert BGR to RGB
-            person_crop_rgb = cv2.cvtColor(person_crop, cv2.COLOR_BGR2RGB)
-            
-            # Convert to PIL Image
-            pil_image = Image.fromarray(person_crop_rgb)
-            
-            # Apply transforms
-            input_tensor = self.transform(pil_image)
-            input_batch = input_tensor.unsqueeze(0).to(self.device)
-            
-            # Extract features
-            with torch.no_grad():
-                features = self.model(input_batch)
-            
-            # Convert to numpy and normalize
-            embedding = features.cpu().numpy()[0]
-            
-            # L2 normalization
-            norm = np.linalg.norm(embedding)
-            if norm > 0:
-                embedding = embedding / norm
-            
-            return embedding
+            return self.extract_crop_embeddings([person_crop])[0]
             
         except Exception as e:
             logger.error(f"Error extracting OSNet embedding: {e}")
@@ -208,57 +224,20 @@ class OSNetReIDService:
         if not self.is_available():
             return [None] * len(bboxes)
         
-        embeddings = []
-        
         try:
-            # Prepare batch
-            batch_images = []
-            valid_indices = []
+            crops = [self.crop_person(frame, bbox, min_size=1) for bbox in bboxes]
+            valid_indices = [idx for idx, crop in enumerate(crops) if crop is not None]
             
-            for idx, bbox in enumerate(bboxes):
-                x1, y1, x2, y2 = bbox
-                
-                # Validate and crop
-                if x2 <= x1 or y2 <= y1:
-                    continue
-                
-                height_img, width_img = frame.shape[:2]
-                x1 = max(0, int(x1))
-                y1 = max(0, int(y1))
-                x2 = min(width_img, int(x2))
-                y2 = min(height_img, int(y2))
-                
-                person_crop = frame[y1:y2, x1:x2]
-                
-                if person_crop.size == 0:
-                    continue
-                
-                # Convert and transform
-                person_crop_rgb = cv2.cvtColor(person_crop, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(person_crop_rgb)
-                input_tensor = self.transform(pil_image)
-                
-                batch_images.append(input_tensor)
-                valid_indices.append(idx)
-            
-            if not batch_images:
+            if not valid_indices:
                 return [None] * len(bboxes)
             
             # Batch inference
-            batch_tensor = torch.stack(batch_images).to(self.device)
-            
-            with torch.no_grad():
-                features = self.model(batch_tensor)
-            
-            # Normalize embeddings
-            features_np = features.cpu().numpy()
-            norms = np.linalg.norm(features_np, axis=1, keepdims=True)
-            normalized_features = features_np / (norms + 1e-8)
+            embeddings = self.extract_crop_embeddings([crops[idx] for idx in valid_indices])
             
             # Map back to original indices
             result = [None] * len(bboxes)
             for i, idx in enumerate(valid_indices):
-                result[idx] = normalized_features[i]
+                result[idx] = embeddings[i]
             
             return result
             
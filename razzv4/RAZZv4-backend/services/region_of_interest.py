@@ -0,0 +1,240 @@
+"""
+Region of Interest for per-camera inference
+Only the bounding rectangle(s) of the camera's detection regions (Camera.detection_roi,
+set through the vault_rooms API) and calibrated zones are sent to YOLO; boxes are mapped
+back to full-frame coordinates afterwards
+"""
+
+from typing import Callable, List, Optional, Sequence, Tuple
+import numpy as np
+import supervision as sv
+from logging_config import get_logger
+from config import get_settings
+from services.zone_utils import zone_manager
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+Rect = Tuple[int, int, int, int]
+DetectionResult = Tuple[int, List[dict], sv.Detections]
+Region = List[dict]  # Polygon outline [{'x': .., 'y': ..}, ...] in normalized image coordinates (0-1)
+
+
+def validate_regions(regions) -> List[Region]:
+    """
+    Check a detection_roi payload: a list of polygons of at least 3 {x, y} points in [0, 1]
+
+    Raises:
+        ValueError: If the payload is malformed
+    """
+    if not isinstance(regions, list):
+        raise ValueError("detection_roi must be a list of polygons")
+    validated = []
+    for i, region in enumerate(regions):
+        if not isinstance(region, list) or len(region) < 3:
+            raise ValueError(f"Region {i} needs at least 3 points")
+        points = []
+        for point in region:
+            try:
+                x, y = float(point['x']), float(point['y'])
+            except (TypeError, KeyError, ValueError):
+                raise ValueError(f"Region {i} has a point without numeric x / y: {point}")
+            if not (0.0 <= x <= 1.0 and 0.0 <= y <= 1.0):
+                raise ValueError(f"Region {i} point ({x}, {y}) is outside the image (0-1)")
+            points.append({'x': x, 'y': y})
+        validated.append(points)
+    return validated
+
+
+class CameraROI:
+    """
+    Per-camera crop plan
+    - Regions come from the camera's detection_roi and from room zones carrying 'imagePoints'
+      (both in normalized image coordinates); the designer's floor-plan polygons (FOV wedges
+      in meters) are not regions of the image, so a camera without either runs on the full frame
+    - Nearby regions are merged; if cropping would save too little, the full frame is used
+      (logged, so a camera configured for cropping that never crops is visible)
+    - The plan is recomputed only when the regions, the zones or the frame size change
+    """
+
+    def __init__(self, camera_id: int, camera_keys: Sequence = (), margin: float = None,
+                 min_saving: float = None):
+        """
+        Initialize ROI planner
+
+        Args:
+            camera_id: Camera identifier
+            camera_keys: Values a zone's camera reference may use for this camera (DB id, name)
+            margin: Padding around each region as a fraction of the frame size. If None, uses value from config
+            min_saving: Minimum fraction of pixels cropping must remove to be worth it. If None, uses value from config
+        """
+        self.camera_id = camera_id
+        self.camera_keys = {key for key in (camera_id, str(camera_id), *camera_keys) if key is not None}
+        self.margin = margin if margin is not None else settings.ROI_MARGIN
+        self.min_saving = min_saving if min_saving is not None else settings.ROI_MIN_SAVING
+
+        self.room_id: Optional[int] = None
+        self.regions: List[Region] = []
+        self._regions_version = 0
+
+        self._plan_key = None
+        self.rects: Optional[List[Rect]] = None  # None = full frame
+
+        # Statistics
+        self.pixels_total = 0
+        self.pixels_inferred = 0
+
+    def configure(self, room_id: Optional[int], regions: Optional[List[Region]] = None):
+        """
+        Set the camera's room and detection regions (from the Camera row)
+
+        Args:
+            room_id: Camera's vault room (its calibrated zones are used too)
+            regions: Camera.detection_roi polygons; invalid payloads are ignored (full frame)
+        """
+        try:
+            regions = validate_regions(regions or [])
+        except ValueError as e:
+            logger.warning(f"⚠️  Camera {self.camera_id}: ignoring invalid detection_roi ({e})")
+            regions = []
+        if room_id != self.room_id or regions != self.regions:
+            self.room_id = room_id
+            self.regions = regions
+            self._regions_version += 1
+
+    @property
+    def configured(self) -> bool:
+        """Whether the camera has detection regions of its own"""
+        return bool(self.regions)
+
+    def plan(self, frame_shape: Tuple[int, ...]) -> Optional[List[Rect]]:
+        """
+        Crop rectangles for a frame of this shape
+
+        Returns:
+            List of (x1, y1, x2, y2) rects, or None to run on the full frame
+        """
+        zones = zone_manager.zones_cache.get(self.room_id) if self.room_id is not None else None
+        key = (self._regions_version, id(zones), frame_shape[:2])
+        if key != self._plan_key:
+            self._plan_key = key
+            outlines = self._outlines(zones or [])
+            self.rects = self._compute_rects(outlines, frame_shape[1], frame_shape[0])
+            if self.rects:
+                logger.info(f"📐 Camera {self.camera_id}: ROI {self.rects} "
+                            f"({self._area(self.rects) / (frame_shape[0] * frame_shape[1]):.0%} of frame)")
+            elif outlines:
+                logger.warning(f"⚠️  Camera {self.camera_id}: {len(outlines)} detection regions configured, but they "
+                               f"cover too much of the frame to crop (min saving {self.min_saving:.0%}); "
+                               f"running on the full frame")
+        return self.rects
+
+    def crop_fraction(self, frame_shape: Tuple[int, ...]) -> float:
+        """Fraction of a frame of this shape sent to the detector (1.0 = full frame)"""
+        rects = self.plan(frame_shape)
+        return self._area(rects) / (frame_shape[0] * frame_shape[1]) if rects else 1.0
+
+    def _outlines(self, zones: List[dict]) -> List[Region]:
+        """This camera's detection regions plus the image outlines of its calibrated zones"""
+        outlines = list(self.regions)
+        for zone in zones:
+            if zone.get('camera_id') in self.camera_keys and zone.get('image_points'):
+                outlines.append(zone['image_points'])
+        return outlines
+
+    def _compute_rects(self, outlines: List[Region], width: int, height: int) -> Optional[List[Rect]]:
+        """Turn normalized region outlines into padded crop rectangles"""
+        rects = []
+        for outline in outlines:
+            if len(outline) < 3:
+                continue
+            points = np.array([(p['x'] * width, p['y'] * height) for p in outline], dtype=np.float64)
+
+            pad_x, pad_y = self.margin * width, self.margin * height
+            x1 = int(max(0, points[:, 0].min() - pad_x))
+            y1 = int(max(0, points[:, 1].min() - pad_y))
+            x2 = int(min(width, points[:, 0].max() + pad_x))
+            y2 = int(min(height, points[:, 1].max() + pad_y))
+            if x2 - x1 >= 32 and y2 - y1 >= 32:
+                rects.append((x1, y1, x2, y2))
+
+        if not rects:
+            return None
+
+        rects = self._merge_rects(rects)
+        if self._area(rects) > (1.0 - self.min_saving) * width * height:
+            return None  # Not worth the extra bookkeeping
+        return rects
+
+    def _merge_rects(self, rects: List[Rect]) -> List[Rect]:
+        """Merge rectangles whose union box costs less than running them separately"""
+        merged = list(rects)
+        changed = True
+        while changed and len(merged) > 1:
+            changed = False
+            for i in range(len(merged)):
+                for j in range(i + 1, len(merged)):
+                    a, b = merged[i], merged[j]
+                    union = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    if self._area([union]) <= self._area([a]) + self._area([b]):
+                        merged[i] = union
+                        del merged[j]
+                        changed = True
+                        break
+                if changed:
+                    break
+        return merged
+
+    @staticmethod
+    def _area(rects: List[Rect]) -> int:
+        return sum((r[2] - r[0]) * (r[3] - r[1]) for r in rects)
+
+    def detect(self, frame: np.ndarray, detect_batch: Callable[[List[np.ndarray]], List[DetectionResult]]) -> DetectionResult:
+        """
+        Run detection on the ROI crops and map the results back to the full frame
+
+        Args:
+            frame: Full BGR frame
+            detect_batch: Detector for a list of frames (returns YOLOService-style results)
+
+        Returns:
+            (person_count, detections_list, detections_sv) in full-frame coordinates
+        """
+        rects = self.plan(frame.shape)
+        self.pixels_total += frame.shape[0] * frame.shape[1]
+        if not rects:
+            self.pixels_inferred += frame.shape[0] * frame.shape[1]
+            return detect_batch([frame])[0]
+
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in rects]
+        self.pixels_inferred += self._area(rects)
+        results = detect_batch(crops)
+
+        detections_parts = []
+        for (x1, y1, _, _), (_, _, crop_sv) in zip(rects, results):
+            if len(crop_sv) > 0:
+                crop_sv.xyxy = crop_sv.xyxy + np.array([x1, y1, x1, y1], dtype=crop_sv.xyxy.dtype)
+                detections_parts.append(crop_sv)
+
+        if not detections_parts:
+            return 0, [], sv.Detections.empty()
+
+        detections_sv = sv.Detections.merge(detections_parts)
+        if len(rects) > 1 and len(detections_sv) > 1:
+            # Regions may overlap after padding - drop duplicate boxes across crops
+            detections_sv = detections_sv.with_nms(threshold=0.7, class_agnostic=True)
+
+        # Legacy dict format, same fields as YOLOService
+        detections_list = [
+            {"bbox": box.tolist(), "confidence": float(confidence), "class_name": "person", "class_id": 0}
+            for box, confidence in zip(detections_sv.xyxy, detections_sv.confidence)
+        ]
+        return len(detections_sv), detections_list, detections_sv
+
+    def get_stats(self) -> dict:
+        """Get ROI statistics"""
+        return {
+            'configured': self.configured,
+            'rects': self.rects,
+            'pixel_ratio': round(self.pixels_inferred / self.pixels_total, 3) if self.pixels_total else 1.0
+        }
@@ -0,0 +1,187 @@
+"""
+Re-ID Gallery Partitions by room and camera adjacency
+Each room keeps its own small FAISS index of the persons recently seen there; a query from
+a camera searches only its own room and the rooms of adjacent cameras, so persons seen at
+another site are never candidates unless the global search is needed
+"""
+
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from logging_config import get_logger
+from config import get_settings
+from services.faiss_index_service import FAISSIndexService
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+def parse_adjacency(raw: str) -> Dict[int, Set[int]]:
+    """
+    Camera adjacency graph from JSON ({"camera_id": [adjacent camera ids]}), made symmetric
+
+    Args:
+        raw: JSON text (empty = no adjacency)
+    """
+    graph: Dict[int, Set[int]] = {}
+    if not raw:
+        return graph
+    try:
+        for camera_id, neighbors in json.loads(raw).items():
+            for neighbor in neighbors:
+                graph.setdefault(int(camera_id), set()).add(int(neighbor))
+                graph.setdefault(int(neighbor), set()).add(int(camera_id))
+    except (ValueError, AttributeError, TypeError) as e:
+        logger.error(f"Invalid REID_CAMERA_ADJACENCY ({e}), partitions use the camera's own room only")
+        return {}
+    return graph
+
+
+class ReIDPartitions:
+    """
+    Per-room Re-ID indexes
+    - A person is indexed in every room they were seen in within the time window
+    - Queries search the camera's room plus the rooms of adjacent cameras
+    - Memberships older than the window are dropped by expire() (the global index keeps the person)
+    """
+
+    def __init__(self, adjacency: Dict[int, Set[int]] = None, window: float = None, embedding_dim: int = 512):
+        """
+        Initialize partitions
+
+        Args:
+            adjacency: {camera_id: adjacent camera ids}. If None, parsed from config
+            window: Seconds a person stays a candidate in a room after last being seen there.
+                    If None, uses value from config
+            embedding_dim: Dimension of embeddings (512 for OSNet)
+        """
+        self.adjacency = adjacency if adjacency is not None else parse_adjacency(settings.REID_CAMERA_ADJACENCY)
+        self.window = window if window is not None else settings.REID_PARTITION_WINDOW
+        self.embedding_dim = embedding_dim
+
+        self.camera_rooms: Dict[int, int] = {}  # {camera_id: room_id}
+        self.indexes: Dict[int, FAISSIndexService] = {}  # {room_id: index}
+        self.memberships: Dict[int, Dict[int, float]] = {}  # {global_id: {room_id: last_seen}}
+
+        # Statistics
+        self.partition_searches = 0
+        self.partition_hits = 0
+
+    def set_camera_room(self, camera_id: int, room_id: Optional[int]):
+        """Register which room a camera watches"""
+        if room_id is not None:
+            self.camera_rooms[camera_id] = room_id
+
+    def rooms_for_camera(self, camera_id: int) -> Set[int]:
+        """The camera's own room plus the rooms of its adjacent cameras"""
+        rooms = set()
+        for camera in {camera_id} | self.adjacency.get(camera_id, set()):
+            if camera in self.camera_rooms:
+                rooms.add(self.camera_rooms[camera])
+        return rooms
+
+    def _index(self, room_id: int) -> FAISSIndexService:
+        if room_id not in self.indexes:
+            self.indexes[room_id] = FAISSIndexService(embedding_dim=self.embedding_dim)
+        return self.indexes[room_id]
+
+    def update(self, global_id: int, camera_ids: Iterable[int], embedding: Optional[np.ndarray],
+               now: float = None, reindex: bool = False):
+        """
+        Record that a person is visible on these cameras
+
+        Args:
+            global_id: Global person ID
+            camera_ids: Cameras the person is currently tracked on
+            embedding: Current template (None = not indexable yet)
+            now: Epoch seconds. If None, uses the current time
+            reindex: Template changed: replace it in every room the person is indexed in
+        """
+        if embedding is None:
+            return
+        now = now or time.time()
+        rooms = self.memberships.setdefault(global_id, {})
+        for camera_id in camera_ids:
+            room_id = self.camera_rooms.get(camera_id)
+            if room_id is None:
+                continue
+            if room_id not in rooms:
+                self._index(room_id).add_embedding(global_id, embedding)
+            rooms[room_id] = now
+        if reindex:
+            for room_id in rooms:
+                self._index(room_id).add_embedding(global_id, embedding)
+
+    def remove(self, global_id: int):
+        """Drop a person from every room index"""
+        for room_id in self.memberships.pop(global_id, {}):
+            self.indexes[room_id].remove_embedding(global_id)
+
+    def search(self, query_embedding: np.ndarray, camera_id: int, k: int = 5,
+               threshold: float = 0.5, now: float = None) -> Optional[List[Tuple[int, float]]]:
+        """
+        Search the rooms a person seen on this camera could plausibly have come from
+
+        Args:
+            query_embedding: Re-ID embedding
+            camera_id: Camera the query comes from
+            k: Number of results
+            threshold: Similarity threshold
+            now: Epoch seconds. If None, uses the current time
+
+        Returns:
+            (global_id, similarity) best first; None if the camera has no known room (caller
+            should go straight to the global search)
+        """
+        rooms = self.rooms_for_camera(camera_id)
+        if not rooms:
+            return None
+        now = now or time.time()
+        self.partition_searches += 1
+
+        best: Dict[int, float] = {}
+        for room_id in rooms:
+            index = self.indexes.get(room_id)
+            if index is None:
+                continue
+            for global_id, similarity in index.search(query_embedding, k, threshold):
+                # Only persons seen in this room within the window
+                if now - self.memberships.get(global_id, {}).get(room_id, 0.0) > self.window:
+                    continue
+                best[global_id] = max(similarity, best.get(global_id, -1.0))
+
+        results = sorted(best.items(), key=lambda item: item[1], reverse=True)[:k]
+        if results:
+            self.partition_hits += 1
+        return results
+
+    def expire(self, now: float = None) -> int:
+        """
+        Remove room memberships older than the window
+
+        Returns:
+            Number of memberships removed
+        """
+        now = now or time.time()
+        removed = 0
+        for global_id in list(self.memberships):
+            rooms = self.memberships[global_id]
+            for room_id in [room for room, seen in rooms.items() if now - seen > self.window]:
+                self.indexes[room_id].remove_embedding(global_id)
+                del rooms[room_id]
+                removed += 1
+            if not rooms:
+                del self.memberships[global_id]
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Get partition statistics"""
+        return {
+            'rooms': len(self.indexes),
+            'cameras_mapped': len(self.camera_rooms),
+            'adjacent_cameras': len(self.adjacency),
+            'room_sizes': {room_id: index.get_stats()['total_embeddings'] for room_id, index in self.indexes.items()},
+            'partition_searches': self.partition_searches,
+            'partition_hits': self.partition_hits
+        }
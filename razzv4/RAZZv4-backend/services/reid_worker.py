@@ -0,0 +1,183 @@
+"""
+Re-ID Worker for batched, asynchronous OSNet embedding extraction
+Camera tracking loops queue person crops and move on; one worker thread embeds them in
+batches and hands each embedding back to the global tracker through a callback
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import numpy as np
+from logging_config import get_logger
+from config import get_settings
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# (camera_id, local_track_id, embedding or None, quality)
+EmbeddingCallback = Callable[[int, int, Optional[np.ndarray], float], None]
+
+
+@dataclass
+class ReIDRequest:
+    """A person crop waiting for an embedding"""
+    camera_id: int
+    local_track_id: int
+    crop: np.ndarray
+    quality: float
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class ReIDWorker:
+    """
+    Batched OSNet worker shared by all cameras of a process
+    - submit() copies the crop and returns immediately (bounded queue, drops when full)
+    - A batch is dispatched when it is full or the oldest crop hits its deadline
+    - Preprocessing is one vectorized pass per batch; OSNet runs one forward per batch
+    - Results go to the callback from the worker thread, never from the tracking loop
+    """
+
+    def __init__(self, osnet_service, callback: EmbeddingCallback, max_batch_size: int = None,
+                 max_wait_ms: float = None, max_queue_size: int = None):
+        """
+        Initialize Re-ID worker
+
+        Args:
+            osnet_service: OSNetReIDService instance (the only caller of the model once started)
+            callback: Receives (camera_id, local_track_id, embedding, quality); embedding is None on failure
+            max_batch_size: Maximum crops per forward pass. If None, uses value from config
+            max_wait_ms: Maximum time the oldest crop waits for a batch to fill. If None, uses value from config
+            max_queue_size: Crops allowed to wait before new ones are dropped. If None, uses value from config
+        """
+        self.osnet_service = osnet_service
+        self.callback = callback
+        self.max_batch_size = max(1, max_batch_size or settings.REID_MAX_BATCH_SIZE)
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.REID_MAX_WAIT_MS) / 1000.0
+        self.max_queue_size = max_queue_size or settings.REID_QUEUE_SIZE
+
+        self.pending: Deque[ReIDRequest] = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.crops_submitted = 0
+        self.crops_dropped = 0
+        self.crops_embedded = 0
+        self.batches_run = 0
+        self.last_batch_size = 0
+        self.last_batch_latency = 0.0
+
+        logger.info(f"✅ Re-ID worker initialized (max_batch={self.max_batch_size}, max_wait={self.max_wait * 1000:.0f}ms)")
+
+    def start(self):
+        """Start the batching worker thread (idempotent)"""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        logger.info("Re-ID worker started")
+
+    def stop(self):
+        """Stop the worker thread and discard crops still waiting"""
+        with self.condition:
+            if not self.running:
+                return
+            self.running = False
+            self.pending.clear()
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Re-ID worker stopped")
+
+    def submit(self, camera_id: int, local_track_id: int, frame: np.ndarray,
+               bbox: Tuple[int, int, int, int], quality: float = 0.0) -> bool:
+        """
+        Queue a person crop for embedding
+
+        Args:
+            camera_id: Camera that owns the track
+            local_track_id: Local track ID the embedding belongs to
+            frame: Full BGR frame
+            bbox: Person bounding box [x1, y1, x2, y2]
+            quality: Embedding quality score passed through to the callback
+
+        Returns:
+            True if queued; False if the crop is unusable or the queue is full (caller may retry later)
+        """
+        crop = self.osnet_service.crop_person(frame, bbox)
+        if crop is None:
+            return False
+
+        with self.condition:
+            if not self.running or len(self.pending) >= self.max_queue_size:
+                self.crops_dropped += 1
+                return False
+            # Copy the crop so the full frame is not kept alive while queued
+            self.pending.append(ReIDRequest(camera_id, local_track_id, crop.copy(), quality))
+            self.crops_submitted += 1
+            self.condition.notify_all()
+        return True
+
+    def _next_batch(self) -> List[ReIDRequest]:
+        """Wait until a batch is full or the oldest crop reaches its deadline"""
+        with self.condition:
+            while self.running and not self.pending:
+                self.condition.wait()
+
+            while self.running and len(self.pending) < self.max_batch_size:
+                remaining = self.pending[0].submitted_at + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(timeout=remaining)
+
+            batch = []
+            while self.pending and len(batch) < self.max_batch_size:
+                batch.append(self.pending.popleft())
+            return batch
+
+    def _run_loop(self):
+        """Worker loop: collect a batch, run one OSNet forward, deliver each embedding"""
+        while self.running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            start = time.monotonic()
+            try:
+                embeddings = self.osnet_service.extract_crop_embeddings([request.crop for request in batch])
+            except Exception as e:
+                logger.error(f"Re-ID batch of {len(batch)} failed: {e}")
+                embeddings = [None] * len(batch)
+
+            self.batches_run += 1
+            self.last_batch_size = len(batch)
+            self.last_batch_latency = time.monotonic() - start
+
+            for request, embedding in zip(batch, embeddings):
+                if embedding is not None:
+                    self.crops_embedded += 1
+                try:
+                    self.callback(request.camera_id, request.local_track_id, embedding, request.quality)
+                except Exception as e:
+                    logger.error(f"Re-ID callback failed for Cam{request.camera_id} Track{request.local_track_id}: {e}")
+
+    def get_stats(self) -> Dict:
+        """Get worker statistics"""
+        with self.condition:
+            queued = len(self.pending)
+        return {
+            'running': self.running,
+            'queued': queued,
+            'crops_submitted': self.crops_submitted,
+            'crops_dropped': self.crops_dropped,
+            'crops_embedded': self.crops_embedded,
+            'batches_run': self.batches_run,
+            'avg_batch_size': round(self.crops_embedded / self.batches_run, 2) if self.batches_run else 0.0,
+            'last_batch_size': self.last_batch_size,
+            'last_batch_latency_ms': round(self.last_batch_latency * 1000, 1)
+        }
@@ -0,0 +1,146 @@
+"""
+Room Presence Events
+Turns the global tracker's per-frame matches into incremental occupancy events: entry when a
+global person is first seen in a vault room, throttled motion updates carrying the dwell time
+so far, and exit once the person has not been seen in the room for the exit timeout
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from logging_config import get_logger
+from config import get_settings
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class Presence:
+    """One global person inside one room"""
+    entered_at: float
+    last_seen: float
+    last_event: float  # Entry or last motion event
+    camera_id: int
+    track_id: int
+    bbox: Optional[Tuple[int, int, int, int]] = None
+    name: Optional[str] = None
+
+
+def _bbox_dict(bbox: Optional[Tuple[int, int, int, int]]) -> Optional[Dict[str, int]]:
+    """xyxy box -> {x, y, w, h} (TrackingEvent.bbox format)"""
+    if bbox is None:
+        return None
+    x1, y1, x2, y2 = (int(v) for v in bbox)
+    return {'x': x1, 'y': y1, 'w': x2 - x1, 'h': y2 - y1}
+
+
+class RoomPresence:
+    """
+    Presence of global persons per room, driving EventLogger
+    - observe() is called for every matched track of a frame (under the tracker lock)
+    - Motion events are throttled to one per person and room per motion interval
+    - expire() emits exits; the tracker calls it from the frame path (at most once a second)
+      and from its cleanup loop
+    - Global IDs are recorded in the event metadata (person_id refers to registered persons)
+    """
+
+    def __init__(self, event_logger, motion_interval: float = None, exit_timeout: float = None):
+        """
+        Initialize room presence
+
+        Args:
+            event_logger: EventLogger receiving the events
+            motion_interval: Seconds between motion events of one person in one room. If None, uses value from config
+            exit_timeout: Seconds unseen in a room before an exit is logged. If None, uses value from config
+        """
+        self.event_logger = event_logger
+        self.motion_interval = motion_interval if motion_interval is not None else settings.EVENT_MOTION_INTERVAL
+        self.exit_timeout = exit_timeout if exit_timeout is not None else settings.EVENT_EXIT_TIMEOUT
+
+        self.presence: Dict[Tuple[int, int], Presence] = {}  # {(global_id, room_id): presence}
+        self.last_expire = 0.0
+
+        # Statistics
+        self.entries = 0
+        self.exits = 0
+        self.motions = 0
+
+    def observe(self, room_id: int, camera_id: int, global_id: int, track_id: int,
+                bbox: Optional[Tuple[int, int, int, int]], name: Optional[str] = None, now: float = None):
+        """
+        Record a sighting of a global person in a room
+
+        Args:
+            room_id: Vault room of the camera
+            camera_id: Camera the person was matched on
+            global_id: Global person ID
+            track_id: Local track ID on that camera
+            bbox: Person box [x1, y1, x2, y2] (None if unknown)
+            name: Assigned person name, if any
+            now: Epoch seconds of the frame. If None, uses the current time
+        """
+        now = now or time.time()
+        key = (global_id, room_id)
+        presence = self.presence.get(key)
+
+        if presence is None:
+            self.presence[key] = Presence(now, now, now, camera_id, track_id, bbox, name)
+            self.entries += 1
+            self.event_logger.log_entry(room_id, camera_id, None, track_id, _bbox_dict(bbox),
+                                        metadata={'global_id': global_id, 'person_name': name or 'Unknown'})
+            return
+
+        presence.last_seen = now
+        presence.camera_id, presence.track_id = camera_id, track_id
+        presence.name = name or presence.name
+        if bbox is not None:
+            presence.bbox = bbox
+        if now - presence.last_event >= self.motion_interval:
+            presence.last_event = now
+            self.motions += 1
+            self.event_logger.log_motion(room_id, camera_id, None, track_id, _bbox_dict(presence.bbox),
+                                         metadata={'global_id': global_id,
+                                                   'dwell_seconds': round(now - presence.entered_at, 1)})
+
+    def merge(self, source_id: int, target_id: int):
+        """A provisional global ID was merged: its presences continue under the target ID"""
+        for global_id, room_id in [key for key in self.presence if key[0] == source_id]:
+            presence = self.presence.pop((global_id, room_id))
+            target = self.presence.get((target_id, room_id))
+            if target is None:
+                self.presence[(target_id, room_id)] = presence
+            else:
+                target.entered_at = min(target.entered_at, presence.entered_at)
+                target.last_seen = max(target.last_seen, presence.last_seen)
+
+    def expire(self, now: float = None) -> int:
+        """
+        Log exits for persons not seen in a room within the exit timeout
+
+        Returns:
+            Number of exits logged
+        """
+        now = now or time.time()
+        self.last_expire = now
+        expired = [key for key, presence in self.presence.items() if now - presence.last_seen >= self.exit_timeout]
+        for global_id, room_id in expired:
+            presence = self.presence.pop((global_id, room_id))
+            self.exits += 1
+            self.event_logger.log_exit(room_id, presence.camera_id, None, presence.track_id,
+                                       metadata={'global_id': global_id, 'person_name': presence.name or 'Unknown',
+                                                 'dwell_seconds': round(presence.last_seen - presence.entered_at, 1)})
+        return len(expired)
+
+    def occupants(self, room_id: int) -> List[int]:
+        """Global IDs currently present in a room"""
+        return [global_id for global_id, room in self.presence if room == room_id]
+
+    def get_stats(self) -> Dict:
+        """Get presence statistics"""
+        return {
+            'present': len(self.presence),
+            'entries': self.entries,
+            'exits': self.exits,
+            'motions': self.motions
+        }
@@ -0,0 +1,177 @@
+"""
+Array-backed track state
+One immutable struct-of-arrays snapshot per camera per tick (ids, boxes, confidences,
+global IDs, float timestamps) instead of a dict-of-dicts rebuilt for every tracked box
+"""
+
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+
+NO_GLOBAL_ID = -1
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class TrackSnapshot(Mapping):
+    """
+    Immutable tracks of one camera at one tick
+    - Fields are read-only numpy arrays aligned by index; array readers (motion model,
+      serialization, rescaling) work on them directly
+    - Mapping-compatible for existing readers: snapshot[track_id] builds that track's dict on access
+    - to_list() serializes once per snapshot and caches the result (WebSocket, routes)
+    - Cheap to pickle (worker -> API process): only the arrays are sent
+    """
+
+    __slots__ = ('ids', 'boxes', 'confidences', 'last_seen', 'global_ids', 'source', 'predicted',
+                 'timestamp', '_index', '_serialized')
+
+    def __init__(self, ids: np.ndarray, boxes: np.ndarray, confidences: np.ndarray, last_seen: np.ndarray,
+                 global_ids: Optional[np.ndarray] = None, source: str = 'bytetrack', predicted: bool = False,
+                 timestamp: float = 0.0):
+        """
+        Initialize snapshot (arrays are frozen, not copied)
+
+        Args:
+            ids: (N,) int64 local track IDs
+            boxes: (N, 4) float32 xyxy boxes in frame pixels
+            confidences: (N,) float32 detection confidences
+            last_seen: (N,) float64 epoch seconds of each track's last detection
+            global_ids: (N,) int64 cross-camera IDs (NO_GLOBAL_ID = unassigned). If None, all unassigned
+            source: Tracker that produced the tracks ('bytetrack', 'yolo')
+            predicted: Boxes were extrapolated on a prediction-only tick
+            timestamp: Epoch seconds of the tick
+        """
+        if global_ids is None:
+            global_ids = np.full(len(ids), NO_GLOBAL_ID, dtype=np.int64)
+        self.ids = _frozen(ids)
+        self.boxes = _frozen(boxes)
+        self.confidences = _frozen(confidences)
+        self.last_seen = _frozen(last_seen)
+        self.global_ids = _frozen(global_ids)
+        self.source = source
+        self.predicted = predicted
+        self.timestamp = timestamp
+        self._index: Optional[Dict[int, int]] = None
+        self._serialized: Optional[List[Dict]] = None
+
+    @classmethod
+    def empty(cls, source: str = 'bytetrack', timestamp: float = 0.0) -> 'TrackSnapshot':
+        """Snapshot with no tracks"""
+        return cls(np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32),
+                   np.zeros(0, dtype=np.float64), source=source, timestamp=timestamp)
+
+    @classmethod
+    def from_detections(cls, detections, timestamp: float, source: str = 'bytetrack') -> 'TrackSnapshot':
+        """
+        Build from supervision Detections
+
+        Args:
+            detections: Tracked detections (tracker_id used as track ID) or raw detections (index used)
+            timestamp: Epoch seconds of the tick (also each track's last_seen)
+            source: Tracker that produced the detections
+        """
+        count = len(detections)
+        if count == 0:
+            return cls.empty(source, timestamp)
+        if detections.tracker_id is not None:
+            ids = np.asarray(detections.tracker_id, dtype=np.int64)
+        else:
+            ids = np.arange(count, dtype=np.int64)
+        confidences = detections.confidence if detections.confidence is not None else np.ones(count)
+        return cls(ids.copy(), np.array(detections.xyxy, dtype=np.float32),
+                   np.array(confidences, dtype=np.float32), np.full(count, timestamp, dtype=np.float64),
+                   source=source, timestamp=timestamp)
+
+    def replace(self, **fields) -> 'TrackSnapshot':
+        """New snapshot sharing every array except the ones given"""
+        values = {name: getattr(self, name) for name in
+                  ('ids', 'boxes', 'confidences', 'last_seen', 'global_ids', 'source', 'predicted', 'timestamp')}
+        values.update(fields)
+        return TrackSnapshot(**values)
+
+    def scaled(self, scale_x: float, scale_y: float) -> 'TrackSnapshot':
+        """Copy with boxes mapped into a frame of another size"""
+        factors = np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+        return self.replace(boxes=self.boxes * factors)
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def centers(self) -> np.ndarray:
+        """(N, 2) box centers"""
+        return (self.boxes[:, :2] + self.boxes[:, 2:]) / 2
+
+    def index_of(self, track_id) -> Optional[int]:
+        """Array index of a track ID (None if absent)"""
+        if self._index is None:
+            self._index = {track_id: i for i, track_id in enumerate(self.ids.tolist())}
+        return self._index.get(track_id)
+
+    def global_id_items(self) -> Dict[int, int]:
+        """{track_id: global_id} for tracks with an assigned global ID"""
+        assigned = self.global_ids != NO_GLOBAL_ID
+        return dict(zip(self.ids[assigned].tolist(), self.global_ids[assigned].tolist()))
+
+    # Mapping interface (per-track dicts are built on access only)
+
+    def __getitem__(self, track_id) -> Dict:
+        i = self.index_of(track_id)
+        if i is None:
+            raise KeyError(track_id)
+        x1, y1, x2, y2 = (int(v) for v in self.boxes[i])
+        track_data = {
+            'bbox': [x1, y1, x2, y2],
+            'confidence': float(self.confidences[i]),
+            'center': (int((x1 + x2) / 2), int((y1 + y2) / 2)),
+            'source': self.source,
+            'last_seen': datetime.fromtimestamp(self.last_seen[i])
+        }
+        if self.global_ids[i] != NO_GLOBAL_ID:
+            track_data['global_id'] = int(self.global_ids[i])
+        if self.predicted:
+            track_data['predicted'] = True
+        return track_data
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids.tolist())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, track_id) -> bool:
+        return self.index_of(track_id) is not None
+
+    def __reduce__(self):
+        return (TrackSnapshot, (np.array(self.ids), np.array(self.boxes), np.array(self.confidences),
+                                np.array(self.last_seen), np.array(self.global_ids), self.source,
+                                self.predicted, self.timestamp))
+
+    def to_list(self) -> List[Dict]:
+        """JSON-ready list of tracks (computed once per snapshot)"""
+        if self._serialized is None:
+            boxes = self.boxes.astype(np.int64)
+            centers = ((boxes[:, :2] + boxes[:, 2:]) // 2).tolist()
+            global_ids = self.global_ids.tolist()
+            self._serialized = [
+                {
+                    'track_id': track_id,
+                    'bbox': bbox,
+                    'confidence': confidence,
+                    'center': center,
+                    'source': self.source,
+                    'global_id': global_id if global_id != NO_GLOBAL_ID else None
+                }
+                for track_id, bbox, confidence, center, global_id in zip(
+                    self.ids.tolist(), boxes.tolist(), self.confidences.tolist(), centers, global_ids)
+            ]
+        return self._serialized
+
+    def __repr__(self) -> str:
+        return f"TrackSnapshot(count={len(self)}, source={self.source!r}, predicted={self.predicted})"
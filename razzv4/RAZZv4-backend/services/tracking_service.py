@@ -6,6 +6,7 @@ WITH GLOBAL CROSS-CAMERA RE-IDENTIFICATION using face recognition
 """
 
 import cv2
+import time
 import numpy as np
 from collections import defaultdict, deque
 from datetime import datetime
@@ -18,6 +19,9 @@ from services.global_person_tracker import get_global_person_tracker
 from services.face_recognition_service import get_face_recognition_service
 from services.osnet_reid_service import get_osnet_service
 from services.faiss_index_service import get_faiss_service
+from services.overlay_renderer import get_overlay_renderer
+from services.track_state import NO_GLOBAL_ID, TrackSnapshot
+from services.reid_worker import ReIDWorker
 
 logger = get_logger(__name__)
 settings = get_settings()
@@ -26,7 +30,7 @@ settings = get_settings()
 class TrackingService:
     """ByteTrack (30 FPS) with face-based global cross-camera tracking + Zone awareness"""
     
-    def __init__(self, conf_threshold: float = None, bytetrack_threshold: float = None):
+    def __init__(self, conf_threshold: float = None, bytetrack_threshold: float = None, global_tracker=None):
         logger.info("Initializing zone-aware + face-based cross-camera tracking service...")
         
         # Use centralized config or fallback to defaults
@@ -36,10 +40,15 @@ class TrackingService:
         
         # Tracking state
         self.byte_trackers = {}
-        self.camera_tracks = defaultdict(lambda: {
-            'count': 0, 'tracks': {}, 'history': deque(maxlen=100),
-            'last_update': None, 'last_frame': None, 'frame_count': 0
-        })
+        
+        # Prediction-only ticks (between YOLO detections)
+        self.predict_mode = settings.TRACKING_PREDICT_MODE  # 'motion' or 'optical_flow'
+        self.max_predict_seconds = settings.TRACKING_MAX_PREDICT_SECONDS
+        self.motion_state = {}  # {camera_id: {'ids', 'bbox', 'velocity', 'detected_bbox' arrays + 'detected_time'}}
+        self.flow_frames = {}  # {camera_id: downscaled grayscale frame} for optical flow
+        self.flow_scale = 0.5  # Optical flow runs on a half-resolution grayscale frame
+        # 'tracks' is an immutable TrackSnapshot (struct-of-arrays); 'history' holds (epoch, count) tuples
+        self.camera_tracks = defaultdict(self._new_camera_state)
         
         # Global tracking (LEGACY - kept for backward compatibility, but use global_tracker now)
         self.global_person_id = 0
@@ -50,26 +59,46 @@ class TrackingService:
         self.global_id_timeout = settings.GLOBAL_ID_TIMEOUT
         
         # NEW: Global person tracker with OSNet Re-ID
-        self.global_tracker = get_global_person_tracker()
+        # (camera worker processes inject a proxy that forwards to the API process)
+        self.global_tracker = global_tracker or get_global_person_tracker()
         self.face_service = get_face_recognition_service()  # Keep for backward compatibility
         self.osnet_service = get_osnet_service()
         self.faiss_service = get_faiss_service()
         self.use_reid = self.osnet_service.is_available()
         
         # Track history for stable track detection (need consecutive frames before extracting embedding)
-        self.track_history = defaultdict(lambda: {'consecutive_frames': 0, 'has_embedding': False})
+        self.track_history = defaultdict(lambda: {'consecutive_frames': 0, 'has_embedding': False,
+                                                  'reid_pending': False, 'next_embedding_time': 0.0})
         self.stable_track_threshold = 1  # Extract embedding immediately (spatial matching prevents duplicates)
+        self.reid_refresh_seconds = settings.REID_REFRESH_SECONDS  # Later shots feed the person's gallery
+        
+        # Batched OSNet extraction off the tracking loop; embeddings reach the global tracker via callback
+        self.reid_worker: Optional[ReIDWorker] = None
+        self.reid_crops_per_tick = settings.REID_MAX_CROPS_PER_TICK
+        if self.use_reid and settings.REID_WORKER_ENABLED:
+            self.reid_worker = ReIDWorker(self.osnet_service, self._on_embedding)
+            self.reid_worker.start()
         
         # Zone tracking
         self.zone_manager = zone_manager
         self.room_zones_loaded = set()  # Track which rooms have loaded zones
         
+        # Overlay drawing (on demand, from track snapshots)
+        self.renderer = get_overlay_renderer()
+        
         if self.use_reid:
             logger.info(f"✅ Zone + OSNet Re-ID tracking service initialized (conf={self.conf_threshold}, timeout={self.global_id_timeout}s)")
         else:
             logger.warning(f"⚠️  OSNet Re-ID not available - using spatial matching only")
             logger.info(f"✅ Zone-aware tracking service initialized (conf={self.conf_threshold}, timeout={self.global_id_timeout}s)")
     
+    @staticmethod
+    def _new_camera_state() -> Dict:
+        return {
+            'count': 0, 'tracks': TrackSnapshot.empty(), 'history': deque(maxlen=100),
+            'last_update': None, 'last_frame': None, 'frame_count': 0
+        }
+    
     def _detect_device(self) -> str:
         try:
             import torch
@@ -101,123 +130,216 @@ class TrackingService:
             detections_sv: Pre-computed YOLO detections (supervision format)
             
         Returns:
-            Dictionary with tracking information
+            Dictionary with tracking information ('tracks' is a TrackSnapshot)
         """
+        now = time.time()
+        camera_state = self.camera_tracks[camera_id]
+        
         if detections_sv is None or len(detections_sv) == 0:
             # No detections, return empty result
-            self.camera_tracks[camera_id]['tracks'] = {}
-            self.camera_tracks[camera_id]['count'] = 0
+            camera_state['tracks'] = TrackSnapshot.empty(timestamp=now)
+            camera_state['count'] = 0
+            self.motion_state.pop(camera_id, None)
+            self.flow_frames.pop(camera_id, None)
             return {
                 'camera_id': camera_id,
                 'people_count': 0,
                 'detections': [],
-                'tracks': {},
-                'timestamp': datetime.now().isoformat()
+                'tracks': camera_state['tracks'],
+                'timestamp': now
             }
         
         logger.debug(f"🔍 Camera {camera_id}: Processing {len(detections_sv)} detections")
         
         # Increment frame count for this camera
-        self.camera_tracks[camera_id]['frame_count'] += 1
+        camera_state['frame_count'] += 1
         
         # Apply ByteTrack tracking (runs at 30 FPS)
         byte_tracker = self._get_bytetrack_tracker(camera_id)
         tracked_detections = byte_tracker.update_with_detections(detections_sv)
         
-        logger.debug(f"📍 Camera {camera_id}: ByteTrack returned {len(tracked_detections.tracker_id)} tracked objects")
+        logger.debug(f"📍 Camera {camera_id}: ByteTrack returned {len(tracked_detections)} tracked objects")
         
-        confident_tracks = {}
+        # One array-backed snapshot per tick instead of a dict per tracked box
+        tracks = TrackSnapshot.from_detections(tracked_detections, timestamp=now)
         
-        for i, track_id in enumerate(tracked_detections.tracker_id):
-            confidence = tracked_detections.confidence[i]
-            bbox = tracked_detections.xyxy[i]
-            
-            confident_tracks[int(track_id)] = {
-                'bbox': [int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])],
-                'confidence': float(confidence),
-                'center': (int((bbox[0] + bbox[2]) / 2), int((bbox[1] + bbox[3]) / 2)),
-                'source': 'bytetrack',
-                'last_seen': datetime.now()
-            }
+        camera_state['count'] = len(tracks)
+        camera_state['last_update'] = datetime.now()
+        camera_state['last_frame'] = frame  # Store frame for visualization
         
-        self.camera_tracks[camera_id]['tracks'] = confident_tracks
-        self.camera_tracks[camera_id]['count'] = len(confident_tracks)
-        self.camera_tracks[camera_id]['last_update'] = datetime.now()
-        self.camera_tracks[camera_id]['last_frame'] = frame  # Store frame for visualization
+        # Remember motion of each track for prediction-only ticks
+        self._update_motion_state(camera_id, tracks, frame)
         
         # Clean up track history for lost tracks
-        current_track_keys = {f"{camera_id}_{track_id}" for track_id in confident_tracks.keys()}
+        current_track_keys = {f"{camera_id}_{track_id}" for track_id in tracks}
         lost_track_keys = [key for key in self.track_history.keys() if key.startswith(f"{camera_id}_") and key not in current_track_keys]
         for lost_key in lost_track_keys:
             del self.track_history[lost_key]
         
-        # Assign global IDs to tracks
-        self._assign_global_ids(camera_id, confident_tracks)
+        # Assign global IDs to tracks, then publish the (immutable) snapshot
+        tracks = tracks.replace(global_ids=self._assign_global_ids(camera_id, tracks))
+        camera_state['tracks'] = tracks
         
-        self.camera_tracks[camera_id]['history'].append({
-            'timestamp': datetime.now().isoformat(),
-            'count': len(confident_tracks)
-        })
+        camera_state['history'].append((now, len(tracks)))
         
         return {
             'camera_id': camera_id,
-            'people_count': len(confident_tracks),
+            'people_count': len(tracks),
             'detections': [],  # Detections are passed in, not computed here
-            'tracks': confident_tracks,
-            'timestamp': datetime.now().isoformat()
+            'tracks': tracks,
+            'timestamp': now
         }
     
-    def draw_tracks(self, frame: np.ndarray, camera_id: int) -> np.ndarray:
+    def predict_tracks(self, camera_id: int, frame: Optional[np.ndarray] = None) -> Dict:
         """
-        Draw bounding boxes and IDs on frame - BRINKSv2 style
-        Args: frame first, then camera_id (matches brinksv2)
-        """
-        annotated = frame.copy()
-        tracks = self.camera_tracks[camera_id].get('tracks', {})
-        people_count = self.camera_tracks[camera_id].get('count', 0)
-        
-        for track_id, track_data in tracks.items():
-            bbox = track_data['bbox']
-            source = track_data.get('source', 'unknown')
-            color = (0, 255, 0) if source == 'bytetrack' else (255, 165, 0)
-            
-            # Draw bounding box
-            cv2.rectangle(annotated, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 2)
+        Prediction-only tick: advance existing tracks without running ByteTrack association,
+        global-ID assignment or history bookkeeping
+        
+        Uses the constant-velocity motion model estimated from the last detections, or
+        sparse optical flow on the track boxes when TRACKING_PREDICT_MODE='optical_flow'
+        
+        Args:
+            camera_id: Camera identifier
+            frame: Current frame (required for optical flow, stored for visualization)
             
-            # Use global ID if available, otherwise use local ID
-            local_track_key = f"{camera_id}_{track_id}"
-            global_id = self.global_id_map.get(local_track_key)
+        Returns:
+            Dictionary with tracking information (same shape as track_people, plus 'predicted': True)
+        """
+        camera_state = self.camera_tracks[camera_id]
+        tracks = camera_state['tracks']
+        motion = self.motion_state.get(camera_id)
+        now = time.time()
+        
+        if motion is not None and len(tracks) and np.array_equal(motion['ids'], tracks.ids):
+            # Constant-velocity extrapolation from the last detection (bounded to avoid drift)
+            dt = min(now - motion['detected_time'], self.max_predict_seconds)
+            boxes = motion['detected_bbox'] + motion['velocity'] * dt
             
-            if global_id is not None:
-                # Check if this person has a name
-                person_name = self.get_person_name(global_id)
-                if person_name:
-                    label = f"{person_name} (ID:{global_id})"
-                else:
-                    label = f"ID:{global_id}"
-            else:
-                try:
-                    abs_track_id = abs(int(track_id)) if not isinstance(track_id, str) else track_id.replace("ds_", "")
-                except:
-                    abs_track_id = "?"
-                label = f"ID:{abs_track_id}"
+            if self.predict_mode == 'optical_flow' and frame is not None:
+                gray = self._flow_gray(frame)
+                prev_gray = self.flow_frames.get(camera_id)
+                if prev_gray is not None and prev_gray.shape == gray.shape:
+                    for i in range(len(boxes)):
+                        shift = self._flow_shift(prev_gray, gray, motion['bbox'][i])
+                        if shift is not None:
+                            boxes[i] = motion['bbox'][i] + np.array([shift[0], shift[1], shift[0], shift[1]], dtype=np.float32)
+                self.flow_frames[camera_id] = gray
             
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            (label_width, label_height), _ = cv2.getTextSize(label, font, 0.6, 2)
-            label_y = max(bbox[1] - 8, label_height + 13)
+            if frame is not None:
+                height, width = frame.shape[:2]
+                boxes = np.clip(boxes, 0, [width - 1, height - 1, width - 1, height - 1])
+            motion['bbox'] = boxes.astype(np.float32)
             
-            # Draw label background
-            cv2.rectangle(annotated, (bbox[0], label_y - label_height - 5),
-                         (bbox[0] + label_width + 10, label_y + 3), color, -1)
-            cv2.putText(annotated, label, (bbox[0] + 5, label_y - 1),
-                       font, 0.6, (0, 0, 0), 2)
-        
-        # Draw count overlay
-        cv2.rectangle(annotated, (5, 5), (200, 35), (0, 0, 0), -1)
-        cv2.putText(annotated, f"Tracks: {people_count}", (10, 25),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-        
-        return annotated
+            tracks = tracks.replace(boxes=motion['bbox'].copy(), predicted=True, timestamp=now)
+            camera_state['tracks'] = tracks
+        
+        if frame is not None:
+            camera_state['last_frame'] = frame
+        
+        return {
+            'camera_id': camera_id,
+            'people_count': camera_state.get('count', 0),
+            'detections': [],
+            'tracks': tracks,
+            'predicted': True,
+            'timestamp': now
+        }
+    
+    def _update_motion_state(self, camera_id: int, tracks: TrackSnapshot, frame: np.ndarray):
+        """Estimate per-track box velocity from consecutive detections (vectorized over tracks)"""
+        now = time.time()
+        previous = self.motion_state.get(camera_id)
+        boxes = tracks.boxes.astype(np.float32)
+        velocity = np.zeros_like(boxes)
+        
+        if previous is not None:
+            dt = now - previous['detected_time']
+            if dt > 1e-3:
+                _, current_idx, previous_idx = np.intersect1d(tracks.ids, previous['ids'], return_indices=True)
+                # Smooth the measured velocity to damp detector jitter
+                measured = (boxes[current_idx] - previous['detected_bbox'][previous_idx]) / dt
+                velocity[current_idx] = 0.5 * previous['velocity'][previous_idx] + 0.5 * measured
+        
+        self.motion_state[camera_id] = {
+            'ids': tracks.ids,
+            'bbox': boxes,
+            'velocity': velocity,
+            'detected_bbox': boxes,
+            'detected_time': now
+        }
+        
+        if self.predict_mode == 'optical_flow':
+            self.flow_frames[camera_id] = self._flow_gray(frame)
+    
+    def _flow_gray(self, frame: np.ndarray) -> np.ndarray:
+        """Downscaled grayscale frame for sparse optical flow"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, None, fx=self.flow_scale, fy=self.flow_scale, interpolation=cv2.INTER_AREA)
+    
+    def _flow_shift(self, prev_gray: np.ndarray, gray: np.ndarray, bbox: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Median Lucas-Kanade displacement of corner features inside a track box
+        
+        Returns:
+            (dx, dy) in full-resolution pixels, or None if too few features were tracked
+        """
+        height, width = prev_gray.shape[:2]
+        x1, y1, x2, y2 = (bbox * self.flow_scale).astype(int)
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(width, x2), min(height, y2)
+        if x2 - x1 < 8 or y2 - y1 < 8:
+            return None
+        
+        points = cv2.goodFeaturesToTrack(prev_gray[y1:y2, x1:x2], maxCorners=20, qualityLevel=0.01, minDistance=4)
+        if points is None or len(points) < 3:
+            return None
+        points = (points + np.array([x1, y1], dtype=np.float32)).astype(np.float32)
+        
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, winSize=(15, 15), maxLevel=2)
+        if next_points is None:
+            return None
+        good = status.ravel() == 1
+        if good.sum() < 3:
+            return None
+        
+        shift = np.median((next_points[good] - points[good]).reshape(-1, 2), axis=0)
+        return shift / self.flow_scale
+    
+    def draw_tracks(self, frame: np.ndarray, camera_id: int, tracks: Optional[Dict] = None) -> np.ndarray:
+        """
+        Draw bounding boxes and IDs on frame - BRINKSv2 style
+        Args: frame first, then camera_id (matches brinksv2)
+        
+        Args:
+            frame: Frame the tracks belong to
+            camera_id: Camera identifier
+            tracks: Track snapshot to draw (defaults to the camera's current tracks)
+        """
+        if tracks is None:
+            tracks = self.camera_tracks[camera_id]['tracks']
+        return self.renderer.render(
+            frame, tracks,
+            lambda track_id, track_data: self.track_label(camera_id, track_id, track_data),
+            count_text=f"Tracks: {len(tracks)}"
+        )
+    
+    def track_label(self, camera_id: int, track_id, track_data: Dict) -> str:
+        """Overlay label for a track: name + global ID, global ID, or local ID"""
+        # Use global ID if available, otherwise use local ID
+        global_id = track_data.get('global_id', self.global_id_map.get(f"{camera_id}_{track_id}"))
+        
+        if global_id is not None:
+            # Check if this person has a name
+            person_name = self.get_person_name(global_id)
+            if person_name:
+                return f"{person_name} (ID:{global_id})"
+            return f"ID:{global_id}"
+        
+        try:
+            abs_track_id = abs(int(track_id)) if not isinstance(track_id, str) else track_id.replace("ds_", "")
+        except (ValueError, TypeError):
+            abs_track_id = "?"
+        return f"ID:{abs_track_id}"
     
     def get_statistics(self, camera_id: int) -> Dict:
         if camera_id not in self.camera_tracks:
@@ -346,67 +468,94 @@ class TrackingService:
             logger.info(f"Deduplicated: {len(people_list)} → {len(deduplicated)} people ({match_count} duplicates removed)")
         return deduplicated
     
-    def _assign_global_ids(self, camera_id: int, tracks: Dict):
+    def _assign_global_ids(self, camera_id: int, tracks: TrackSnapshot) -> np.ndarray:
         """
         Assign global IDs to tracks using OSNet Re-ID + spatial matching
-        NEW: Uses OSNet for full-body Re-ID with stable track detection (3-7 frames)
+        With the Re-ID worker, crops are queued (at most reid_crops_per_tick per tick, largest
+        boxes first) and matching proceeds spatially; the embedding arrives later via callback
+        
+        Returns:
+            (N,) int64 global IDs aligned with tracks.ids
         """
+        global_ids = np.full(len(tracks), NO_GLOBAL_ID, dtype=np.int64)
         frame = self.camera_tracks[camera_id].get('last_frame')
         
         if frame is None:
             logger.warning(f"No frame available for camera {camera_id}")
-            return
-        
-        # Process each track
-        for track_id, track_data in tracks.items():
-            local_track_key = f"{camera_id}_{track_id}"
-            bbox = track_data.get('bbox')
-            
-            if bbox is None:
-                continue
-            
-            # Track stability: Count consecutive frames for this track
-            self.track_history[local_track_key]['consecutive_frames'] += 1
-            consecutive_frames = self.track_history[local_track_key]['consecutive_frames']
-            has_embedding = self.track_history[local_track_key]['has_embedding']
-            
-            # Extract OSNet embedding only for stable tracks (3+ frames)
+            return global_ids
+        
+        track_ids = tracks.ids.tolist()
+        boxes = tracks.boxes.astype(int).tolist()
+        areas = (tracks.boxes[:, 2] - tracks.boxes[:, 0]) * (tracks.boxes[:, 3] - tracks.boxes[:, 1])
+        frame_area = frame.shape[0] * frame.shape[1]
+        
+        # Track stability: Count consecutive frames for each track
+        # (a live track is re-embedded every reid_refresh_seconds for the multi-shot gallery)
+        now = time.time()
+        needs_embedding = []
+        for i, track_id in enumerate(track_ids):
+            history = self.track_history[f"{camera_id}_{track_id}"]
+            history['consecutive_frames'] += 1
+            if (self.use_reid and history['consecutive_frames'] >= self.stable_track_threshold
+                    and not history['reid_pending'] and now >= history['next_embedding_time']):
+                needs_embedding.append(i)
+        
+        sync_embedding = set(needs_embedding) if self.reid_worker is None else set()
+        
+        # Synchronous OSNet extraction (only when the Re-ID worker is disabled)
+        frame_tracks = []
+        for i, (track_id, bbox) in enumerate(zip(track_ids, boxes)):
             reid_embedding = None
             reid_quality = 0.0
             
-            if self.use_reid and consecutive_frames >= self.stable_track_threshold and not has_embedding:
+            if i in sync_embedding:
                 try:
                     # Extract full-body embedding using OSNet
                     reid_embedding = self.osnet_service.extract_embedding(frame, tuple(bbox))
                     
                     if reid_embedding is not None:
                         # Calculate quality based on bbox size (larger = better quality)
-                        bbox_width = bbox[2] - bbox[0]
-                        bbox_height = bbox[3] - bbox[1]
-                        bbox_area = bbox_width * bbox_height
-                        reid_quality = min(1.0, bbox_area / (frame.shape[0] * frame.shape[1]))
-                        
-                        self.track_history[local_track_key]['has_embedding'] = True
-                        logger.debug(f"Cam{camera_id} Track{track_id}: OSNet embedding extracted (frames={consecutive_frames}, quality={reid_quality:.2f})")
+                        reid_quality = min(1.0, float(areas[i]) / frame_area)
+                        self.track_history[f"{camera_id}_{track_id}"]['has_embedding'] = True
+                        self.track_history[f"{camera_id}_{track_id}"]['next_embedding_time'] = now + self.reid_refresh_seconds
+                        logger.debug(f"Cam{camera_id} Track{track_id}: OSNet embedding extracted (quality={reid_quality:.2f})")
                     else:
                         logger.debug(f"Cam{camera_id} Track{track_id}: OSNet embedding failed")
                 except Exception as e:
                     logger.debug(f"OSNet extraction error for Cam{camera_id} Track{track_id}: {e}")
             
-            # Get or create global ID using the global tracker
-            global_id = self.global_tracker.match_or_create_person(
-                camera_id=camera_id,
-                local_track_id=track_id,
-                face_embedding=reid_embedding,  # Using face_embedding param for Reid embedding (backward compatibility)
-                face_quality=reid_quality,
-                bbox=tuple(bbox)
-            )
-            
-            # Update legacy global_id_map for backward compatibility
-            self.global_id_map[local_track_key] = global_id
-            
-            # Store global ID in track data for easy access
-            track_data['global_id'] = global_id
+            frame_tracks.append((track_id, tuple(bbox), reid_embedding, reid_quality))
+        
+        # Get or create global IDs for the whole frame in one call (one lock / one request)
+        global_ids[:] = self.global_tracker.match_frame(camera_id, frame_tracks)
+        
+        # Update legacy global_id_map for backward compatibility
+        for track_id, global_id in zip(track_ids, global_ids.tolist()):
+            self.global_id_map[f"{camera_id}_{track_id}"] = global_id
+        
+        # Queue crops only now that the tracks are mapped, so an embedding can never arrive first
+        # Per-tick Re-ID budget: a crowd entering is spread over several ticks
+        # (tracks without any embedding first, then the largest boxes)
+        if self.reid_worker is not None:
+            needs_embedding.sort(key=lambda i: (self.track_history[f"{camera_id}_{track_ids[i]}"]['has_embedding'], -areas[i]))
+            for i in needs_embedding[:self.reid_crops_per_tick]:
+                quality = min(1.0, float(areas[i]) / frame_area)
+                if self.reid_worker.submit(camera_id, track_ids[i], frame, tuple(boxes[i]), quality):
+                    self.track_history[f"{camera_id}_{track_ids[i]}"]['reid_pending'] = True
+        
+        return global_ids
+    
+    def _on_embedding(self, camera_id: int, local_track_id: int, embedding: Optional[np.ndarray], quality: float):
+        """Re-ID worker callback (worker thread): hand the embedding to the global tracker"""
+        history = self.track_history.get(f"{camera_id}_{local_track_id}")
+        if history is None:
+            return  # Track was lost while its crop was queued
+        if embedding is not None and self.global_tracker.on_embedding(camera_id, local_track_id,
+                                                                      embedding, quality) is not None:
+            history['has_embedding'] = True
+            history['next_embedding_time'] = time.time() + self.reid_refresh_seconds
+        # Otherwise (extraction failed or the track is not mapped) the crop is retried on a later tick
+        history['reid_pending'] = False
     
     def _calculate_iou(self, bbox1: List[float], bbox2: List[float]) -> float:
         """Calculate Intersection over Union between two bounding boxes"""
@@ -445,11 +594,7 @@ class TrackingService:
         else:
             self.byte_trackers = {}
             self.deepsort_trackers = {}
-            self.camera_tracks = defaultdict(lambda: {
-                'count': 0, 'tracks': {}, 'history': deque(maxlen=100),
-                'last_update': None, 'bytetrack_confident': 0,
-                'deepsort_assisted': 0, 'last_frame': None
-            })
+            self.camera_tracks = defaultdict(self._new_camera_state)
             logger.info("Reset all trackers")
     
     def set_person_name(self, global_id: int, name: str) -> bool:
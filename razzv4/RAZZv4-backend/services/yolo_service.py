@@ -1,6 +1,7 @@
 """
 YOLO11 Service for person detection and counting
 Uses Ultralytics YOLO11 model for real-time person detection
+Backends: PyTorch (CPU/CUDA), or exported ONNX Runtime / OpenVINO (optionally int8) for CPU-only servers
 """
 
 from logging_config import get_logger
@@ -11,6 +12,7 @@ from ultralytics import YOLO
 import cv2
 from pathlib import Path
 import supervision as sv
+from services.model_export import EXPORT_BACKENDS, ensure_exported_model
 
 logger = get_logger(__name__)
 settings = get_settings()
@@ -22,30 +24,60 @@ class YOLOService:
     Handles model loading, inference, and person counting
     """
     
-    def __init__(self, model_name: str = None, confidence_threshold: float = None):
+    def __init__(self, model_name: str = None, confidence_threshold: float = None, device: str = None):
         """
         Initialize YOLO service
         
         Args:
             model_name: YOLO model to use (yolo11n.pt, yolo11s.pt, yolo11m.pt, yolo11l.pt, yolo11x.pt)
                        n=nano (fastest), s=small, m=medium, l=large, x=extra large (most accurate)
+                       An already exported model (*.onnx, *_openvino_model) is loaded as-is
                        If None, uses value from config
             confidence_threshold: Minimum confidence score for detections (0.0-1.0)
                                  If None, uses value from config
+            device: auto, cuda, cpu, onnx, onnx-int8, openvino, openvino-int8
+                    If None, uses YOLO_DEVICE from config
         """
         # Use config values if not provided
         self.model_name = model_name or settings.YOLO_MODEL
         self.confidence_threshold = confidence_threshold or settings.YOLO_CONFIDENCE
+        self.requested_device = (device or settings.YOLO_DEVICE).lower()
+        self.imgsz = settings.YOLO_IMGSZ
         self.model: Optional[YOLO] = None
         self.person_class_id = 0  # In COCO dataset, person class is 0
         self.device = None
+        self.backend = 'pytorch'  # pytorch, onnx, openvino
+        self.int8 = False
+        self.model_path = self.model_name  # What was actually loaded (exported file for onnx/openvino)
         
-        logger.info(f"Initializing YOLO service with model: {self.model_name}")
+        logger.info(f"Initializing YOLO service with model: {self.model_name} (device={self.requested_device})")
         self._detect_device()
         self._load_model()
     
     def _detect_device(self):
-        """Detect and configure GPU if available"""
+        """Resolve YOLO_DEVICE / YOLO_MODEL into a backend + torch device"""
+        model_path = self.model_name.rstrip('/')
+        if model_path.endswith('.onnx'):
+            self.backend = 'onnx'
+        elif model_path.endswith('_openvino_model'):
+            self.backend = 'openvino'
+        else:
+            backend, _, variant = self.requested_device.partition('-')
+            if backend in EXPORT_BACKENDS:
+                self.backend = backend
+                self.int8 = variant == 'int8'
+        
+        if self.backend != 'pytorch':
+            # Exported runtimes run on the CPU; no torch device/FP16 involved
+            self.device = 'cpu'
+            logger.info(f"🧮 YOLO will use {self.backend}{' int8' if self.int8 else ''} on CPU")
+            return
+        
+        if self.requested_device == 'cpu':
+            self.device = 'cpu'
+            logger.info("YOLO forced to CPU (PyTorch)")
+            return
+        
         try:
             import torch
             if torch.cuda.is_available():
@@ -64,6 +96,14 @@ class YOLOService:
     def _load_model(self):
         """Load YOLO11 model and move to GPU if available"""
         try:
+            if self.backend != 'pytorch':
+                # Export + cache on first start, then load the exported model
+                if not self.model_name.rstrip('/').endswith(('.onnx', '_openvino_model')):
+                    self.model_path = ensure_exported_model(self.model_name, self.backend, self.imgsz, self.int8)
+                self.model = YOLO(self.model_path, task='detect')
+                logger.info(f"✅ YOLO model loaded with {self.backend}: {self.model_path}")
+                return
+            
             # This will automatically download the model if not present
             self.model = YOLO(self.model_name)
             
@@ -89,48 +129,68 @@ class YOLOService:
         Returns:
             Tuple of (person_count, detections_list, detections_sv)
         """
+        return self.detect_people_batch([frame])[0]
+    
+    def detect_people_batch(self, frames: List[np.ndarray]) -> List[Tuple[int, List[dict], sv.Detections]]:
+        """
+        Detect people in several frames with a single batched predict call
+        Used by the InferenceScheduler to serve all cameras from one model invocation
+        
+        Args:
+            frames: List of input frames (BGR format from OpenCV), may differ in size
+        
+        Returns:
+            List of (person_count, detections_list, detections_sv), same order as frames
+        """
         if self.model is None:
             raise RuntimeError("YOLO model not loaded")
         
+        if not frames:
+            return []
+        
         try:
             # Run inference with GPU and FP16 optimization (same as brinksv2)
             results = self.model.predict(
-                frame,
+                frames,
                 classes=[0],  # Person class only (faster)
                 conf=self.confidence_threshold,
                 iou=0.7,  # IoU threshold for NMS
+                imgsz=self.imgsz,
                 verbose=False,
                 device=self.device,
                 half=True if self.device == 'cuda' else False  # FP16 for faster GPU inference
             )
             
-            # Convert to supervision Detections format for ByteTrack
-            detections_sv = sv.Detections.from_ultralytics(results[0])
-            
-            detections = []
-            person_count = 0
-            
-            # Also create legacy format for compatibility
-            if len(results) > 0 and results[0].boxes is not None:
-                boxes = results[0].boxes
-                for box in boxes:
-                    confidence = float(box.conf[0])
-                    bbox = box.xyxy[0].cpu().numpy()  # [x1, y1, x2, y2]
-                    
-                    detections.append({
-                        "bbox": bbox.tolist(),
-                        "confidence": confidence,
-                        "class_name": "person",
-                        "class_id": 0
-                    })
-                    person_count += 1
-            
-            logger.debug(f"Detected {person_count} people in frame")
-            return person_count, detections, detections_sv
+            return [self._parse_result(result) for result in results]
             
         except Exception as e:
             logger.error(f"Error during YOLO inference: {e}")
-            return 0, []
+            return [(0, [], sv.Detections.empty()) for _ in frames]
+    
+    def _parse_result(self, result) -> Tuple[int, List[dict], sv.Detections]:
+        """Convert a single Ultralytics result into (person_count, detections_list, detections_sv)"""
+        # Convert to supervision Detections format for ByteTrack
+        detections_sv = sv.Detections.from_ultralytics(result)
+        
+        detections = []
+        person_count = 0
+        
+        # Also create legacy format for compatibility
+        if result.boxes is not None:
+            for box in result.boxes:
+                confidence = float(box.conf[0])
+                bbox = box.xyxy[0].cpu().numpy()  # [x1, y1, x2, y2]
+                
+                detections.append({
+                    "bbox": bbox.tolist(),
+                    "confidence": confidence,
+                    "class_name": "person",
+                    "class_id": 0
+                })
+                person_count += 1
+        
+        logger.debug(f"Detected {person_count} people in frame")
+        return person_count, detections, detections_sv
     
     def annotate_frame(self, frame: np.ndarray, detections: List[dict]) -> np.ndarray:
         """
@@ -178,7 +238,7 @@ class YOLOService:
         Returns:
             Tuple of (person_count, annotated_frame or None)
         """
-        person_count, detections = self.detect_people(frame)
+        person_count, detections, _ = self.detect_people(frame)
         
         annotated_frame = None
         if annotate:
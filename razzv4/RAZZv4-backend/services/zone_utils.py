@@ -48,6 +48,7 @@ class ZoneManager:
                         'camera_id': obj.get('cameraId'),
                         'points': obj['points'],
                         'polygon': self._create_polygon(obj['points']),
+                        'image_points': obj.get('imagePoints'),  # Optional zone outline in the camera image (0-1)
                         'auto_generated': obj.get('autoGenerated', False)
                     }
                     zones.append(zone_data)